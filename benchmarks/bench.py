@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the model validation and serialization hot paths.
+
+Each benchmark runs at several input sizes (1, 100 and 10000 requests, angles,
+observation blocks... by default) and reports timing statistics per call. Results
+can be written as JSON and compared against a previous run to catch regressions:
+
+    benchmarks/bench.py --output baseline.json
+    benchmarks/bench.py --compare baseline.json --threshold 0.15
+
+The comparison exits with a non-zero status if the median time of any benchmark
+grew by more than the threshold.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any, Callable
+
+import astropy.coordinates
+import astropy.time
+import astropy.units as u
+import numpy as np
+from pydantic import TypeAdapter
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import fixtures  # noqa: E402
+
+from aeonlib.conf import Settings  # noqa: E402
+from aeonlib.coordinates import site_frames  # noqa: E402
+from aeonlib.eso import constraints, ephemeris  # noqa: E402
+from aeonlib.eso.facility import EsoFacility  # noqa: E402
+from aeonlib.eso.models import (  # noqa: E402
+    AbsoluteTimeConstraint,
+    AbsoluteTimeConstraints,
+    ObservationBlock,
+)
+from aeonlib.eso.standin import P2StandIn  # noqa: E402
+from aeonlib.models import Window  # noqa: E402
+from aeonlib.ocs import RequestGroup  # noqa: E402
+from aeonlib.ocs.bulk import validate_many  # noqa: E402
+from aeonlib.ocs.canonical import canonical_hash, dedupe  # noqa: E402
+from aeonlib.ocs.lco.facility import LcoFacility  # noqa: E402
+from aeonlib.ocs.simulate import simulate  # noqa: E402
+from aeonlib.serialization import decode, encode  # noqa: E402
+from aeonlib.types import Angle, Time  # noqa: E402
+
+DEFAULT_SIZES = (1, 100, 10000)
+
+
+@dataclass
+class Result:
+    name: str
+    size: int
+    rounds: int
+    min: float
+    median: float
+    mean: float
+    stdev: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}[{self.size}]"
+
+
+# A benchmark takes an input size and returns the function to time
+Benchmark = Callable[[int], Callable[[], Any]]
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def benchmark(name: str) -> Callable[[Benchmark], Benchmark]:
+    def register(setup: Benchmark) -> Benchmark:
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+@benchmark("request_group.model_validate")
+def request_group_validate(size: int):
+    payload = fixtures.request_group(size).model_dump(mode="json", exclude_none=True)
+    return lambda: RequestGroup.model_validate(payload)
+
+
+@benchmark("request_group.model_validate_json")
+def request_group_validate_json(size: int):
+    payload = fixtures.request_group(size).model_dump_json(exclude_none=True)
+    return lambda: RequestGroup.model_validate_json(payload)
+
+
+@benchmark("request_group.serialize")
+def request_group_serialize(size: int):
+    request_group = fixtures.request_group(size)
+    # No requests are made, the facility only needs credentials to be constructed
+    facility = LcoFacility(Settings(lco_token="benchmark"))
+    return lambda: facility.serialize_request_group(request_group)
+
+
+@benchmark("request_group.model_dump_json")
+def request_group_dump_json(size: int):
+    request_group = fixtures.request_group(size)
+    return lambda: request_group.model_dump_json(exclude_none=True)
+
+
+@benchmark("request_group.canonical_hash")
+def request_group_canonical_hash(size: int):
+    payload = fixtures.request_group(size).model_dump(mode="json", exclude_none=True)
+    return lambda: canonical_hash(payload)
+
+
+@benchmark("request_group.dedupe")
+def request_group_dedupe(size: int):
+    # size single-request groups, every target requested twice with shifted windows
+    batch = [
+        RequestGroup(
+            name=f"bench-{i}",
+            observation_type="NORMAL",
+            operator="SINGLE",
+            proposal="TEST_PROPOSAL",
+            ipp_value=1.0,
+            requests=[
+                fixtures.request(i // 2).model_copy(
+                    update={"windows": [fixtures.window(i)]}
+                )
+            ],
+        )
+        for i in range(size)
+    ]
+    return lambda: dedupe(batch)
+
+
+@benchmark("request_group.simulate")
+def request_group_simulate(size: int):
+    # A month of the LCO network with 20 weather realizations
+    request_groups = [fixtures.request_group(1) for _ in range(size)]
+    start = fixtures.START
+    end = start + timedelta(days=30)
+    return lambda: simulate(request_groups, start, end, realizations=20, seed=1)
+
+
+@benchmark("request_group.validate_many")
+def request_group_validate_many(size: int):
+    # size single-request groups, as read from a planning database
+    payloads = [fixtures.request_group(1).model_dump_json(exclude_none=True)] * size
+    return lambda: validate_many(payloads, output="json")
+
+
+@benchmark("request_group.encode")
+def request_group_encode(size: int):
+    request_group = fixtures.request_group(size)
+    return lambda: encode(request_group)
+
+
+@benchmark("request_group.decode")
+def request_group_decode(size: int):
+    data = encode(fixtures.request_group(size))
+    return lambda: decode(data)
+
+
+@benchmark("angle.validate_float")
+def angle_validate_float(size: int):
+    adapter = TypeAdapter(list[Angle])
+    values = [(i * 0.137) % 360 for i in range(size)]
+    return lambda: adapter.validate_python(values)
+
+
+@benchmark("angle.validate_str")
+def angle_validate_str(size: int):
+    adapter = TypeAdapter(list[Angle])
+    values = [f"{(i * 0.137) % 360:.6f}d" for i in range(size)]
+    return lambda: adapter.validate_python(values)
+
+
+@benchmark("angle.serialize")
+def angle_serialize(size: int):
+    adapter = TypeAdapter(list[Angle])
+    values = [
+        astropy.coordinates.Angle((i * 0.137) % 360, unit="deg") for i in range(size)
+    ]
+    return lambda: adapter.dump_python(values, mode="json")
+
+
+@benchmark("time.validate_datetime")
+def time_validate_datetime(size: int):
+    adapter = TypeAdapter(list[Time])
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    values = [start + timedelta(minutes=i) for i in range(size)]
+    return lambda: adapter.validate_python(values)
+
+
+@benchmark("time.serialize")
+def time_serialize(size: int):
+    # The Time serializer needs a model field, so serialize it through windows
+    adapter = TypeAdapter(list[Window])
+    values = [
+        Window(
+            start=astropy.time.Time(60000.0 + i / 1440, format="mjd"),
+            end=astropy.time.Time(60030.0 + i / 1440, format="mjd"),
+        )
+        for i in range(size)
+    ]
+    return lambda: adapter.dump_python(values, mode="json")
+
+
+@benchmark("coordinates.altaz")
+def coordinates_altaz(size: int):
+    # A night in 15 minute steps, with the frames of the grid cached
+    targets = [fixtures.sidereal_target(i) for i in range(size)]
+    times = astropy.time.Time("2025-05-01T00:00") + np.arange(0, 12, 0.25) * u.hour
+    site = constraints.ESO_SITES["paranal"]
+    return lambda: site_frames(site, times).altaz(targets)
+
+
+@benchmark("eso.observation_block.model_dump")
+def observation_block_dump(size: int):
+    obs = [fixtures.observation_block(i) for i in range(size)]
+    # As EsoFacility.save_ob dumps an OB before handing it to p2api
+    return lambda: [ob.model_dump(exclude={"version"}) for ob in obs]
+
+
+@benchmark("eso.observation_block.model_validate")
+def observation_block_validate(size: int):
+    payloads = [
+        fixtures.observation_block(i).model_dump(by_alias=True) for i in range(size)
+    ]
+    return lambda: [ObservationBlock.model_validate(p) for p in payloads]
+
+
+@benchmark("eso.flush")
+def eso_flush(size: int):
+    # Bulk edit of one field on many OBs, saved through the in-process stand-in
+    api = P2StandIn()
+    facility = EsoFacility(api=api)
+    container = facility.get_container(api.root_container_id)
+    obs = [facility.create_ob(container, f"ob-{i}") for i in range(size)]
+
+    def flush():
+        for ob in obs:
+            ob.user_priority = ob.user_priority % 10 + 1
+        facility.flush(obs)
+
+    return flush
+
+
+@benchmark("eso.verify_many")
+def eso_verify_many(size: int):
+    # Deadline pass over many OBs through a stand-in with 1ms of latency per call
+    api = P2StandIn(latency=0.001)
+    facility = EsoFacility(api=api)
+    container = facility.get_container(api.root_container_id)
+    ob_ids = [facility.create_ob(container, f"ob-{i}").ob_id for i in range(size)]
+    return lambda: list(facility.verify_many(ob_ids, submit=False, max_workers=16))
+
+
+@benchmark("eso.absolute_time_constraints.model_dump")
+def absolute_time_constraints_dump(size: int):
+    constraints = fixtures.absolute_time_constraints(size)
+    return lambda: constraints.model_dump(mode="json", exclude={"version"})
+
+
+@benchmark("eso.absolute_time_constraints.model_validate")
+def absolute_time_constraints_validate(size: int):
+    payload = fixtures.absolute_time_constraints(size).model_dump(mode="json")
+    return lambda: AbsoluteTimeConstraints.model_validate(payload)
+
+
+@benchmark("eso.time_constraints")
+def time_constraints(size: int):
+    windows = [fixtures.window(i) for i in range(size)]
+    return lambda: constraints.time_constraints(windows, site="paranal")
+
+
+@benchmark("eso.absolute_time_constraint.construct_from")
+def absolute_time_constraint_construct(size: int):
+    windows = [fixtures.window(i) for i in range(size)]
+    return lambda: [AbsoluteTimeConstraint.construct_from(w) for w in windows]
+
+
+@benchmark("eso.ephemeris.generate")
+def ephemeris_generate(size: int):
+    # A day of hourly records for each target
+    targets = [fixtures.minor_planet(i) for i in range(size)]
+    times = astropy.time.Time("2025-05-01") + np.arange(24) * u.hour
+    return lambda: ephemeris.generate_ephemerides(targets, times, h=15.0)
+
+
+@benchmark("eso.ephemeris.parse")
+def ephemeris_parse(size: int):
+    times = astropy.time.Time("2025-05-01") + np.arange(max(size, 2)) * u.hour
+    (text,) = ephemeris.generate_ephemerides([fixtures.minor_planet(0)], times)
+    return lambda: ephemeris.parse_ephemeris(text.text)
+
+
+def measure(
+    name: str, size: int, fn: Callable[[], Any], min_rounds: int, min_time: float
+) -> Result:
+    """Call fn at least min_rounds times and until min_time seconds have elapsed."""
+    fn()  # Warm up caches and lazily built schemas
+    timings: list[float] = []
+    started = time.perf_counter()
+    while len(timings) < min_rounds or time.perf_counter() - started < min_time:
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return Result(
+        name=name,
+        size=size,
+        rounds=len(timings),
+        min=min(timings),
+        median=statistics.median(timings),
+        mean=statistics.fmean(timings),
+        stdev=statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    )
+
+
+def environment() -> dict[str, str]:
+    env = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": datetime.now(timezone.utc).isoformat(),
+    }
+    for package in ("aeonlib", "pydantic", "pydantic-core", "astropy"):
+        try:
+            env[package] = version(package)
+        except PackageNotFoundError:
+            # e.g. aeonlib run from a source checkout
+            env[package] = "unknown"
+    return env
+
+
+def compare(
+    results: list[Result], baseline: dict, threshold: float
+) -> list[tuple[str, float, float]]:
+    """Return (key, baseline median, current median) for every benchmark whose
+    median grew by more than threshold relative to the baseline."""
+    previous = {r["name"] + f"[{r['size']}]": r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        if result.key not in previous:
+            continue
+        before = previous[result.key]["median"]
+        ratio = result.median / before
+        marker = "REGRESSION" if ratio > 1 + threshold else ""
+        print(
+            f"{result.key:<55} {before * 1e3:>12.3f} {result.median * 1e3:>12.3f} "
+            f"{ratio:>7.2f}x {marker}"
+        )
+        if marker:
+            regressions.append((result.key, before, result.median))
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "-k",
+        "--filter",
+        default="",
+        help="Only run benchmarks whose name contains this string",
+    )
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(s) for s in DEFAULT_SIZES),
+        help="Comma separated input sizes (default: %(default)s)",
+    )
+    parser.add_argument("--min-rounds", type=int, default=5)
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.5,
+        help="Minimum seconds to spend timing each benchmark (default: %(default)s)",
+    )
+    parser.add_argument("-o", "--output", type=Path, help="Write results as JSON")
+    parser.add_argument(
+        "--compare", type=Path, help="Compare against a JSON file from --output"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Allowed relative slowdown of the median when comparing (default: %(default)s)",
+    )
+    parser.add_argument("--list", action="store_true", help="List benchmark names")
+    args = parser.parse_args()
+
+    names = [n for n in BENCHMARKS if args.filter in n]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    results = []
+    print(f"{'benchmark':<55} {'median ms':>12} {'min ms':>12} {'rounds':>7}")
+    for name in names:
+        for size in sizes:
+            fn = BENCHMARKS[name](size)
+            result = measure(name, size, fn, args.min_rounds, args.min_time)
+            results.append(result)
+            print(
+                f"{result.key:<55} {result.median * 1e3:>12.3f} "
+                f"{result.min * 1e3:>12.3f} {result.rounds:>7}"
+            )
+
+    if args.output:
+        args.output.write_text(
+            json.dumps(
+                {
+                    "environment": environment(),
+                    "results": [asdict(r) for r in results],
+                },
+                indent=2,
+            )
+        )
+
+    if args.compare:
+        print(
+            f"\n{'benchmark':<55} {'baseline ms':>12} {'current ms':>12} {'ratio':>8}"
+        )
+        regressions = compare(
+            results, json.loads(args.compare.read_text()), args.threshold
+        )
+        if regressions:
+            print(
+                f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}"
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""
+Realistic, deterministic inputs for the benchmarks, modelled on the requests in
+tests/ocs/lco_requests.py and the observation blocks returned by the ESO p2api.
+"""
+
+from datetime import datetime, timedelta
+
+from astropy.time import Time
+
+from aeonlib.eso.models import (
+    AbsoluteTimeConstraint,
+    AbsoluteTimeConstraints,
+    ObservationBlock,
+)
+from aeonlib.models import NonSiderealTarget, SiderealTarget, Window
+from aeonlib.ocs import Constraints, Location, Request, RequestGroup
+from aeonlib.ocs.lco.instruments import (
+    Lco1M0ScicamSinistro,
+    Lco2M0FloydsScicam,
+    Lco2M0ScicamMuscat,
+)
+
+START = datetime(2025, 1, 1)
+
+
+def sidereal_target(i: int) -> SiderealTarget:
+    return SiderealTarget(
+        name=f"target-{i}",
+        type="ICRS",
+        ra=(254.287 + i * 0.137) % 360,
+        dec=-4.72 + (i % 80) * 0.5,
+    )
+
+
+def comet_target(i: int) -> NonSiderealTarget:
+    return NonSiderealTarget(
+        name=f"comet-{i}",
+        type="ORBITAL_ELEMENTS",
+        scheme="MPC_COMET",
+        epochofel=Time(60600.0 + i % 100, format="mjd"),
+        orbinc=62.4 + i % 10,
+        longascnode=21.6,
+        argofperih=308.5,
+        eccentricity=1.0001,
+        meandist=0.0,
+        meananom=0.0,
+        perihdist=0.39,
+        epochofperih=Time(60580.0, format="mjd"),
+    )
+
+
+def minor_planet(i: int) -> NonSiderealTarget:
+    return NonSiderealTarget(
+        name=f"minor-planet-{i}",
+        type="ORBITAL_ELEMENTS",
+        scheme="MPC_MINOR_PLANET",
+        epochofel=Time(60800.0, format="mjd", scale="tt"),
+        orbinc=(3.1 + i * 0.37) % 30,
+        longascnode=(i * 7.3) % 360,
+        argofperih=(i * 13.1) % 360,
+        eccentricity=0.05 + (i % 40) * 0.005,
+        meandist=2.2 + (i % 100) * 0.01,
+        meananom=(i * 3.7) % 360,
+    )
+
+
+def window(i: int) -> Window:
+    return Window(
+        start=START + timedelta(hours=i),
+        end=START + timedelta(hours=i, days=30),
+    )
+
+
+def sinistro(target) -> Lco1M0ScicamSinistro:
+    return Lco1M0ScicamSinistro(
+        type="EXPOSE",
+        target=target,
+        constraints=Constraints(max_airmass=3.0),
+        instrument_configs=[
+            Lco1M0ScicamSinistro.config_class(
+                exposure_count=1,
+                exposure_time=10,
+                mode="central_2k_2x2",
+                optical_elements=Lco1M0ScicamSinistro.optical_elements_class(
+                    filter="B"
+                ),
+            )
+        ],
+        acquisition_config=Lco1M0ScicamSinistro.acquisition_config_class(mode="OFF"),
+        guiding_config=Lco1M0ScicamSinistro.guiding_config_class(
+            mode="ON", optional=True
+        ),
+    )
+
+
+def floyds(target) -> Lco2M0FloydsScicam:
+    return Lco2M0FloydsScicam(
+        type="SPECTRUM",
+        target=target,
+        constraints=Constraints(max_airmass=3.0),
+        instrument_configs=[
+            Lco2M0FloydsScicam.config_class(
+                rotator_mode="VFLOAT",
+                exposure_count=1,
+                exposure_time=10,
+                mode="default",
+                optical_elements=Lco2M0FloydsScicam.optical_elements_class(
+                    slit="slit_6.0as"
+                ),
+            )
+        ],
+        acquisition_config=Lco2M0FloydsScicam.acquisition_config_class(mode="WCS"),
+        guiding_config=Lco2M0FloydsScicam.guiding_config_class(
+            mode="ON", optional=True
+        ),
+    )
+
+
+def muscat(target) -> Lco2M0ScicamMuscat:
+    return Lco2M0ScicamMuscat(
+        type="EXPOSE",
+        target=target,
+        constraints=Constraints(max_airmass=3.0),
+        instrument_configs=[
+            Lco2M0ScicamMuscat.config_class(
+                exposure_count=1,
+                exposure_time=10,
+                mode="MUSCAT_FAST",
+                optical_elements=Lco2M0ScicamMuscat.optical_elements_class(
+                    narrowband_g_position="in",
+                    narrowband_r_position="out",
+                    narrowband_i_position="in",
+                    narrowband_z_position="out",
+                ),
+                extra_params={
+                    "exposure_time_g": 10,
+                    "exposure_time_r": 10,
+                    "exposure_time_i": 10,
+                    "exposure_time_z": 10,
+                },
+            )
+        ],
+        acquisition_config=Lco2M0ScicamMuscat.acquisition_config_class(mode="OFF"),
+        guiding_config=Lco2M0ScicamMuscat.guiding_config_class(
+            mode="ON", optional=True
+        ),
+    )
+
+
+def request(i: int) -> Request:
+    """One of the three LCO instrument configurations, with every fourth request
+    observing a comet so that the non-sidereal Time fields are exercised too."""
+    target = comet_target(i) if i % 4 == 3 else sidereal_target(i)
+    configuration, telescope_class = [
+        (sinistro, "1m0"),
+        (floyds, "2m0"),
+        (muscat, "2m0"),
+    ][i % 3]
+    return Request(
+        location=Location(telescope_class=telescope_class),
+        configurations=[configuration(target)],
+        windows=[window(i)],
+    )
+
+
+def request_group(size: int) -> RequestGroup:
+    return RequestGroup(
+        name=f"bench-{size}",
+        observation_type="NORMAL",
+        operator="SINGLE" if size == 1 else "MANY",
+        proposal="TEST_PROPOSAL",
+        ipp_value=1.0,
+        requests=[request(i) for i in range(size)],
+    )
+
+
+def observation_block(i: int) -> ObservationBlock:
+    """An observation block as returned by p2api getOB, with a version token."""
+    target = sidereal_target(i)
+    return ObservationBlock.model_validate(
+        {
+            "version": f'"{i}"',
+            "constraints": {
+                "airmass": 2.0,
+                "fli": 1.0,
+                "moonDistance": 30,
+                "name": "No Name",
+                "seeing": 2.0,
+                "skyTransparency": "Variable, thin cirrus",
+                "twilight": 0,
+                "waterVapour": 30.0,
+            },
+            "obsDescription": {
+                "instrumentComments": "",
+                "name": f"OB {i}",
+                "userComments": "",
+            },
+            "target": {
+                "dec": target.dec.to_string(sep=":", precision=3),
+                "differentialDec": 0.0,
+                "differentialRa": 0.0,
+                "epoch": 2000.0,
+                "equinox": "J2000",
+                "name": target.name,
+                "properMotionDec": 0.0,
+                "properMotionRa": 0.0,
+                "ra": target.ra.to_string(unit="hourangle", sep=":", precision=3),
+            },
+            "executionTime": 600,
+            "exposureTime": 300,
+            "instrument": "UVES",
+            "ipVersion": 116.0,
+            "itemType": "OB",
+            "migrate": False,
+            "name": f"OB {i}",
+            "obId": 1000 + i,
+            "obStatus": "P",
+            "parentContainerId": 1538878,
+            "runId": 60925315,
+            "userPriority": 1,
+        }
+    )
+
+
+def absolute_time_constraints(size: int) -> AbsoluteTimeConstraints:
+    return AbsoluteTimeConstraints(
+        constraints=[
+            AbsoluteTimeConstraint(
+                start=START + timedelta(days=i), end=START + timedelta(days=i, hours=6)
+            )
+            for i in range(size)
+        ]
+    )
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+import fileinput
+import json
+import re
+import sys
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemLoader
+
+ANNOTATIONS = {
+    "integer": "int",
+    "number": "float",
+    "string": "str",
+    "boolean": "bool",
+    "keyword": "str",
+    "coord": "Coordinate",
+    "file": "str",
+    "paramfile": "str",
+    "intlist": "list[int]",
+    "numlist": "list[float]",
+    "keywordlist": "list[str]",
+}
+
+
+def python_literal(value) -> str:
+    # Double quoted strings, as ruff formats them
+    return json.dumps(value) if isinstance(value, str) else repr(value)
+
+
+def docstring(text: str) -> str:
+    """Escape text for a triple double quoted docstring."""
+    text = text.replace("\\", "\\\\")
+    if '"""' in text or text.endswith('"'):
+        text = text.replace('"', '\\"')
+    return text
+
+
+def get_annotation(param: dict) -> str:
+    allowed = param.get("allowedValues")
+    if allowed:
+        literal = f"Literal[{', '.join(python_literal(v) for v in allowed)}]"
+        return f"list[{literal}]" if param["type"].endswith("list") else literal
+    return ANNOTATIONS.get(param["type"], "Any")
+
+
+def generate_template_params(signatures_s: str, instrument: str = "") -> str:
+    """
+    Generate template parameter models based on ESO template signatures, as
+    returned by the p2api getTemplateSignatures call for an instrument package.
+    The models match those aeonlib.eso.signatures builds at runtime.
+
+    Args:
+        signatures_s (str): The input json containing template signatures.
+        instrument (str): Instrument name, for the module docstring.
+
+    Returns:
+        str: Generated Python Pydantic models as a string.
+    """
+
+    j_env = Environment(
+        loader=FileSystemLoader(Path(__file__).parent / "templates"),
+        trim_blocks=True,
+        lstrip_blocks=True,
+    )
+    j_env.filters["docstring"] = docstring
+    j_env.filters["literal"] = python_literal
+    template = j_env.get_template("templates.jinja")
+    signatures = json.loads(signatures_s)
+    if isinstance(signatures, dict):
+        signatures = [signatures]
+
+    templates = []
+    # Keep the output stable whatever order the API lists templates in
+    for signature in sorted(signatures, key=lambda s: s["templateName"]):
+        templates.append(
+            {
+                "template_name": signature["templateName"],
+                "class_name": "".join(
+                    part.capitalize() for part in signature["templateName"].split("_")
+                ),
+                "type": signature.get("type", ""),
+                "parameters": [
+                    {
+                        "name": p["name"],
+                        "field_name": re.sub(r"\W", "_", p["name"]).lower(),
+                        "annotation": get_annotation(p),
+                        "default": python_literal(p.get("defaultValue")),
+                        "minimum": p.get("minimum"),
+                        "maximum": p.get("maximum"),
+                        "label": p.get("label", ""),
+                    }
+                    for p in signature["parameters"]
+                ],
+            }
+        )
+
+    annotations = {p["annotation"] for ctx in templates for p in ctx["parameters"]}
+    # Only import what the models use, so the output passes ruff
+    typing_imports = []
+    if "Any" in annotations:
+        typing_imports.append("Any")
+    if any("Literal[" in a for a in annotations):
+        typing_imports.append("Literal")
+    return (
+        template.render(
+            templates=templates,
+            instrument=instrument or "ESO",
+            typing_imports=typing_imports,
+            uses_coordinate="Coordinate" in annotations,
+            uses_field=bool(annotations),
+        )
+        + "\n"
+    )
+
+
+if __name__ == "__main__":
+    instrument = sys.argv.pop(1) if len(sys.argv) > 2 else ""
+    # Accepts input from stdin or a file argument
+    with fileinput.input() as f:
+        signatures_json = "".join(list(f))
+        sys.stdout.write(generate_template_params(signatures_json, instrument))
@@ -12,10 +12,20 @@ class Settings(BaseSettings):
     soar_token: str = ""
     soar_api_root: str = "https://observe.lco.global/api/"
 
+    # HTTP connection pool shared by LCO and SOAR
+    http2: bool = False
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 5.0
+    http_timeout: float = 5.0
+    http_max_retries: int = 0
+
     # European Southern Observatory
     eso_environment: str = "demo"
     eso_username: str = ""
     eso_password: str = ""
+    eso_debug: bool = False
+    eso_signature_cache: str = ""
 
 
 settings = Settings()
@@ -0,0 +1,302 @@
+"""
+Batched hour angle and alt-az coordinates of sidereal targets over a time grid.
+
+Checking whether targets are observable from a site means transforming each of
+them to the local frame at every time step. Doing this with astropy frame
+transformations per target and per time step recomputes the Earth orientation
+every time. Here the sidereal time, the bias-precession-nutation matrix and the
+annual aberration of a site and time grid are computed once, cached as
+SiteFrames, and applied to arrays of targets with numpy.
+
+ICRS, HOUR_ANGLE and ALTAZ targets can be mixed in one batch: ICRS targets move
+across the sky with the grid, while HOUR_ANGLE and ALTAZ targets are fixed in the
+local frame.
+
+Example:
+    times = Time("2025-05-01T00:00") + np.arange(0, 12, 0.25) * u.hour
+    frames = site_frames(location, times)
+    alt, az = frames.altaz(targets)  # Degrees, shaped (len(times), len(targets))
+    observable = (alt > 30).any(axis=0)
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Sequence
+
+import astropy.time
+import astropy.units as u
+import erfa
+import numpy as np
+from astropy.coordinates import EarthLocation
+
+from aeonlib.models import SiderealTarget
+
+logger = logging.getLogger(__name__)
+
+SPEED_OF_LIGHT = 173.1446326846693
+"""In AU per day"""
+
+CACHE_SIZE = 32
+"""Number of site and time grid pairs whose frames are kept by site_frames"""
+
+_MAS = np.deg2rad(1 / 3.6e6)
+
+_TYPES = {"ICRS": 0, "HOUR_ANGLE": 1, "ALTAZ": 2}
+
+
+def _degrees(value) -> float:
+    return float("nan") if value is None else float(value.deg)
+
+
+@dataclass
+class TargetArrays:
+    """Coordinates of many SiderealTargets as arrays of radians, in target order.
+    Coordinates that do not apply to a target's type are NaN."""
+
+    type: np.ndarray
+    """0 for ICRS, 1 for HOUR_ANGLE and 2 for ALTAZ targets"""
+    ra: np.ndarray
+    dec: np.ndarray
+    proper_motion_ra: np.ndarray
+    """Times cos(dec), in radians per year"""
+    proper_motion_dec: np.ndarray
+    """In radians per year"""
+    epoch: np.ndarray
+    """Julian epoch of the coordinates"""
+    hour_angle: np.ndarray
+    altitude: np.ndarray
+    azimuth: np.ndarray
+    """East of North"""
+
+    def __len__(self) -> int:
+        return len(self.type)
+
+    @classmethod
+    def from_targets(cls, targets: Sequence[SiderealTarget]) -> "TargetArrays":
+        rows = [
+            (
+                _TYPES[t.type],
+                t.ra.deg,  # type: ignore
+                t.dec.deg,  # type: ignore
+                t.proper_motion_ra,
+                t.proper_motion_dec,
+                t.epoch,
+                _degrees(t.hour_angle),
+                _degrees(t.altitude),
+                _degrees(t.azimuth),
+            )
+            for t in targets
+        ]
+        columns = np.array(rows, dtype=float).reshape(-1, 9).T
+        if len(rows):
+            # Targets of a type must have its coordinates
+            missing = (columns[0] == 1) & np.isnan(columns[6]) | (
+                columns[0] == 2
+            ) & np.isnan(columns[7] + columns[8])
+            if missing.any():
+                i = int(np.argmax(missing))
+                raise ValueError(
+                    f"Target {targets[i].name} of type {targets[i].type} is"
+                    " missing its coordinates"
+                )
+        return cls(
+            type=columns[0].astype(np.int8),
+            ra=np.deg2rad(columns[1]),
+            dec=np.deg2rad(columns[2]),
+            proper_motion_ra=columns[3] * _MAS,
+            proper_motion_dec=columns[4] * _MAS,
+            epoch=columns[5],
+            hour_angle=np.deg2rad(columns[6]),
+            altitude=np.deg2rad(columns[7]),
+            azimuth=np.deg2rad(columns[8]),
+        )
+
+
+@dataclass
+class SiteFrames:
+    """
+    The Earth orientation of a site over a grid of times.
+
+    Parameters:
+        location (EarthLocation): The site.
+        times (astropy.time.Time): 1-D time grid.
+        latitude (float): Geodetic latitude of the site, in radians.
+        sidereal_time (np.ndarray): Local apparent sidereal time at each time, in
+            radians.
+        rbpn (np.ndarray): Bias-precession-nutation matrix from the ICRS to the
+            true equator and equinox of each time, shaped (times, 3, 3).
+        aberration (np.ndarray): Barycentric velocity of the Earth at each time,
+            as a fraction of the speed of light, shaped (times, 3).
+        epoch (float): Julian epoch at the middle of the grid, to which proper
+            motions are applied.
+
+    Positions are geometric: refraction, polar motion, diurnal aberration and
+    parallax are ignored, and UTC is used in place of UT1, so that no IERS
+    tables are needed for future dates. Altitudes agree with astropy's AltAz
+    frame without refraction to a few arcseconds.
+    """
+
+    location: EarthLocation
+    times: astropy.time.Time
+    latitude: float
+    sidereal_time: np.ndarray
+    rbpn: np.ndarray
+    aberration: np.ndarray
+    epoch: float
+
+    @classmethod
+    def compute(cls, location: EarthLocation, times: astropy.time.Time) -> "SiteFrames":
+        """Compute the frames of a site and time grid, see site_frames for a
+        cached version."""
+        if times.ndim != 1:
+            raise ValueError("The time grid must be one dimensional")
+        utc = times.utc
+        tt = times.tt
+        gast = erfa.gst06a(utc.jd1, utc.jd2, tt.jd1, tt.jd2)
+        _, barycentric = erfa.epv00(tt.jd1, tt.jd2)
+        middle = len(times) // 2
+        return cls(
+            location=location,
+            times=times,
+            latitude=float(location.lat.to_value(u.rad)),
+            sidereal_time=np.mod(gast + location.lon.to_value(u.rad), 2 * np.pi),
+            rbpn=erfa.pnm06a(tt.jd1, tt.jd2),
+            aberration=barycentric["v"] / SPEED_OF_LIGHT,
+            epoch=float(erfa.epj(tt.jd1[middle], tt.jd2[middle])),
+        )
+
+    def apparent(self, targets: TargetArrays) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Apparent right ascension and declination of ICRS coordinates.
+
+        Returns:
+            Right ascension and declination in radians, shaped (times, targets).
+        """
+        # Proper motion over the length of the grid is negligible, so it is
+        # applied once, up to the middle of the grid
+        years = self.epoch - targets.epoch
+        dec = targets.dec + targets.proper_motion_dec * years
+        ra = targets.ra + targets.proper_motion_ra * years / np.cos(targets.dec)
+        direction = erfa.s2c(ra, dec)
+        # First order annual aberration, then the rotation to the true equator
+        # and equinox, for every time and target at once
+        direction = direction[np.newaxis] + self.aberration[:, np.newaxis]
+        direction /= np.linalg.norm(direction, axis=-1, keepdims=True)
+        direction = np.einsum("tij,tnj->tni", self.rbpn, direction)
+        return erfa.c2s(direction)
+
+    def hadec(self, targets: Sequence[SiderealTarget] | TargetArrays):
+        """
+        Local hour angle and apparent declination of targets.
+
+        Returns:
+            Hour angle and declination in degrees, shaped (times, targets). Hour
+            angles are in [-180, 180), positive west of the meridian.
+        """
+        arrays = _arrays(targets)
+        shape = (len(self.times), len(arrays))
+        ha = np.empty(shape)
+        dec = np.empty(shape)
+        icrs = arrays.type == 0
+        if icrs.any():
+            ra, dec[:, icrs] = self.apparent(_select(arrays, icrs))
+            ha[:, icrs] = self.sidereal_time[:, np.newaxis] - ra
+        fixed = arrays.type == 1
+        ha[:, fixed] = arrays.hour_angle[fixed]
+        dec[:, fixed] = arrays.dec[fixed]
+        altaz = arrays.type == 2
+        if altaz.any():
+            ha[:, altaz], dec[:, altaz] = erfa.ae2hd(
+                arrays.azimuth[altaz], arrays.altitude[altaz], self.latitude
+            )
+        ha = np.mod(ha + np.pi, 2 * np.pi) - np.pi
+        return np.rad2deg(ha), np.rad2deg(dec)
+
+    def altaz(self, targets: Sequence[SiderealTarget] | TargetArrays):
+        """
+        Altitude and azimuth of targets.
+
+        Returns:
+            Altitude and azimuth, east of North, in degrees, shaped (times,
+            targets).
+        """
+        arrays = _arrays(targets)
+        ha, dec = self.hadec(arrays)
+        az, alt = erfa.hd2ae(np.deg2rad(ha), np.deg2rad(dec), self.latitude)
+        altaz = arrays.type == 2
+        alt[:, altaz] = arrays.altitude[altaz]
+        az[:, altaz] = arrays.azimuth[altaz]
+        return np.rad2deg(alt), np.rad2deg(az)
+
+    def airmass(self, targets: Sequence[SiderealTarget] | TargetArrays):
+        """Plane parallel airmass of targets, shaped (times, targets). Infinite
+        below the horizon."""
+        alt, _ = self.altaz(targets)
+        with np.errstate(divide="ignore"):
+            return np.where(alt > 0, 1 / np.sin(np.deg2rad(alt)), np.inf)
+
+    def sun_radec(self) -> tuple[np.ndarray, np.ndarray]:
+        """Geometric apparent right ascension and declination of the Sun at each
+        time, in radians."""
+        tt = self.times.tt
+        heliocentric, _ = erfa.epv00(tt.jd1, tt.jd2)
+        direction = np.einsum("tij,tj->ti", self.rbpn, -heliocentric["p"])
+        return erfa.c2s(direction)
+
+    def sun_altaz(self) -> tuple[np.ndarray, np.ndarray]:
+        """Geometric altitude and azimuth of the Sun at each time, in degrees,
+        good to about an arcminute."""
+        ra, dec = self.sun_radec()
+        az, alt = erfa.hd2ae(self.sidereal_time - ra, dec, self.latitude)
+        return np.rad2deg(alt), np.rad2deg(az)
+
+
+def _arrays(targets: Sequence[SiderealTarget] | TargetArrays) -> TargetArrays:
+    if isinstance(targets, TargetArrays):
+        return targets
+    return TargetArrays.from_targets(targets)
+
+
+def _select(arrays: TargetArrays, mask: np.ndarray) -> TargetArrays:
+    return TargetArrays(**{name: value[mask] for name, value in vars(arrays).items()})
+
+
+_cache: dict[tuple, SiteFrames] = {}
+_cache_lock = threading.Lock()
+
+
+def _key(location: EarthLocation, times: astropy.time.Time) -> tuple:
+    utc = times.utc
+    # Equal times can be split differently between jd1 and jd2
+    microseconds = np.round(((utc.jd1 - 2451545.0) + utc.jd2) * 86400e6)
+    geocentric = tuple(round(float(c.to_value(u.m)), 3) for c in location.geocentric)
+    return geocentric, microseconds.astype(np.int64).tobytes()
+
+
+def site_frames(location: EarthLocation, times: astropy.time.Time) -> SiteFrames:
+    """
+    The frames of a site and time grid, computed on first use.
+
+    The most recently used CACHE_SIZE site and time grid pairs are kept, so
+    repeated checks over the same grid, e.g. one per batch of targets, only
+    compute the Earth orientation once.
+    """
+    key = _key(location, times)
+    with _cache_lock:
+        frames = _cache.pop(key, None)
+        if frames is not None:
+            _cache[key] = frames
+            return frames
+    frames = SiteFrames.compute(location, times)
+    with _cache_lock:
+        _cache[key] = frames
+        while len(_cache) > CACHE_SIZE:
+            del _cache[next(iter(_cache))]
+    logger.debug("Computed frames of %d times", len(times))
+    return frames
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,257 @@
+"""
+Concurrent submission of one observation to several facilities.
+
+A FollowUp describes an observation without reference to any facility: a name,
+a sidereal target and the windows it should be observed in. Each Route
+translates it into a facility's own request (an OCS request group for LCO and
+SOAR, an observation block for ESO) and submits it. The Dispatcher runs every
+route in its own thread, so the time to submit everywhere is that of the slowest
+facility rather than the sum of all of them.
+
+Example:
+    routes = [
+        OcsRoute(LcoFacility(), lco_template),
+        OcsRoute(SoarFacility(), soar_template),
+        EsoRoute(EsoFacility(), container_id=1234, templates=[("acq", {})]),
+    ]
+    with Dispatcher(routes) as dispatcher:
+        result = dispatcher.dispatch(
+            FollowUp(name="S250101a", target=target, windows=[window])
+        )
+    result["lco"].latency, result["eso"].error
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Protocol, Self
+
+from pydantic import BaseModel
+
+from aeonlib.models import SiderealTarget, Window
+from aeonlib.ocs.lco.facility import LcoFacility
+from aeonlib.ocs.request_models import RequestGroup, SubmittedRequestGroup
+
+if TYPE_CHECKING:
+    from aeonlib.eso.facility import EsoFacility
+    from aeonlib.eso.models import ObservationBlock
+
+logger = logging.getLogger(__name__)
+
+
+class FollowUp(BaseModel):
+    """A facility neutral observation request"""
+
+    name: str
+    """Name of the observation, used for the request group or observation block"""
+    target: SiderealTarget
+    windows: list[Window]
+    """Windows the target should be observed in"""
+
+
+class Route(Protocol):
+    """Translates a FollowUp for a facility and submits it."""
+
+    name: str
+
+    def submit(self, followup: FollowUp) -> Any: ...
+
+
+class OcsRoute:
+    """
+    Submits a FollowUp to an OCS facility (LCO or SOAR) as a request group.
+
+    Parameters:
+        facility (LcoFacility): The facility to submit to, e.g. LcoFacility or
+            SoarFacility.
+        template (RequestGroup): Complete request group. The target of every
+            configuration and the windows of every request are replaced by those
+            of the FollowUp.
+        name (str): Name of the route in dispatch results. Defaults to the
+            facility name.
+    """
+
+    def __init__(
+        self, facility: LcoFacility, template: RequestGroup, name: str | None = None
+    ):
+        self.facility = facility
+        self.template = template
+        self.name = name or facility.name
+
+    def translate(self, followup: FollowUp) -> RequestGroup:
+        request_group = self.template.model_copy(deep=True)
+        request_group.name = followup.name
+        for request in request_group.requests:
+            request.windows = list(followup.windows)
+            for configuration in request.configurations:
+                configuration.target = followup.target
+        return request_group
+
+    def submit(self, followup: FollowUp) -> SubmittedRequestGroup:
+        return self.facility.submit_request_group(self.translate(followup))
+
+
+@dataclass
+class EsoSubmission:
+    """An observation block created from a FollowUp, and its verification"""
+
+    ob: "ObservationBlock"
+    observable: bool
+    messages: list[str] = field(default_factory=list)
+    """Verification messages, empty when the observation block is observable"""
+
+
+class EsoRoute:
+    """
+    Submits a FollowUp to ESO as an observation block.
+
+    The observation block is created in a container, given the FollowUp's target
+    and its windows as absolute time constraints, populated with templates and
+    verified.
+
+    Parameters:
+        facility (EsoFacility): The ESO facility to submit to.
+        container_id (int): Container the observation block is created in.
+        templates (list[tuple[str, dict]]): Template names and the parameters to
+            set on each, in the order they are added to the observation block.
+        submit (bool): Whether verification also submits the observation block,
+            see EsoFacility.verify.
+        name (str): Name of the route in dispatch results.
+    """
+
+    def __init__(
+        self,
+        facility: "EsoFacility",
+        container_id: int,
+        templates: list[tuple[str, dict]] | None = None,
+        submit: bool = True,
+        name: str = "eso",
+    ):
+        self.facility = facility
+        self.container_id = container_id
+        self.templates = templates or []
+        self.submit_ob = submit
+        self.name = name
+
+    def submit(self, followup: FollowUp) -> EsoSubmission:
+        from aeonlib.eso.models import AbsoluteTimeConstraint, AbsoluteTimeConstraints
+
+        # Translate the windows before anything is created remotely
+        constraints = AbsoluteTimeConstraints(
+            constraints=[
+                AbsoluteTimeConstraint.construct_from(w) for w in followup.windows
+            ]
+        )
+        container = self.facility.get_container(self.container_id)
+        ob = self.facility.create_ob(container, followup.name)
+        ob.target.construct_from(followup.target)
+        ob = self.facility.save_ob(ob)
+        for template_name, params in self.templates:
+            template = self.facility.create_template(ob, template_name)
+            if params:
+                self.facility.update_template_params(ob, template, params)
+        self.facility.save_absolute_time_constraints(ob, constraints)
+        messages, observable = self.facility.verify(ob, self.submit_ob)
+        return EsoSubmission(
+            ob=self.facility.get_ob(ob.ob_id),
+            observable=observable,
+            messages=messages,
+        )
+
+
+@dataclass
+class FacilityResult:
+    """Outcome of submitting to one facility"""
+
+    facility: str
+    result: Any = None
+    """What the route's submit returned, e.g. a SubmittedRequestGroup"""
+    error: BaseException | None = None
+    latency: float = 0.0
+    """Seconds spent in the route's submit"""
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class DispatchResult:
+    """Per-facility results of a dispatch"""
+
+    results: dict[str, FacilityResult]
+    latency: float
+    """Wall clock seconds for the whole dispatch"""
+
+    def __getitem__(self, facility: str) -> FacilityResult:
+        return self.results[facility]
+
+    @property
+    def ok(self) -> bool:
+        return all(r.ok for r in self.results.values())
+
+    @property
+    def errors(self) -> dict[str, BaseException]:
+        return {
+            name: r.error for name, r in self.results.items() if r.error is not None
+        }
+
+
+class Dispatcher:
+    """
+    Submits a FollowUp to several facilities concurrently.
+
+    Parameters:
+        routes (list[Route]): One route per facility. Route names must be unique.
+        max_workers (int): Threads used for submissions. Defaults to one per route.
+
+    Failures are captured per facility in the FacilityResult rather than raised,
+    so one facility being down does not prevent submission to the others. Use the
+    dispatcher as a context manager, or call close(), to stop its threads.
+    """
+
+    def __init__(self, routes: list[Route], max_workers: int | None = None):
+        names = [route.name for route in routes]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Route names must be unique, got {names}")
+        self.routes = routes
+        self._executor = ThreadPoolExecutor(
+            max_workers or max(len(routes), 1), thread_name_prefix="aeonlib-dispatch"
+        )
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._executor.shutdown()
+
+    def _submit(self, route: Route, followup: FollowUp) -> FacilityResult:
+        start = time.perf_counter()
+        try:
+            result = FacilityResult(route.name, result=route.submit(followup))
+        except Exception as e:
+            logger.warning("Submission to %s failed: %s", route.name, e)
+            result = FacilityResult(route.name, error=e)
+        result.latency = time.perf_counter() - start
+        return result
+
+    def dispatch(self, followup: FollowUp) -> DispatchResult:
+        """Submit to every route at once and wait for all of them to finish."""
+        start = time.perf_counter()
+        futures = [
+            self._executor.submit(self._submit, route, followup)
+            for route in self.routes
+        ]
+        results = {r.facility: r for r in (f.result() for f in futures)}
+        latency = time.perf_counter() - start
+        logger.debug(
+            "Dispatched %s in %.3fs (%s)",
+            followup.name,
+            latency,
+            ", ".join(f"{r.facility} {r.latency:.3f}s" for r in results.values()),
+        )
+        return DispatchResult(results=results, latency=latency)
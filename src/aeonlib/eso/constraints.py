@@ -0,0 +1,153 @@
+"""
+Batched conversion of Windows into ESO time constraints.
+
+Every window of every observation block is gathered into a single astropy Time
+array, so the conversion to UTC datetimes and the local sidereal time
+computation each run once, vectorized, instead of once per window.
+
+Example:
+    absolute, sidereal = time_constraints(windows, site="paranal")
+    facility.save_absolute_time_constraints(ob, absolute)
+    facility.save_sidereal_time_constraints(ob, sidereal)
+"""
+
+from datetime import datetime, time
+from typing import Sequence
+
+import astropy.time
+import astropy.units as u
+import erfa
+import numpy as np
+from astropy.coordinates import EarthLocation
+
+from aeonlib.eso.models import AbsoluteTimeConstraints, SiderealTimeConstraints
+from aeonlib.models import Window
+
+ESO_SITES = {
+    "paranal": EarthLocation.from_geodetic(
+        lon=-70.4045 * u.deg, lat=-24.6272 * u.deg, height=2635 * u.m
+    ),
+    "lasilla": EarthLocation.from_geodetic(
+        lon=-70.7377 * u.deg, lat=-29.2567 * u.deg, height=2347 * u.m
+    ),
+}
+"""Locations of the ESO observatories, usable by name as the site of
+time_constraints"""
+
+SIDEREAL_DAY = 0.99726957
+"""Length of a sidereal day in solar days"""
+
+_END_OF_DAY = time(23, 59, 59)
+
+
+def _utc_jd(value: astropy.time.Time | datetime) -> tuple[float, float]:
+    if not isinstance(value, astropy.time.Time):
+        value = astropy.time.Time(value)
+    if value.scale != "utc":
+        value = value.utc
+    return float(value.jd1), float(value.jd2)
+
+
+def local_sidereal_time(times: astropy.time.Time, longitude: u.Quantity) -> np.ndarray:
+    """
+    Local mean sidereal time, in hours, of an array of UTC times.
+
+    UTC is used in place of UT1, which differs by less than a second, so that
+    no IERS tables are needed for future dates.
+    """
+    gmst = erfa.gmst82(times.jd1, times.jd2)
+    return np.mod(gmst + longitude.to_value(u.rad), 2 * np.pi) * (12 / np.pi)
+
+
+def _time_of_day(hours: np.ndarray) -> list[time]:
+    seconds = np.rint(hours * 3600).astype(np.int64) % 86400
+    h, rest = np.divmod(seconds, 3600)
+    m, s = np.divmod(rest, 60)
+    return [time(*hms) for hms in zip(h.tolist(), m.tolist(), s.tolist())]
+
+
+def time_constraints_many(
+    window_groups: Sequence[Sequence[Window]],
+    site: EarthLocation | str = "paranal",
+) -> list[tuple[AbsoluteTimeConstraints, SiderealTimeConstraints]]:
+    """
+    Convert the windows of many observation blocks into ESO absolute and sidereal
+    time constraints.
+
+    Args:
+        window_groups: The windows of each observation block.
+        site: Observatory location, or one of the names in ESO_SITES.
+
+    Returns:
+        The absolute and sidereal time constraints of each observation block, in
+        order. Each window becomes one absolute time constraint (in UTC) and one
+        LST range. Windows a sidereal day or longer cover the whole LST range.
+    """
+    if isinstance(site, str):
+        try:
+            site = ESO_SITES[site]
+        except KeyError:
+            raise ValueError(
+                f"Unknown site {site}, expected one of {list(ESO_SITES)}"
+            ) from None
+
+    windows = [w for group in window_groups for w in group]
+    if not windows:
+        return [
+            (
+                AbsoluteTimeConstraints(constraints=[]),
+                SiderealTimeConstraints(constraints=[]),
+            )
+            for _ in window_groups
+        ]
+    if any(w.start is None for w in windows):
+        raise ValueError("ESO constraints require a valid start time")
+    jd = np.array([(*_utc_jd(w.start), *_utc_jd(w.end)) for w in windows]).reshape(
+        -1, 4
+    )
+    # Starts followed by ends, so every conversion below is a single call
+    times = astropy.time.Time(
+        np.concatenate([jd[:, 0], jd[:, 2]]),
+        np.concatenate([jd[:, 1], jd[:, 3]]),
+        format="jd",
+        scale="utc",
+    )
+    datetimes = times.datetime.tolist()
+    lst = _time_of_day(local_sidereal_time(times, site.lon))
+    full_day = ((jd[:, 2] - jd[:, 0]) + (jd[:, 3] - jd[:, 1])) >= SIDEREAL_DAY
+
+    n = len(windows)
+    absolute = [{"from": datetimes[i], "to": datetimes[n + i]} for i in range(n)]
+    sidereal = [
+        {"from": time(0), "to": _END_OF_DAY}
+        if full_day[i]
+        else {"from": lst[i], "to": lst[n + i]}
+        for i in range(n)
+    ]
+
+    # Validating each group's list in one call keeps the per window cost in
+    # pydantic-core
+    results = []
+    offset = 0
+    for group in window_groups:
+        end = offset + len(group)
+        results.append(
+            (
+                AbsoluteTimeConstraints.model_validate(
+                    {"constraints": absolute[offset:end]}
+                ),
+                SiderealTimeConstraints.model_validate(
+                    {"constraints": sidereal[offset:end]}
+                ),
+            )
+        )
+        offset = end
+    return results
+
+
+def time_constraints(
+    windows: Sequence[Window], site: EarthLocation | str = "paranal"
+) -> tuple[AbsoluteTimeConstraints, SiderealTimeConstraints]:
+    """Absolute and sidereal time constraints of one observation block's windows,
+    see time_constraints_many."""
+    return time_constraints_many([windows], site)[0]
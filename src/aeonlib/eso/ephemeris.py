@@ -0,0 +1,438 @@
+"""
+Generation and parsing of ESO ephemeris files for non-sidereal targets.
+
+ESO observation blocks of moving targets carry an ephemeris in the PAF format:
+a header followed by one INS.EPHEM.RECORD per time step,
+
+    INS.EPHEM.RECORD "2025-04-30T10:00:00.000, 60795.41666666667, 23 52 34.5819,
+        -10 14 26.580, 0.01342419, 0.00461927, 9.2919, 0.000, *" ;
+
+with the UTC time, its MJD, the J2000 astrometric RA and Dec, the RA (times
+cos Dec) and Dec rates in arcsec/s, the V magnitude and the slit position angle.
+ESO requires at least two records.
+
+Positions are computed from the orbital elements of NonSiderealTargets with a
+two-body propagation that is vectorized over all targets and time steps at once,
+including light time and, for an observatory site, topocentric parallax.
+Perturbations are ignored, so elements should be osculating at an epoch close
+to the ephemeris.
+
+Example:
+    times = Time("2025-04-30") + np.arange(0, 72) * u.hour
+    ephemerides = generate_ephemerides(targets, times, site="paranal")
+    facility.save_ephemeris(ob, ephemerides[0])
+    records = parse_ephemeris(ephemerides[0].text)
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Sequence
+
+import astropy.time
+import astropy.units as u
+import erfa
+import numpy as np
+from astropy.coordinates import EarthLocation
+
+from aeonlib.eso.constraints import ESO_SITES
+from aeonlib.eso.models import Ephemeris
+from aeonlib.models import NonSiderealTarget
+
+GAUSSIAN_GRAVITATIONAL_CONSTANT = 0.01720209895
+"""Mean motion, in radians per day, of a body with a semi-major axis of 1 AU"""
+
+SPEED_OF_LIGHT = 173.1446326846693
+"""In AU per day"""
+
+OBLIQUITY_J2000 = np.deg2rad(84381.406 / 3600)
+"""Obliquity of the ecliptic at J2000, in radians"""
+
+RATE_STEP = 30.0
+"""Half the interval, in seconds, over which rates are differentiated"""
+
+MIN_RECORDS = 2
+
+_RECORD = re.compile(r'INS\.EPHEM\.RECORD\s+"([^"]*)"')
+
+
+@dataclass
+class OrbitalElements:
+    """Heliocentric ecliptic J2000 elements of many bodies, as arrays of radians
+    and AU, with the epoch as a TT Julian date."""
+
+    semi_major_axis: np.ndarray
+    eccentricity: np.ndarray
+    inclination: np.ndarray
+    ascending_node: np.ndarray
+    argument_of_perihelion: np.ndarray
+    mean_anomaly: np.ndarray
+    """Mean anomaly at the epoch"""
+    mean_motion: np.ndarray
+    """In radians per day"""
+    epoch: np.ndarray
+
+    @classmethod
+    def from_targets(cls, targets: Sequence[NonSiderealTarget]) -> "OrbitalElements":
+        """Elements of targets of the ORBITAL_ELEMENTS type. Comet schemes use the
+        perihelion distance and epoch when they are set, major planet schemes the
+        mean longitude, longitude of perihelion and daily motion."""
+        rows = [_elements(target) for target in targets]
+        columns = np.array(rows, dtype=float).reshape(-1, 8).T
+        return cls(*columns)
+
+    def heliocentric(self, jd_tdb: np.ndarray) -> np.ndarray:
+        """
+        Heliocentric equatorial J2000 positions, in AU.
+
+        Args:
+            jd_tdb: Julian dates (TDB), either of shape (times,) or (bodies, times).
+
+        Returns:
+            Array of shape (bodies, times, 3).
+        """
+        e = self.eccentricity[:, None]
+        a = self.semi_major_axis[:, None]
+        mean_anomaly = self.mean_anomaly[:, None] + self.mean_motion[:, None] * (
+            np.atleast_2d(jd_tdb) - self.epoch[:, None]
+        )
+        anomaly = solve_kepler(np.mod(mean_anomaly, 2 * np.pi), e)
+        x = a * (np.cos(anomaly) - e)
+        y = a * np.sqrt(1 - e**2) * np.sin(anomaly)
+
+        # Orbital plane -> ecliptic -> equator
+        node, peri, inc = (
+            self.ascending_node[:, None],
+            self.argument_of_perihelion[:, None],
+            self.inclination[:, None],
+        )
+        cos_w, sin_w = np.cos(peri), np.sin(peri)
+        cos_n, sin_n = np.cos(node), np.sin(node)
+        cos_i, sin_i = np.cos(inc), np.sin(inc)
+        xp = x * cos_w - y * sin_w
+        yp = x * sin_w + y * cos_w
+        ecliptic_x = xp * cos_n - yp * cos_i * sin_n
+        ecliptic_y = xp * sin_n + yp * cos_i * cos_n
+        ecliptic_z = yp * sin_i
+        cos_e, sin_e = np.cos(OBLIQUITY_J2000), np.sin(OBLIQUITY_J2000)
+        return np.stack(
+            [
+                ecliptic_x,
+                ecliptic_y * cos_e - ecliptic_z * sin_e,
+                ecliptic_y * sin_e + ecliptic_z * cos_e,
+            ],
+            axis=-1,
+        )
+
+
+def _elements(target: NonSiderealTarget) -> tuple[float, ...]:
+    if target.type != "ORBITAL_ELEMENTS":
+        raise ValueError(f"{target.name}: only ORBITAL_ELEMENTS targets are supported")
+    e = target.eccentricity
+    if e >= 1:
+        raise ValueError(f"{target.name}: only elliptical orbits are supported")
+    comet = (
+        target.scheme.endswith("COMET")
+        and bool(target.perihdist)
+        and target.epochofperih is not None
+    )
+    planet = target.scheme.endswith("MAJOR_PLANET") and target.meanlong is not None
+    if planet and target.longofperih is None:
+        raise ValueError(f"{target.name}: meanlong also needs longofperih")
+    if not comet and target.meandist <= 0:
+        if target.scheme.endswith("COMET"):
+            raise ValueError(
+                f"{target.name}: comets need perihdist and epochofperih, or meandist"
+            )
+        raise ValueError(f"{target.name}: meandist must be positive")
+    a = target.meandist
+    mean_anomaly = _radians(target.meananom)
+    epoch = target.epochofel.tt.jd  # type: ignore
+    peri = _radians(target.argofperih)
+    node = _radians(target.longascnode)
+    motion = None
+    if comet:
+        a = target.perihdist / (1 - e)  # type: ignore
+        mean_anomaly, epoch = 0.0, target.epochofperih.tt.jd  # type: ignore
+    elif planet:
+        longofperih = _radians(target.longofperih)
+        mean_anomaly = _radians(target.meanlong) - longofperih
+        peri = longofperih - node
+        if target.dailymot:
+            motion = np.deg2rad(target.dailymot)
+    if motion is None:
+        motion = GAUSSIAN_GRAVITATIONAL_CONSTANT / a**1.5
+    return (a, e, _radians(target.orbinc), node, peri, mean_anomaly, motion, epoch)
+
+
+def _radians(angle) -> float:
+    return angle.radian if hasattr(angle, "radian") else np.deg2rad(float(angle))
+
+
+def solve_kepler(
+    mean_anomaly: np.ndarray, eccentricity: np.ndarray, tolerance: float = 1e-12
+) -> np.ndarray:
+    """Eccentric anomaly for arrays of mean anomalies and eccentricities, by
+    Newton's method."""
+    mean_anomaly, eccentricity = np.broadcast_arrays(mean_anomaly, eccentricity)
+    anomaly = np.where(eccentricity > 0.8, np.pi, mean_anomaly)
+    for _ in range(50):
+        step = (anomaly - eccentricity * np.sin(anomaly) - mean_anomaly) / (
+            1 - eccentricity * np.cos(anomaly)
+        )
+        anomaly = anomaly - step
+        if np.all(np.abs(step) < tolerance):
+            break
+    return anomaly
+
+
+def observer_heliocentric(
+    times: astropy.time.Time, site: EarthLocation | None
+) -> np.ndarray:
+    """Heliocentric equatorial position of the geocenter, or of an observatory
+    site, in AU, with shape (times, 3)."""
+    tdb = times.tdb
+    pvh, _ = erfa.epv00(tdb.jd1, tdb.jd2)
+    position = pvh["p"]
+    if site is not None:
+        # Rotating by the sidereal time, ignoring precession and polar motion,
+        # is accurate to far better than the parallax itself
+        theta = erfa.gmst82(times.utc.jd1, times.utc.jd2)
+        x, y, z = (c.to_value(u.au) for c in site.geocentric)
+        position = position + np.stack(
+            [
+                x * np.cos(theta) - y * np.sin(theta),
+                x * np.sin(theta) + y * np.cos(theta),
+                np.full_like(theta, z),
+            ],
+            axis=-1,
+        )
+    return position
+
+
+@dataclass
+class EphemerisRecords:
+    """Columns of an ephemeris, one value per record."""
+
+    times: astropy.time.Time
+    """UTC times"""
+    ra: np.ndarray
+    """J2000 astrometric right ascension in degrees"""
+    dec: np.ndarray
+    """J2000 astrometric declination in degrees"""
+    ra_rate: np.ndarray
+    """Rate of the right ascension times cos(dec), in arcsec/s"""
+    dec_rate: np.ndarray
+    """Rate of the declination, in arcsec/s"""
+    magnitude: np.ndarray
+    """V magnitude"""
+    slit_pa: np.ndarray
+    """Slit position angle in degrees"""
+
+    def __len__(self) -> int:
+        return len(self.ra)
+
+
+def _site(site: EarthLocation | str | None) -> EarthLocation | None:
+    if isinstance(site, str):
+        try:
+            return ESO_SITES[site]
+        except KeyError:
+            raise ValueError(
+                f"Unknown site {site}, expected one of {list(ESO_SITES)}"
+            ) from None
+    return site
+
+
+def compute_ephemerides(
+    targets: Sequence[NonSiderealTarget],
+    times: astropy.time.Time,
+    site: EarthLocation | str | None = "paranal",
+    h: float | Sequence[float] | None = None,
+    g: float | Sequence[float] = 0.15,
+    slit_pa: float = 0.0,
+) -> list[EphemerisRecords]:
+    """
+    Positions, rates and magnitudes of many targets over a grid of times.
+
+    Args:
+        targets: ORBITAL_ELEMENTS targets.
+        times: Times of the records, the same for every target.
+        site: Observatory location or one of the names in ESO_SITES, None for
+            geocentric positions.
+        h: Absolute magnitude of each target, or of all of them. Magnitudes are
+            0 when not given.
+        g: Slope parameter of the H, G magnitude system.
+        slit_pa: Slit position angle written in every record.
+
+    Returns:
+        The records of each target, in order.
+    """
+    times = times.utc
+    elements = OrbitalElements.from_targets(targets)
+    n = len(times)
+    # Evaluate every time step and the steps either side of it for the rates
+    offsets = np.array([0.0, -RATE_STEP, RATE_STEP]) * u.s
+    grid = (times[None, :] + offsets[:, None]).ravel()
+    observer = observer_heliocentric(grid, _site(site))
+    tdb = grid.tdb
+    jd_tdb = tdb.jd1 + tdb.jd2
+
+    body = elements.heliocentric(jd_tdb)
+    for _ in range(2):
+        # Light time: where the body was when the observed light left it
+        distance = np.linalg.norm(body - observer, axis=-1)
+        body = elements.heliocentric(jd_tdb - distance / SPEED_OF_LIGHT)
+    topocentric = body - observer
+    distance = np.linalg.norm(topocentric, axis=-1)
+
+    ra = np.arctan2(topocentric[..., 1], topocentric[..., 0])
+    dec = np.arcsin(topocentric[..., 2] / distance)
+    ra, before, after = np.split(ra, 3, axis=1)
+    dec, dec_before, dec_after = np.split(dec, 3, axis=1)
+    arcsec_per_second = np.rad2deg(1) * 3600 / (2 * RATE_STEP)
+    ra_rate = np.angle(np.exp(1j * (after - before))) * np.cos(dec) * arcsec_per_second
+    dec_rate = (dec_after - dec_before) * arcsec_per_second
+
+    if h is None:
+        magnitude = np.zeros_like(ra)
+    else:
+        sun_distance = np.linalg.norm(body[:, :n], axis=-1)
+        cos_phase = np.einsum("btk,btk->bt", body[:, :n], topocentric[:, :n]) / (
+            sun_distance * distance[:, :n]
+        )
+        tan_half = np.tan(np.arccos(np.clip(cos_phase, -1, 1)) / 2)
+        g_ = np.broadcast_to(np.asarray(g, dtype=float), (len(targets),))[:, None]
+        phase = (1 - g_) * np.exp(-3.33 * tan_half**0.63) + g_ * np.exp(
+            -1.87 * tan_half**1.22
+        )
+        magnitude = (
+            np.broadcast_to(np.asarray(h, dtype=float), (len(targets),))[:, None]
+            + 5 * np.log10(sun_distance * distance[:, :n])
+            - 2.5 * np.log10(phase)
+        )
+
+    ra_degrees = np.mod(np.rad2deg(ra), 360)
+    dec_degrees = np.rad2deg(dec)
+    return [
+        EphemerisRecords(
+            times=times,
+            ra=ra_degrees[i],
+            dec=dec_degrees[i],
+            ra_rate=ra_rate[i],
+            dec_rate=dec_rate[i],
+            magnitude=magnitude[i],
+            slit_pa=np.full(n, slit_pa),
+        )
+        for i in range(len(targets))
+    ]
+
+
+def _sexagesimal(
+    values: np.ndarray, per_unit: float, decimals: int, wrap: bool
+) -> tuple[np.ndarray, ...]:
+    """Sign and whole units, minutes, seconds and fractional digits of seconds,
+    rounded as a whole so that 59.99995 seconds carry over."""
+    scale = 10**decimals
+    total = np.rint(np.abs(values) * per_unit * 3600 * scale).astype(np.int64)
+    if wrap:
+        total %= 24 * 3600 * scale
+    whole, fraction = np.divmod(total, scale)
+    units, rest = np.divmod(whole, 3600)
+    minutes, seconds = np.divmod(rest, 60)
+    return np.signbit(values), units, minutes, seconds, fraction
+
+
+def format_records(records: EphemerisRecords) -> list[str]:
+    """INS.EPHEM.RECORD lines for ephemeris columns."""
+    utc = records.times.utc
+    year, month, day, hmsf = erfa.d2dtf("UTC", 3, utc.jd1, utc.jd2)
+    mjd = utc.mjd
+    _, ra_h, ra_m, ra_s, ra_f = _sexagesimal(records.ra, 1 / 15, 4, wrap=True)
+    negative, dec_d, dec_m, dec_s, dec_f = _sexagesimal(records.dec, 1, 3, wrap=False)
+    sign = np.where(negative & ((dec_d + dec_m + dec_s + dec_f) > 0), "-", "")
+    columns = (
+        year,
+        month,
+        day,
+        hmsf["h"],
+        hmsf["m"],
+        hmsf["s"],
+        hmsf["f"],
+        np.atleast_1d(mjd),
+        ra_h,
+        ra_m,
+        ra_s,
+        ra_f,
+        sign,
+        dec_d,
+        dec_m,
+        dec_s,
+        dec_f,
+        records.ra_rate,
+        records.dec_rate,
+        records.magnitude,
+        records.slit_pa,
+    )
+    template = (
+        'INS.EPHEM.RECORD          "%04d-%02d-%02dT%02d:%02d:%02d.%03d, %.11f, '
+        '%02d %02d %02d.%04d, %s%02d %02d %02d.%03d, %.8f, %.8f, %.4f, %.3f, *" ;'
+    )
+    return [template % row for row in zip(*(c.tolist() for c in columns))]
+
+
+def format_ephemeris(records: EphemerisRecords, name: str = "") -> str:
+    """ESO PAF ephemeris text for ephemeris columns."""
+    if len(records) < MIN_RECORDS:
+        raise ValueError(f"ESO ephemerides need at least {MIN_RECORDS} records")
+    header = [
+        "PAF.HDR.START             ; # Start of PAF Header",
+        'PAF.TYPE                  "Instrument Setup" ; # Type of PAF',
+        'PAF.ID                    "" ; # ID for PAF',
+        f'PAF.NAME                  "{name}" ; # Name of PAF',
+        'PAF.DESC                  "Ephemeris / aeonlib" ;',
+        'PAF.CRTE.NAME             "aeonlib" ; # Name of creator',
+        "PAF.HDR.END               ; # End of PAF Header",
+        "#",
+        "# Date & Time (UT), MJD, RA (J2000), Dec (J2000),"
+        ' dRA ("/s), dDEC ("/s), V-mag, Slit PA',
+    ]
+    return "\n".join(header + format_records(records)) + "\n"
+
+
+def generate_ephemerides(
+    targets: Sequence[NonSiderealTarget],
+    times: astropy.time.Time,
+    site: EarthLocation | str | None = "paranal",
+    **kwargs,
+) -> list[Ephemeris]:
+    """Ephemeris files, ready for EsoFacility.save_ephemeris, of many targets.
+    See compute_ephemerides for the arguments."""
+    return [
+        Ephemeris(text=format_ephemeris(records, name=target.name))
+        for target, records in zip(
+            targets, compute_ephemerides(targets, times, site=site, **kwargs)
+        )
+    ]
+
+
+def parse_ephemeris(text: str) -> EphemerisRecords:
+    """Load the records of an ESO PAF ephemeris into arrays."""
+    records = _RECORD.findall(text)
+    if not records:
+        raise ValueError("No INS.EPHEM.RECORD found in ephemeris")
+    fields = np.array([r.split(",")[:8] for r in records], dtype=object)
+    ra = np.array(" ".join(fields[:, 2]).replace(":", " ").split(), dtype=float)
+    dec = np.array(" ".join(fields[:, 3]).replace(":", " ").split(), dtype=float)
+    ra, dec = ra.reshape(-1, 3), dec.reshape(-1, 3)
+    negative = np.char.startswith(np.char.strip(fields[:, 3].astype(str)), "-")
+    dec_degrees = np.abs(dec[:, 0]) + dec[:, 1] / 60 + dec[:, 2] / 3600
+    numbers = fields[:, [1, 4, 5, 6, 7]].astype(float)
+    return EphemerisRecords(
+        times=astropy.time.Time(numbers[:, 0], format="mjd", scale="utc"),
+        ra=(ra[:, 0] + ra[:, 1] / 60 + ra[:, 2] / 3600) * 15,
+        dec=np.where(negative, -dec_degrees, dec_degrees),
+        ra_rate=numbers[:, 1],
+        dec_rate=numbers[:, 2],
+        magnitude=numbers[:, 3],
+        slit_pa=numbers[:, 4],
+    )
@@ -1,18 +1,26 @@
+import json
 import logging
 import tempfile
-from typing import BinaryIO
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Iterable, Iterator, Self
 
+from aeonlib import metrics
 from aeonlib.conf import settings as default_settings
 from aeonlib.exceptions import ServiceNetworkError
 
 from .models import (
     AbsoluteTimeConstraints,
     Container,
+    ContainerItems,
     Ephemeris,
+    EsoModel,
     ObservationBlock,
     SiderealTimeConstraints,
     Template,
 )
+from .signatures import SignatureCache, TemplateSignature
 
 logger = logging.getLogger(__name__)
 
@@ -22,23 +30,146 @@ except ImportError as e:
     logger.critical("p2api not found. Install the 'eso' dependency group for Aeonlib.")
     raise e
 
+from .sessions import SessionKey, sessions  # noqa: E402
+
 
 class ESONetworkError(ServiceNetworkError):
     pass
 
 
+def _json_size(value: Any) -> int:
+    return len(json.dumps(value, default=str)) if value is not None else 0
+
+
+@dataclass
+class Verification:
+    """Outcome of verifying one observation block"""
+
+    ob_id: int
+    observable: bool = False
+    messages: list[str] = field(default_factory=list)
+    """Verification messages, empty when the observation block is observable"""
+    error: ESONetworkError | None = None
+    """Set when the verification call itself failed"""
+
+
+@dataclass
+class VerificationReport:
+    """Verifications of many observation blocks, by OB id"""
+
+    results: dict[int, Verification] = field(default_factory=dict)
+
+    @classmethod
+    def collect(cls, verifications: Iterable[Verification]) -> "VerificationReport":
+        return cls({v.ob_id: v for v in verifications})
+
+    @property
+    def observable(self) -> list[int]:
+        return [ob_id for ob_id, v in self.results.items() if v.observable]
+
+    @property
+    def messages(self) -> dict[int, list[str]]:
+        """Messages of every OB that is not observable"""
+        return {ob_id: v.messages for ob_id, v in self.results.items() if v.messages}
+
+    @property
+    def errors(self) -> dict[int, ESONetworkError]:
+        return {
+            ob_id: v.error for ob_id, v in self.results.items() if v.error is not None
+        }
+
+    def summary(self) -> str:
+        lines = [
+            f"{len(self.observable)} of {len(self.results)} observation blocks"
+            " observable"
+        ]
+        for ob_id, messages in self.messages.items():
+            lines.extend(f"{ob_id}: {message}" for message in messages)
+        for ob_id, error in self.errors.items():
+            lines.append(f"{ob_id}: {error} ({error.__cause__})")
+        return "\n".join(lines)
+
+
 class EsoFacility:
-    def __init__(self, settings=default_settings):
-        self.api = p2api.ApiConnection(
-            settings.eso_environment,
-            settings.eso_username,
-            settings.eso_password,
-            debug=True,
-        )
+    """
+    European Southern Observatory Phase 2 Facility
+    Configuration:
+        - AEON_ESO_ENVIRONMENT: p2api environment, e.g. "demo" or "production"
+        - AEON_ESO_USERNAME: ESO user portal username
+        - AEON_ESO_PASSWORD: ESO user portal password
+        - AEON_ESO_DEBUG: print every p2api request and response
+        - AEON_ESO_SIGNATURE_CACHE: directory to keep template signatures in
+    Logged in connections are pooled per environment and username and shared
+    between facilities, see aeonlib.eso.sessions. Use the facility as a context
+    manager, or call close(), to release its connection. An existing
+    ApiConnection, or an aeonlib.eso.standin.P2StandIn, can be passed as api to
+    skip the pool.
+    """
+
+    def __init__(self, settings=default_settings, api=None):
+        self._session_key: SessionKey | None = None
+        if api is None:
+            api = sessions.acquire(settings)
+            self._session_key = sessions.key(settings)
+        self.api = api
+        self.signatures = SignatureCache(self, settings.eso_signature_cache or None)
+        """Template signatures used to check parameters before they are sent"""
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release this facility's connection back to the shared pool."""
+        if self._session_key is not None:
+            sessions.release(self._session_key)
+            self._session_key = None
+
+    def _invoke(self, method: str, *args) -> Any:
+        try:
+            return getattr(self.api, method)(*args)
+        except p2api.P2Error as e:
+            # An expired access token of a pooled connection is renewed once
+            if self._session_key is None or not e.args or e.args[0] != 401:
+                raise
+            self.api = sessions.refresh(self._session_key, self.api)
+            return getattr(self.api, method)(*args)
+
+    def _call(self, method: str, *args) -> Any:
+        """Call a p2api ApiConnection method, reporting it to the aeonlib.metrics
+        hooks if any are registered."""
+        if not metrics.hooks:
+            return self._invoke(method, *args)
+        start = time.perf_counter()
+        result, status = None, "ok"
+        try:
+            result = self._invoke(method, *args)
+            return result
+        except p2api.P2Error as e:
+            # P2Error arguments are (status, method, url, message)
+            status = e.args[0] if e.args else "error"
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            metrics.emit(
+                metrics.CallEvent(
+                    facility="eso",
+                    method="p2api",
+                    endpoint=method,
+                    payload_bytes=_json_size(args),
+                    response_bytes=_json_size(result),
+                    latency=time.perf_counter() - start,
+                    status=status,
+                )
+            )
 
     def create_folder(self, container_id: int, name: str) -> Container:
         try:
-            container, version = self.api.createFolder(container_id, name)
+            container, version = self._call("createFolder", container_id, name)
             assert container and version
         except Exception as e:
             raise ESONetworkError("Failed to create ESO folder") from e
@@ -48,7 +179,7 @@ class EsoFacility:
 
     def get_container(self, container_id: int) -> Container:
         try:
-            container, version = self.api.getContainer(container_id)
+            container, version = self._call("getContainer", container_id)
             assert container and version
         except Exception as e:
             raise ESONetworkError("Failed to get ESO container") from e
@@ -56,15 +187,28 @@ class EsoFacility:
 
         return Container.model_validate({**container, "version": version})
 
+    def get_items(self, container_id: int) -> ContainerItems:
+        """The containers and observation blocks inside a container, in order."""
+        try:
+            items, version = self._call("getItems", container_id)
+            assert items is not None and version
+        except Exception as e:
+            raise ESONetworkError("Failed to get ESO container items") from e
+        logger.debug("<- %s (%s)", items, version)
+
+        return ContainerItems.model_validate(
+            {"container_id": container_id, "items": items, "version": version}
+        )
+
     def delete_container(self, container: Container) -> None:
         try:
-            self.api.deleteContainer(container.container_id, container.version)
+            self._call("deleteContainer", container.container_id, container.version)
         except Exception as e:
             raise ESONetworkError("Failed to delete ESO container") from e
 
     def create_ob(self, container: Container, name: str) -> ObservationBlock:
         try:
-            ob, version = self.api.createOB(container.container_id, name)
+            ob, version = self._call("createOB", container.container_id, name)
             assert ob and version
         except Exception as e:
             raise ESONetworkError("Failed to create ESO observation block") from e
@@ -74,7 +218,7 @@ class EsoFacility:
 
     def get_ob(self, ob_id: int) -> ObservationBlock:
         try:
-            ob, version = self.api.getOB(ob_id)
+            ob, version = self._call("getOB", ob_id)
             assert ob and version
         except Exception as e:
             raise ESONetworkError("Failed to get ESO observation block") from e
@@ -82,11 +226,20 @@ class EsoFacility:
 
         return ObservationBlock.model_validate({**ob, "version": version})
 
-    def save_ob(self, ob: ObservationBlock) -> ObservationBlock:
+    def save_ob(self, ob: ObservationBlock, force: bool = False) -> ObservationBlock:
+        """Save an observation block. Unless force is set, nothing is sent if the
+        OB has not changed since it was loaded and the OB itself is returned.
+        Otherwise the whole OB is sent, not only its changed fields, and a new
+        ObservationBlock with the saved state and version is returned. The given
+        one is left as it was, so callers should always continue with the
+        returned OB."""
+        if not force and not ob.is_dirty:
+            logger.debug("OB %s is unchanged, not saving", ob.ob_id)
+            return ob
         ob_dict = ob.model_dump(exclude={"version"})
         logger.debug("-> %s", ob_dict)
         try:
-            new_ob_dict, version = self.api.saveOB(ob_dict, ob.version)
+            new_ob_dict, version = self._call("saveOB", ob_dict, ob.version)
             assert new_ob_dict and version
         except Exception as e:
             raise ESONetworkError("Failed to update ESO observation block") from e
@@ -96,13 +249,13 @@ class EsoFacility:
 
     def delete_ob(self, ob: ObservationBlock) -> None:
         try:
-            self.api.deleteOB(ob.ob_id, ob.version)
+            self._call("deleteOB", ob.ob_id, ob.version)
         except Exception as e:
             raise ESONetworkError("Failed to delete ESO observation block") from e
 
     def create_template(self, ob: ObservationBlock, name: str) -> Template:
         try:
-            template, version = self.api.createTemplate(ob.ob_id, name)
+            template, version = self._call("createTemplate", ob.ob_id, name)
             assert template and version
         except Exception as e:
             raise ESONetworkError("Failed to create ESO template") from e
@@ -112,13 +265,15 @@ class EsoFacility:
 
     def delete_template(self, ob: ObservationBlock, template: Template) -> None:
         try:
-            self.api.deleteTemplate(ob.ob_id, template.template_id, template.version)
+            self._call(
+                "deleteTemplate", ob.ob_id, template.template_id, template.version
+            )
         except Exception as e:
             raise ESONetworkError("Failed to delete ESO template") from e
 
     def get_template(self, ob: ObservationBlock, template_id: str) -> Template:
         try:
-            template_dict, version = self.api.getTemplate(ob.ob_id, template_id)
+            template_dict, version = self._call("getTemplate", ob.ob_id, template_id)
             assert template_dict and version
         except Exception as e:
             raise ESONetworkError("Failed to get ESO template") from e
@@ -127,19 +282,36 @@ class EsoFacility:
         return Template.model_validate({**template_dict, "version": version})
 
     def update_template_params(
-        self, ob: ObservationBlock, template: Template, params: dict
+        self,
+        ob: ObservationBlock,
+        template: Template,
+        params: dict,
+        validate: bool = False,
     ) -> Template:
         """
         This method simply updates the parameter dictionary in the template object and saves it.
         Alternatively, one can simply update the Template object directly and use
         `save_template` to save the changes.
         This method is included for consistency with the ESO client library.
+        If validate is set, params are first checked against the template's
+        signature (see aeonlib.eso.signatures), raising a pydantic ValidationError
+        without calling the API if any is invalid. If the signature cannot be
+        fetched, params are sent unvalidated and a warning is logged.
         """
+        if validate:
+            try:
+                params = self.signatures.validate(ob, template.template_name, params)
+            except ESONetworkError:
+                logger.warning(
+                    "No signature for template %s, sending parameters unvalidated",
+                    template.template_name,
+                    exc_info=True,
+                )
         template_dict = template.model_dump(exclude={"version"})
         logger.debug("-> %s (params: %s)", template_dict, params)
         try:
-            new_template, version = self.api.setTemplateParams(
-                ob.ob_id, template_dict, params, template.version
+            new_template, version = self._call(
+                "setTemplateParams", ob.ob_id, template_dict, params, template.version
             )
             assert new_template and version
         except Exception as e:
@@ -148,12 +320,47 @@ class EsoFacility:
 
         return Template.model_validate({**new_template, "version": version})
 
-    def save_template(self, ob: ObservationBlock, template: Template) -> Template:
+    def get_template_signature(
+        self, instrument: str, ip_version: str, template_name: str
+    ) -> TemplateSignature:
+        try:
+            signature, _ = self._call(
+                "getTemplateSignature", instrument, ip_version, template_name
+            )
+            assert signature
+        except Exception as e:
+            raise ESONetworkError("Failed to get ESO template signature") from e
+        logger.debug("<- %s", signature)
+
+        return TemplateSignature.model_validate(signature)
+
+    def get_template_signatures(
+        self, instrument: str, ip_version: str
+    ) -> list[TemplateSignature]:
+        try:
+            signatures, _ = self._call("getTemplateSignatures", instrument, ip_version)
+            assert signatures is not None
+        except Exception as e:
+            raise ESONetworkError("Failed to get ESO template signatures") from e
+        logger.debug("<- %d template signatures", len(signatures))
+
+        return [TemplateSignature.model_validate(s) for s in signatures]
+
+    def save_template(
+        self, ob: ObservationBlock, template: Template, force: bool = False
+    ) -> Template:
+        """Save a template. Unless force is set, nothing is sent if the template
+        has not changed since it was loaded and the template itself is returned.
+        Otherwise the whole template is sent and a new Template is returned, as
+        for save_ob."""
+        if not force and not template.is_dirty:
+            logger.debug("Template %s is unchanged, not saving", template.template_id)
+            return template
         template_dict = template.model_dump(exclude={"version"})
         logger.debug("-> %s", template_dict)
         try:
-            new_template, version = self.api.saveTemplate(
-                ob.ob_id, template_dict, template.version
+            new_template, version = self._call(
+                "saveTemplate", ob.ob_id, template_dict, template.version
             )
             assert new_template and version
         except Exception as e:
@@ -162,11 +369,62 @@ class EsoFacility:
 
         return Template.model_validate({**new_template, "version": version})
 
+    def flush(
+        self,
+        items: Iterable[ObservationBlock | tuple[ObservationBlock, Template]],
+        max_workers: int = 8,
+    ) -> int:
+        """
+        Save every changed observation block and template concurrently.
+
+        Saved models are updated in place with the saved state and new version,
+        and marked clean. Unchanged models are skipped without a call. If any save
+        fails, the others still complete, the failed models keep their changes and
+        an ExceptionGroup of the ESONetworkErrors is raised.
+
+        Args:
+            items: Observation blocks, and (observation block, template) pairs.
+            max_workers: Maximum number of concurrent saves.
+
+        Returns:
+            int: Number of models saved.
+        """
+
+        def save(item: ObservationBlock | tuple[ObservationBlock, Template]) -> None:
+            if isinstance(item, tuple):
+                ob, model = item
+                saved: EsoModel = self.save_template(ob, model, force=True)
+            else:
+                model = item
+                saved = self.save_ob(model, force=True)
+            for name in type(saved).model_fields:
+                value = getattr(saved, name)
+                if getattr(model, name) != value:
+                    setattr(model, name, value)
+            model.mark_clean()
+
+        dirty = [
+            item
+            for item in items
+            if (item[1] if isinstance(item, tuple) else item).is_dirty
+        ]
+        errors = []
+        with ThreadPoolExecutor(max_workers) as executor:
+            for future in [executor.submit(save, item) for item in dirty]:
+                if future.exception():
+                    errors.append(future.exception())
+        if errors:
+            raise ExceptionGroup(
+                f"Failed to save {len(errors)} of {len(dirty)} ESO models", errors
+            )
+        logger.debug("Flushed %d changed ESO models", len(dirty))
+        return len(dirty)
+
     def get_absolute_time_constraints(
         self, ob: ObservationBlock
     ) -> AbsoluteTimeConstraints:
         try:
-            constraints, version = self.api.getAbsoluteTimeConstraints(ob.ob_id)
+            constraints, version = self._call("getAbsoluteTimeConstraints", ob.ob_id)
             assert constraints is not None and version is not None
         except Exception as e:
             raise ESONetworkError("Failed to get ESO absolute time constraints") from e
@@ -185,8 +443,11 @@ class EsoFacility:
         constraints_dict = constraints.model_dump(mode="json", exclude={"version"})
         logger.debug("-> %s", constraints_dict)
         try:
-            new_constraints, version = self.api.saveAbsoluteTimeConstraints(
-                ob.ob_id, constraints_dict["constraints"], constraints.version
+            new_constraints, version = self._call(
+                "saveAbsoluteTimeConstraints",
+                ob.ob_id,
+                constraints_dict["constraints"],
+                constraints.version,
             )
             assert new_constraints and version
         except Exception as e:
@@ -201,7 +462,7 @@ class EsoFacility:
         self, ob: ObservationBlock
     ) -> SiderealTimeConstraints:
         try:
-            constraints, version = self.api.getSiderealTimeConstraints(ob.ob_id)
+            constraints, version = self._call("getSiderealTimeConstraints", ob.ob_id)
             assert constraints is not None and version is not None
         except Exception as e:
             raise ESONetworkError("Failed to get ESO sidereal time constraints") from e
@@ -220,8 +481,11 @@ class EsoFacility:
         constraints_dict = constraints.model_dump(mode="json", exclude={"version"})
         logger.debug("-> %s", constraints_dict)
         try:
-            new_constraints, version = self.api.saveSiderealTimeConstraints(
-                ob.ob_id, constraints_dict["constraints"], constraints.version
+            new_constraints, version = self._call(
+                "saveSiderealTimeConstraints",
+                ob.ob_id,
+                constraints_dict["constraints"],
+                constraints.version,
             )
             assert new_constraints and version
         except Exception as e:
@@ -238,7 +502,7 @@ class EsoFacility:
         """
         with tempfile.NamedTemporaryFile() as temp_file:
             try:
-                _, version = self.api.getEphemerisFile(ob.ob_id, temp_file.name)
+                _, version = self._call("getEphemerisFile", ob.ob_id, temp_file.name)
                 assert version
             except Exception as e:
                 raise ESONetworkError("Failed to get ESO ephemeris file") from e
@@ -256,22 +520,22 @@ class EsoFacility:
             temp_file.flush()
             logger.debug("Saved ephemeris file to %s", temp_file.name)
             try:
-                _, version = self.api.saveEphemerisFile(
-                    ob.ob_id, temp_file.name, ephemeris.version
+                _, version = self._call(
+                    "saveEphemerisFile", ob.ob_id, temp_file.name, ephemeris.version
                 )
                 assert version
             except Exception as e:
                 raise ESONetworkError("Failed to save ESO ephemeris file") from e
             logger.debug("<- %s", version)
 
-            return Ephemeris(text=temp_file.read().decode(), version=version)
+            return Ephemeris(text=ephemeris.text, version=version)
 
     def delete_ephemeris(self, ob: ObservationBlock, ephemeris: Ephemeris) -> None:
         """Delete an ephemeris file from the ESO api.
         Note that the epemeris text does not need to be populated here, we
         only need the version."""
         try:
-            _, version = self.api.deleteEphemerisFile(ob.ob_id, ephemeris.version)
+            _, version = self._call("deleteEphemerisFile", ob.ob_id, ephemeris.version)
         except Exception as e:
             raise ESONetworkError("Failed to delete ESO ephemeris file") from e
         logger.debug("<- %s", version)
@@ -286,14 +550,14 @@ class EsoFacility:
             temp_file.flush()
             logger.debug("Saved finding chart to %s", temp_file.name)
             try:
-                self.api.addFindingChart(ob.ob_id, temp_file.name)
+                self._call("addFindingChart", ob.ob_id, temp_file.name)
             except Exception as e:
                 raise ESONetworkError("Failed to add ESO finding chart") from e
 
     def get_finding_chart_names(self, ob: ObservationBlock) -> list[str]:
         """Get a list of all finding chart names"""
         try:
-            names, _ = self.api.getFindingChartNames(ob.ob_id)
+            names, _ = self._call("getFindingChartNames", ob.ob_id)
             assert names
         except Exception as e:
             raise ESONetworkError("Failed to get finding chart names") from e
@@ -304,7 +568,7 @@ class EsoFacility:
     def delete_finding_chart(self, ob: ObservationBlock, index: int) -> None:
         """Delete a finding chart from the ESO api."""
         try:
-            self.api.deleteFindingChart(ob.ob_id, index)
+            self._call("deleteFindingChart", ob.ob_id, index)
         except Exception as e:
             raise ESONetworkError("Failed to delete ESO finding chart") from e
 
@@ -316,8 +580,11 @@ class EsoFacility:
         Returns:
             tuple[list[str], bool]: A tuple of error messages and success indicator.
         """
+        return self._verify(ob.ob_id, submit)
+
+    def _verify(self, ob_id: int, submit: bool) -> tuple[list[str], bool]:
         try:
-            response, _ = self.api.verifyOB(ob.ob_id, submit)
+            response, _ = self._call("verifyOB", ob_id, submit)
             assert response
         except Exception as e:
             raise ESONetworkError("Failed to verify ESO observation block") from e
@@ -326,3 +593,41 @@ class EsoFacility:
             return [], True
         else:
             return response.get("messages", []), False
+
+    def verify_many(
+        self,
+        obs: Iterable[ObservationBlock | int],
+        submit: bool,
+        max_workers: int = 8,
+    ) -> Iterator[Verification]:
+        """
+        Verify many observation blocks concurrently.
+
+        Verifications are yielded as they finish, not in the order of obs. A
+        failed call is reported in its Verification's error and does not stop the
+        others. Collect the results with VerificationReport.collect for a report
+        of every OB's messages. Closing the iterator early cancels the
+        verifications not yet started.
+
+        Args:
+            obs: Observation blocks, or their ids.
+            submit: Whether to change the status of observable blocks to defined or
+                executable, see verify.
+            max_workers: Maximum number of concurrent verifications.
+        """
+
+        def verify(ob_id: int) -> Verification:
+            try:
+                messages, observable = self._verify(ob_id, submit)
+            except ESONetworkError as e:
+                return Verification(ob_id, error=e)
+            return Verification(ob_id, observable=observable, messages=messages)
+
+        ob_ids = [ob if isinstance(ob, int) else ob.ob_id for ob in obs]
+        executor = ThreadPoolExecutor(max_workers)
+        try:
+            futures = [executor.submit(verify, ob_id) for ob_id in ob_ids]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            executor.shutdown(cancel_futures=True)
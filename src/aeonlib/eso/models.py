@@ -1,17 +1,81 @@
+import copy
 from datetime import datetime, time
-from typing import Any, Self
+from typing import Any, ClassVar, Self, get_origin
 
 from astropy.coordinates import Angle
-from pydantic import BaseModel, ConfigDict, Field
+from astropy.time import Time as AstropyTime
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, model_validator
 from pydantic.alias_generators import to_camel
 
 from aeonlib.models import SiderealTarget, Window
 
 
 class EsoModel(BaseModel):
+    """
+    Base of the p2api models. Models keep a snapshot of their fields as they
+    were loaded, so that saving an unchanged model can be skipped. A field has
+    changed if it differs from the snapshot, so setting a field back to its
+    loaded value undoes the change. List and dict fields are snapshotted as
+    copies to catch changes made in place, and nested models report their own
+    changes. The version is not a tracked field. Equality only compares fields,
+    not the snapshot.
+    """
+
     model_config = ConfigDict(
         alias_generator=to_camel, validate_by_name=True, serialize_by_alias=True
     )
+    _loaded: dict[str, Any] | None = PrivateAttr(default=None)
+    _mutable_fields: ClassVar[frozenset[str]] = frozenset()
+    """List and dict fields, which can be changed without an assignment"""
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+        cls._mutable_fields = frozenset(
+            name
+            for name, field in cls.model_fields.items()
+            if get_origin(field.annotation) in (list, dict)
+        )
+
+    def model_post_init(self, context: Any) -> None:
+        self._snapshot()
+
+    def _snapshot(self) -> None:
+        self._loaded = {
+            name: copy.deepcopy(value) if name in self._mutable_fields else value
+            for name, value in self.__dict__.items()
+            if name != "version"
+        }
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, BaseModel):
+            return NotImplemented
+        return type(self) is type(other) and self.__dict__ == other.__dict__
+
+    def changed_fields(self) -> set[str]:
+        """Fields that differ from when the model was loaded or last marked
+        clean."""
+        loaded = self._loaded or {}
+        changed = set()
+        for name, value in self.__dict__.items():
+            if name == "version":
+                continue
+            if (isinstance(value, EsoModel) and value.is_dirty) or (
+                name not in loaded or value != loaded[name]
+            ):
+                changed.add(name)
+        return changed
+
+    @property
+    def is_dirty(self) -> bool:
+        return bool(self.changed_fields())
+
+    def mark_clean(self) -> None:
+        """Forget all changes, e.g. after the model was saved."""
+        for value in self.__dict__.values():
+            if isinstance(value, EsoModel):
+                value.mark_clean()
+        self._snapshot()
 
 
 class Constraints(EsoModel):
@@ -75,6 +139,23 @@ class ObservationBlock(EsoModel):
     parent_container_id: int
     run_id: int
     user_priority: int
+    _ip_version_text: str | None = PrivateAttr(default=None)
+
+    @model_validator(mode="wrap")
+    @classmethod
+    def _keep_ip_version_text(cls, data: Any, handler) -> Self:
+        ob = handler(data)
+        if isinstance(data, dict):
+            raw = data.get("ipVersion", data.get("ip_version"))
+            if isinstance(raw, str):
+                ob._ip_version_text = raw.strip()
+        return ob
+
+    @property
+    def ip_version_text(self) -> str:
+        """The instrument package version as the API returned it. Versions are
+        strings such as "110.10", which the float field reads as 110.1."""
+        return self._ip_version_text or str(self.ip_version)
 
 
 class Container(EsoModel):
@@ -87,17 +168,45 @@ class Container(EsoModel):
     version: str
 
 
+class Item(EsoModel):
+    """A container or observation block listed inside a container"""
+
+    item_type: str
+    name: str
+    container_id: int | None = None
+    """Set for containers (Folder, Group, Concatenation, TimeLink)"""
+    ob_id: int | None = None
+    """Set for observation and calibration blocks"""
+    ob_status: str | None = None
+    user_priority: int | None = None
+
+    @property
+    def is_container(self) -> bool:
+        return self.container_id is not None
+
+
+class ContainerItems(EsoModel):
+    container_id: int
+    items: list[Item]
+    version: str | None = None
+
+
 class Template(EsoModel):
     template_id: int
     template_name: str
     type: str
     parameters: list[dict[str, Any]]
-    """
-    TODO: see if we can auto-generate these somehow
-    """
+    """Parameter names, types and values. Their allowed values are described by the
+    template's signature, see aeonlib.eso.signatures"""
     version: str
 
 
+def _utc_datetime(value: AstropyTime | datetime) -> datetime:
+    if isinstance(value, AstropyTime):
+        return value.utc.datetime  # type: ignore
+    return value
+
+
 # TODO figure out how to use a general Window class for these constraints
 class AbsoluteTimeConstraint(EsoModel):
     # Fields are aliased due to from being a reserved keyword in Python
@@ -108,8 +217,7 @@ class AbsoluteTimeConstraint(EsoModel):
     def construct_from(cls, window: Window) -> Self:
         if not window.start:
             raise ValueError("ESO constraints require a valid start time")
-        else:
-            return cls.model_validate(window.model_dump(mode="json"))
+        return cls(start=_utc_datetime(window.start), end=_utc_datetime(window.end))
 
 
 class AbsoluteTimeConstraints(EsoModel):
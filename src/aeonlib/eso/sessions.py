@@ -0,0 +1,154 @@
+"""
+Process-wide registry of authenticated p2api connections.
+
+Creating a p2api.ApiConnection logs in to the ESO user portal. Facilities using the
+same environment, username, password and debug flag share a single connection, and
+so a single login and its HTTP session, instead of each logging in again.
+
+Example:
+    with EsoFacility() as a, EsoFacility() as b:
+        assert a.api is b.api
+"""
+
+import atexit
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+import p2api
+
+logger = logging.getLogger(__name__)
+
+SessionKey = tuple[str, str, str, bool]
+"""Environment, username, password digest and debug flag of a connection"""
+
+
+@dataclass
+class _PooledSession:
+    api: Any
+    password: str
+    debug: bool
+    users: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    """Held while logging in, so only one thread logs in for a given key"""
+
+
+def _close(api: Any) -> None:
+    session = getattr(api, "session", None)
+    if session is not None:
+        session.close()
+
+
+class SessionRegistry:
+    """
+    Thread safe registry of p2api connections keyed by environment, username,
+    password and debug flag.
+
+    Connections are created on first use, with debug output only if AEON_ESO_DEBUG
+    is set, and stay pooled after their last user releases them. When the access
+    token of a connection expires, refresh() logs in again once for all of its
+    users. Use close_idle() to close connections no longer in use, or close() to
+    close every connection. All connections are closed at interpreter exit.
+
+    Parameters:
+        connect (Callable): Creates a logged in connection from an environment,
+            username, password and debug flag. Defaults to p2api.ApiConnection.
+    """
+
+    def __init__(self, connect: Callable[..., Any] | None = None):
+        self._connect = connect or p2api.ApiConnection
+        self._lock = threading.Lock()
+        self._sessions: dict[SessionKey, _PooledSession] = {}
+
+    @staticmethod
+    def key(settings) -> SessionKey:
+        # The password is part of the key so that a connection is only shared
+        # with settings that could have logged it in. Only its digest is kept
+        digest = hashlib.sha256(settings.eso_password.encode()).hexdigest()
+        return (
+            settings.eso_environment,
+            settings.eso_username,
+            digest,
+            bool(settings.eso_debug),
+        )
+
+    def _login(self, key: SessionKey, password: str, debug: bool) -> Any:
+        environment, username = key[:2]
+        logger.debug("Logging in to ESO %s as %s", environment, username)
+        return self._connect(environment, username, password, debug=debug)
+
+    def acquire(self, settings) -> Any:
+        """Get the shared connection for the settings' environment, username,
+        password and debug flag, logging in if needed."""
+        key = self.key(settings)
+        with self._lock:
+            pooled = self._sessions.get(key)
+            if pooled is None:
+                pooled = _PooledSession(None, settings.eso_password, settings.eso_debug)
+                self._sessions[key] = pooled
+            pooled.users += 1
+        # Log in outside the registry lock so other keys are not held up
+        try:
+            with pooled.lock:
+                if pooled.api is None:
+                    pooled.api = self._login(key, pooled.password, pooled.debug)
+                return pooled.api
+        except Exception:
+            with self._lock:
+                pooled.users -= 1
+                if pooled.api is None and self._sessions.get(key) is pooled:
+                    del self._sessions[key]
+            raise
+
+    def refresh(self, key: SessionKey, stale: Any) -> Any:
+        """
+        Log in again after the access token of a connection has expired.
+
+        Args:
+            key: The connection's key, see key().
+            stale: The connection whose token was rejected.
+
+        Returns:
+            A connection with a valid token. If another user already refreshed
+            the stale connection, theirs is returned without logging in again.
+        """
+        with self._lock:
+            pooled = self._sessions.get(key)
+        if pooled is None:
+            raise KeyError(f"No ESO session for {key[1]} on {key[0]}")
+        with pooled.lock:
+            if pooled.api is stale:
+                logger.info("ESO session for %s expired, logging in again", key[1])
+                # The stale connection is left open, other facilities may
+                # still be using it until their next call is rejected
+                pooled.api = self._login(key, pooled.password, pooled.debug)
+            return pooled.api
+
+    def release(self, key: SessionKey) -> None:
+        """Signal that a facility is done with the connection for a key. Unknown
+        keys are ignored."""
+        with self._lock:
+            pooled = self._sessions.get(key)
+            if pooled is not None:
+                pooled.users = max(pooled.users - 1, 0)
+
+    def close_idle(self) -> None:
+        """Close and forget all connections that have no users."""
+        with self._lock:
+            for key, pooled in list(self._sessions.items()):
+                if pooled.users == 0:
+                    _close(pooled.api)
+                    del self._sessions[key]
+
+    def close(self) -> None:
+        """Close and forget every connection, including ones still in use."""
+        with self._lock:
+            for pooled in self._sessions.values():
+                _close(pooled.api)
+            self._sessions.clear()
+
+
+sessions = SessionRegistry()
+atexit.register(sessions.close)
@@ -0,0 +1,210 @@
+"""
+ESO template signatures and client-side validation of template parameters.
+
+A template signature lists the parameters of a template with their types,
+defaults and allowed values. SignatureCache fetches each signature once per
+instrument package version, optionally keeping it on disk, and builds a pydantic
+model of the template's parameters from it. Parameter updates can then be checked
+locally instead of being sent for the server to reject.
+
+codegen/eso/generator.py renders the same models as Python source.
+
+Example:
+    cache = SignatureCache(facility, "~/.cache/aeonlib/eso")
+    params = cache.validate(ob, "UVES_blue_acq_slit", {"INS.DROT.MODE": "SKY"})
+"""
+
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Annotated, Any, Literal
+
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints, create_model
+
+from .models import EsoModel, ObservationBlock
+
+if TYPE_CHECKING:
+    from .facility import EsoFacility
+
+logger = logging.getLogger(__name__)
+
+Coordinate = Annotated[
+    str, StringConstraints(pattern=r"^[+-]?\d{1,3}:\d{2}:\d{2}(\.\d*)?$")
+]
+"""Sexagesimal coordinate, e.g. "-12:30:00.000" """
+
+PARAMETER_TYPES: dict[str, Any] = {
+    "integer": int,
+    "number": float,
+    "string": str,
+    "boolean": bool,
+    "keyword": str,
+    "coord": Coordinate,
+    "file": str,
+    "paramfile": str,
+    "intlist": list[int],
+    "numlist": list[float],
+    "keywordlist": list[str],
+}
+"""Python types of the ESO template parameter types"""
+
+
+class ParameterSignature(EsoModel):
+    name: str
+    """Parameter name, e.g. INS.DROT.MODE"""
+    type: str
+    """One of the PARAMETER_TYPES"""
+    label: str = ""
+    default_value: Any = None
+    allowed_values: list[Any] | None = None
+    """Values a keyword parameter may take"""
+    minimum: float | None = None
+    maximum: float | None = None
+
+    @property
+    def field_name(self) -> str:
+        """Python identifier of the parameter, e.g. ins_drot_mode"""
+        return re.sub(r"\W", "_", self.name).lower()
+
+    def annotation(self) -> Any:
+        if self.allowed_values:
+            literal = Literal[tuple(self.allowed_values)]  # type: ignore
+            return list[literal] if self.type.endswith("list") else literal
+        return PARAMETER_TYPES.get(self.type, Any)
+
+
+class TemplateSignature(EsoModel):
+    template_name: str
+    type: str
+    """acquisition, science or calibration"""
+    parameters: list[ParameterSignature]
+
+
+class TemplateParams(BaseModel):
+    """
+    Base of the parameter models of ESO templates. Fields are aliased to the
+    parameter names, unknown parameters are rejected, and model_dump() only
+    returns the parameters that were set.
+    """
+
+    model_config = ConfigDict(
+        extra="forbid",
+        validate_by_name=True,
+        serialize_by_alias=True,
+        validate_assignment=True,
+    )
+
+    def model_dump(self, **kwargs) -> dict[str, Any]:
+        return super().model_dump(**{"exclude_unset": True, **kwargs})
+
+
+def params_model(signature: TemplateSignature) -> type[TemplateParams]:
+    """Build the parameter model of a template from its signature."""
+    fields: dict[str, Any] = {}
+    for p in signature.parameters:
+        fields[p.field_name] = (
+            p.annotation(),
+            Field(p.default_value, alias=p.name, ge=p.minimum, le=p.maximum),
+        )
+    return create_model(  # type: ignore
+        "".join(part.capitalize() for part in signature.template_name.split("_")),
+        __base__=TemplateParams,
+        **fields,
+    )
+
+
+class SignatureCache:
+    """
+    Template signatures and parameter models, fetched once and kept in memory.
+
+    Parameters:
+        facility (EsoFacility): Facility used to fetch missing signatures.
+        path (str | Path | None): Directory to also keep signatures in, so they
+            survive between processes. Signatures are stored per instrument and
+            instrument package version, which change at most once per period.
+
+    Thread safe, so one cache can serve concurrent updates.
+    """
+
+    def __init__(self, facility: "EsoFacility", path: str | Path | None = None):
+        self.facility = facility
+        self.path = Path(path).expanduser() if path else None
+        self._signatures: dict[tuple[str, str, str], TemplateSignature] = {}
+        self._models: dict[tuple[str, str, str], type[TemplateParams]] = {}
+        self._lock = threading.Lock()
+
+    def _file(self, key: tuple[str, str, str]) -> Path | None:
+        return self.path.joinpath(*key).with_suffix(".json") if self.path else None
+
+    def _store(self, key: tuple[str, str, str], signature: TemplateSignature) -> None:
+        self._signatures[key] = signature
+        if file := self._file(key):
+            file.parent.mkdir(parents=True, exist_ok=True)
+            file.write_text(signature.model_dump_json())
+
+    def signature(
+        self, instrument: str, ip_version: str, template_name: str
+    ) -> TemplateSignature:
+        """A template's signature, from memory, disk or the API in that order."""
+        key = (instrument, ip_version, template_name)
+        with self._lock:
+            if key in self._signatures:
+                return self._signatures[key]
+            file = self._file(key)
+            if file and file.exists():
+                signature = TemplateSignature.model_validate_json(file.read_text())
+                self._signatures[key] = signature
+                return signature
+            signature = self.facility.get_template_signature(*key)
+            self._store(key, signature)
+            return signature
+
+    def prefetch(self, instrument: str, ip_version: str) -> int:
+        """Fetch every template signature of an instrument package in one call.
+        Returns the number of signatures fetched."""
+        signatures = self.facility.get_template_signatures(instrument, ip_version)
+        with self._lock:
+            for signature in signatures:
+                self._store(
+                    (instrument, ip_version, signature.template_name), signature
+                )
+        return len(signatures)
+
+    def model(
+        self, instrument: str, ip_version: str, template_name: str
+    ) -> type[TemplateParams]:
+        """The parameter model of a template."""
+        key = (instrument, ip_version, template_name)
+        model = self._models.get(key)
+        if model is None:
+            model = params_model(self.signature(*key))
+            self._models[key] = model
+        return model
+
+    def validate(
+        self, ob: ObservationBlock, template_name: str, params: dict[str, Any]
+    ) -> dict[str, Any]:
+        """
+        Check parameters of a template of an observation block against its
+        signature.
+
+        Returns:
+            The parameters as the API expects them.
+
+        Raises:
+            pydantic.ValidationError: A parameter is unknown, of the wrong type, or
+                outside its allowed values.
+        """
+        model = self.model(ob.instrument, ob.ip_version_text, template_name)
+        return model.model_validate(params).model_dump(mode="json")
+
+
+def load_signatures(text: str) -> list[TemplateSignature]:
+    """Parse template signatures, as returned by p2api getTemplateSignatures."""
+    data = json.loads(text)
+    return [
+        TemplateSignature.model_validate(s)
+        for s in (data if isinstance(data, list) else [data])
+    ]
@@ -0,0 +1,508 @@
+"""
+In-process stand-in for the ESO p2api ApiConnection, for offline tests and benchmarks.
+
+P2StandIn implements the ApiConnection methods used by EsoFacility against an
+in-memory store. Every object carries a version token that must be passed back
+when it is modified, as with the real API, and a mismatch raises P2Error 412.
+
+Example:
+    api = P2StandIn(latency=0.05)
+    facility = EsoFacility(api=api)
+    folder = facility.create_folder(api.root_container_id, "My folder")
+"""
+
+import copy
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable
+
+from p2api import P2Error
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATE_PARAMETERS: dict[str, list[dict[str, Any]]] = {
+    "acquisition": [
+        {"name": "TEL.GS1.ALPHA", "type": "coord", "value": "00:00:00.000"},
+        {"name": "TEL.GS1.DELTA", "type": "coord", "value": "00:00:00.000"},
+        {"name": "INS.DROT.MODE", "type": "keyword", "value": "ELEV"},
+        {"name": "INS.ADC.MODE", "type": "keyword", "value": "OFF"},
+    ],
+    "science": [
+        {"name": "DET.WIN1.UIT1", "type": "number", "value": 60.0},
+        {"name": "SEQ.NEXPO", "type": "integer", "value": 1},
+    ],
+}
+
+PARAMETER_CONSTRAINTS: dict[str, dict[str, Any]] = {
+    "INS.DROT.MODE": {"allowedValues": ["ELEV", "SKY", "STAT"]},
+    "INS.ADC.MODE": {"allowedValues": ["AUTO", "OFF"]},
+    "DET.WIN1.UIT1": {"minimum": 0, "maximum": 3600},
+    "SEQ.NEXPO": {"minimum": 1, "maximum": 100},
+}
+"""Allowed values of the default template parameters, served in signatures"""
+
+TEMPLATE_NAMES = ["UVES_blue_acq_slit", "UVES_blue_obs_exp"]
+"""Templates listed by getTemplateSignatures"""
+
+
+def template_signature(name: str) -> dict[str, Any]:
+    """Signature of a template, with the default parameters of its kind."""
+    kind = "acquisition" if "_acq" in name else "science"
+    return {
+        "templateName": name,
+        "type": kind,
+        "parameters": [
+            {
+                "name": p["name"],
+                "type": p["type"],
+                "defaultValue": p["value"],
+                **PARAMETER_CONSTRAINTS.get(p["name"], {}),
+            }
+            for p in DEFAULT_TEMPLATE_PARAMETERS[kind]
+        ],
+    }
+
+
+def default_verify(ob: dict, templates: list[dict]) -> list[str]:
+    """Default verification rule, returns a list of problems with an OB."""
+    messages = []
+    if not templates:
+        messages.append("OB must contain at least one template.")
+    if ob["target"]["name"] == "No name":
+        messages.append("Target name must be set.")
+    return messages
+
+
+class P2StandIn:
+    """
+    Fake p2api.ApiConnection holding containers, OBs, templates, time
+    constraints, ephemerides and finding charts in memory.
+
+    Parameters:
+        latency (float): Seconds to sleep in every call, to emulate network latency.
+        instrument (str): Instrument of the run, and of every OB created.
+        root_container_id (int): Container id of the run's top level container.
+        verify_rule (Callable): Returns the list of problems for an OB and its
+            templates. The OB is observable when the list is empty.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        instrument: str = "UVES",
+        root_container_id: int = 1538878,
+        verify_rule: Callable[[dict, list[dict]], list[str]] = default_verify,
+    ):
+        self.latency = latency
+        self.instrument = instrument
+        self.root_container_id = root_container_id
+        self.run_id = 60925301
+        self.verify_rule = verify_rule
+        self.debug = False
+        self.request_count = 0
+        """Total number of calls made, as counted by p2api"""
+        self.call_counts: dict[str, int] = {}
+        self.containers: dict[int, dict] = {}
+        self.obs: dict[int, dict] = {}
+        self.templates: dict[int, dict[int, dict]] = {}
+        self.absolute_time_constraints: dict[int, list[dict]] = {}
+        self.sidereal_time_constraints: dict[int, list[dict]] = {}
+        self.ephemerides: dict[int, str] = {}
+        self.finding_charts: dict[int, list[str]] = {}
+        self._versions: dict[tuple, str] = {}
+        self._version_counter = itertools.count(1)
+        self._ids = itertools.count(root_container_id + 1)
+        self._lock = threading.RLock()
+        self.containers[root_container_id] = {
+            "containerId": root_container_id,
+            "itemCount": 0,
+            "itemType": "Folder",
+            "name": "Run root",
+            "parentContainerId": 0,
+            "runId": self.run_id,
+        }
+        self._bump(("container", root_container_id))
+
+    def _enter(self, method: str) -> None:
+        with self._lock:
+            self.request_count += 1
+            self.call_counts[method] = self.call_counts.get(method, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _bump(self, key: tuple) -> str:
+        version = f'"{next(self._version_counter)}"'
+        self._versions[key] = version
+        return version
+
+    def _check_version(self, key: tuple, version: str | None, method: str) -> None:
+        if key not in self._versions:
+            raise P2Error(404, method, str(key), "not found")
+        if version != self._versions[key]:
+            raise P2Error(412, method, str(key), "version mismatch")
+
+    def _container(self, container_id: int, method: str) -> dict:
+        if container_id not in self.containers:
+            raise P2Error(404, method, f"/containers/{container_id}", "not found")
+        return self.containers[container_id]
+
+    def _ob(self, ob_id: int, method: str) -> dict:
+        if ob_id not in self.obs:
+            raise P2Error(404, method, f"/obsBlocks/{ob_id}", "not found")
+        return self.obs[ob_id]
+
+    def _template(self, ob_id: int, template_id: int, method: str) -> dict:
+        self._ob(ob_id, method)
+        if template_id not in self.templates[ob_id]:
+            raise P2Error(404, method, f"/templates/{template_id}", "not found")
+        return self.templates[ob_id][template_id]
+
+    # Containers
+
+    def createFolder(self, containerId: int, name: str) -> tuple[dict, str]:
+        self._enter("createFolder")
+        with self._lock:
+            parent = self._container(containerId, "createFolder")
+            container_id = next(self._ids)
+            container = {
+                "containerId": container_id,
+                "itemCount": 0,
+                "itemType": "Folder",
+                "name": name,
+                "parentContainerId": containerId,
+                "runId": parent["runId"],
+            }
+            self.containers[container_id] = container
+            parent["itemCount"] += 1
+            self._bump(("container", containerId))
+            version = self._bump(("container", container_id))
+            return copy.deepcopy(container), version
+
+    def getContainer(self, containerId: int) -> tuple[dict, str]:
+        self._enter("getContainer")
+        with self._lock:
+            container = self._container(containerId, "getContainer")
+            return copy.deepcopy(container), self._versions[("container", containerId)]
+
+    def getItems(self, containerId: int) -> tuple[list[dict], str]:
+        self._enter("getItems")
+        with self._lock:
+            self._container(containerId, "getItems")
+            items = [
+                copy.deepcopy(c)
+                for c in self.containers.values()
+                if c["parentContainerId"] == containerId
+            ] + [
+                {
+                    k: ob[k]
+                    for k in ("obId", "itemType", "name", "obStatus", "userPriority")
+                }
+                for ob in self.obs.values()
+                if ob["parentContainerId"] == containerId
+            ]
+            return items, self._versions[("container", containerId)]
+
+    def deleteContainer(self, containerId: int, version: str) -> tuple[None, None]:
+        self._enter("deleteContainer")
+        with self._lock:
+            container = self._container(containerId, "deleteContainer")
+            self._check_version(("container", containerId), version, "deleteContainer")
+            if container["itemCount"]:
+                raise P2Error(409, "DELETE", containerId, "container is not empty")
+            del self.containers[containerId]
+            del self._versions[("container", containerId)]
+            self._remove_item(container["parentContainerId"])
+            return None, None
+
+    def _remove_item(self, container_id: int) -> None:
+        if container_id in self.containers:
+            self.containers[container_id]["itemCount"] -= 1
+            self._bump(("container", container_id))
+
+    # Observation blocks
+
+    def createOB(self, containerId: int, name: str) -> tuple[dict, str]:
+        self._enter("createOB")
+        with self._lock:
+            parent = self._container(containerId, "createOB")
+            ob_id = next(self._ids)
+            ob = {
+                "obId": ob_id,
+                "itemType": "OB",
+                "name": name,
+                "obStatus": "-",
+                "parentContainerId": containerId,
+                "runId": parent["runId"],
+                "instrument": self.instrument,
+                "ipVersion": 110.0,
+                "exposureTime": 0,
+                "executionTime": 0,
+                "userPriority": 1,
+                "migrate": False,
+                "constraints": {
+                    "name": "No name",
+                    "airmass": 2.0,
+                    "fli": 1.0,
+                    "moonDistance": 30,
+                    "seeing": 2.0,
+                    "skyTransparency": "Variable, thin cirrus",
+                    "twilight": 0,
+                    "waterVapour": 30.0,
+                },
+                "obsDescription": {
+                    "name": "No name",
+                    "userComments": "",
+                    "instrumentComments": "",
+                },
+                "target": {
+                    "name": "No name",
+                    "ra": "00:00:00.000",
+                    "dec": "00:00:00.000",
+                    "equinox": "J2000",
+                    "epoch": 2000.0,
+                    "properMotionRa": 0.0,
+                    "properMotionDec": 0.0,
+                    "differentialRa": 0.0,
+                    "differentialDec": 0.0,
+                },
+            }
+            self.obs[ob_id] = ob
+            self.templates[ob_id] = {}
+            self.absolute_time_constraints[ob_id] = []
+            self.sidereal_time_constraints[ob_id] = []
+            self.finding_charts[ob_id] = []
+            for key in ("ob", "atc", "stc", "ephemeris"):
+                self._bump((key, ob_id))
+            parent["itemCount"] += 1
+            self._bump(("container", containerId))
+            return copy.deepcopy(ob), self._versions[("ob", ob_id)]
+
+    def getOB(self, obId: int) -> tuple[dict, str]:
+        self._enter("getOB")
+        with self._lock:
+            return copy.deepcopy(self._ob(obId, "getOB")), self._versions[("ob", obId)]
+
+    def saveOB(self, ob: dict, version: str) -> tuple[dict, str]:
+        self._enter("saveOB")
+        with self._lock:
+            stored = self._ob(ob["obId"], "saveOB")
+            self._check_version(("ob", ob["obId"]), version, "saveOB")
+            read_only = (
+                "itemType",
+                "obId",
+                "obStatus",
+                "ipVersion",
+                "exposureTime",
+                "executionTime",
+            )
+            stored.update(
+                {k: copy.deepcopy(v) for k, v in ob.items() if k not in read_only}
+            )
+            return copy.deepcopy(stored), self._bump(("ob", ob["obId"]))
+
+    def deleteOB(self, obId: int, version: str) -> tuple[None, None]:
+        self._enter("deleteOB")
+        with self._lock:
+            ob = self._ob(obId, "deleteOB")
+            self._check_version(("ob", obId), version, "deleteOB")
+            del self.obs[obId]
+            for store in (
+                self.templates,
+                self.absolute_time_constraints,
+                self.sidereal_time_constraints,
+                self.ephemerides,
+                self.finding_charts,
+            ):
+                store.pop(obId, None)
+            self._remove_item(ob["parentContainerId"])
+            return None, None
+
+    def verifyOB(self, obId: int, submit: bool) -> tuple[dict, None]:
+        self._enter("verifyOB")
+        with self._lock:
+            ob = self._ob(obId, "verifyOB")
+            messages = self.verify_rule(ob, list(self.templates[obId].values()))
+            if not messages:
+                # Verified OBs become (P)artially defined, submitted ones (D)efined
+                ob["obStatus"] = "D" if submit else "P"
+                self._bump(("ob", obId))
+            return {"observable": not messages, "messages": messages}, None
+
+    # Templates
+
+    def createTemplate(self, obId: int, name: str) -> tuple[dict, str]:
+        self._enter("createTemplate")
+        with self._lock:
+            self._ob(obId, "createTemplate")
+            kind = "acquisition" if "_acq" in name else "science"
+            template_id = next(self._ids)
+            template = {
+                "templateId": template_id,
+                "templateName": name,
+                "type": kind,
+                "parameters": copy.deepcopy(DEFAULT_TEMPLATE_PARAMETERS[kind]),
+            }
+            self.templates[obId][template_id] = template
+            self._bump(("ob", obId))
+            version = self._bump(("template", template_id))
+            return copy.deepcopy(template), version
+
+    def getTemplateSignature(
+        self, instrument: str, ipVersion: str, templateName: str
+    ) -> tuple[dict, None]:
+        self._enter("getTemplateSignature")
+        self._instrument_package(instrument, "getTemplateSignature")
+        return template_signature(templateName), None
+
+    def getTemplateSignatures(
+        self, instrument: str, ipVersion: str, phase: str = "phase2"
+    ) -> tuple[list[dict], None]:
+        self._enter("getTemplateSignatures")
+        self._instrument_package(instrument, "getTemplateSignatures")
+        return [template_signature(name) for name in TEMPLATE_NAMES], None
+
+    def _instrument_package(self, instrument: str, method: str) -> None:
+        if instrument != self.instrument:
+            raise P2Error(404, method, f"/instrumentPackages/{instrument}", "not found")
+
+    def getTemplate(self, obId: int, templateId: int) -> tuple[dict, str]:
+        self._enter("getTemplate")
+        with self._lock:
+            template = self._template(obId, templateId, "getTemplate")
+            return copy.deepcopy(template), self._versions[("template", templateId)]
+
+    def setTemplateParams(
+        self, obId: int, template: dict, params: dict, version: str
+    ) -> tuple[dict, str]:
+        # Mirrors p2api, which updates the values locally and calls saveTemplate
+        for p in template["parameters"]:
+            p["value"] = params.get(p["name"], p["value"])
+        return self.saveTemplate(obId, template, version)
+
+    def saveTemplate(self, obId: int, template: dict, version: str) -> tuple[dict, str]:
+        self._enter("saveTemplate")
+        with self._lock:
+            stored = self._template(obId, template["templateId"], "saveTemplate")
+            key = ("template", template["templateId"])
+            self._check_version(key, version, "saveTemplate")
+            stored["parameters"] = copy.deepcopy(template["parameters"])
+            return copy.deepcopy(stored), self._bump(key)
+
+    def deleteTemplate(
+        self, obId: int, templateId: int, version: str
+    ) -> tuple[None, None]:
+        self._enter("deleteTemplate")
+        with self._lock:
+            self._template(obId, templateId, "deleteTemplate")
+            key = ("template", templateId)
+            self._check_version(key, version, "deleteTemplate")
+            del self.templates[obId][templateId]
+            del self._versions[key]
+            self._bump(("ob", obId))
+            return None, None
+
+    # Time constraints
+
+    def getAbsoluteTimeConstraints(self, obId: int) -> tuple[list[dict], str]:
+        self._enter("getAbsoluteTimeConstraints")
+        with self._lock:
+            self._ob(obId, "getAbsoluteTimeConstraints")
+            return (
+                copy.deepcopy(self.absolute_time_constraints[obId]),
+                self._versions[("atc", obId)],
+            )
+
+    def saveAbsoluteTimeConstraints(
+        self, obId: int, timeConstraints: list[dict], version: str
+    ) -> tuple[list[dict], str]:
+        self._enter("saveAbsoluteTimeConstraints")
+        with self._lock:
+            self._ob(obId, "saveAbsoluteTimeConstraints")
+            self._check_version(("atc", obId), version, "saveAbsoluteTimeConstraints")
+            constraints = sorted(
+                copy.deepcopy(timeConstraints), key=lambda c: c["from"]
+            )
+            self.absolute_time_constraints[obId] = constraints
+            return copy.deepcopy(constraints), self._bump(("atc", obId))
+
+    def getSiderealTimeConstraints(self, obId: int) -> tuple[list[dict], str]:
+        self._enter("getSiderealTimeConstraints")
+        with self._lock:
+            self._ob(obId, "getSiderealTimeConstraints")
+            return (
+                copy.deepcopy(self.sidereal_time_constraints[obId]),
+                self._versions[("stc", obId)],
+            )
+
+    def saveSiderealTimeConstraints(
+        self, obId: int, timeConstraints: list[dict], version: str
+    ) -> tuple[list[dict], str]:
+        self._enter("saveSiderealTimeConstraints")
+        with self._lock:
+            self._ob(obId, "saveSiderealTimeConstraints")
+            self._check_version(("stc", obId), version, "saveSiderealTimeConstraints")
+            constraints = sorted(
+                copy.deepcopy(timeConstraints), key=lambda c: c["from"]
+            )
+            self.sidereal_time_constraints[obId] = constraints
+            return copy.deepcopy(constraints), self._bump(("stc", obId))
+
+    # Ephemeris files
+
+    def getEphemerisFile(self, obId: int, filename: str) -> tuple[None, str]:
+        self._enter("getEphemerisFile")
+        with self._lock:
+            self._ob(obId, "getEphemerisFile")
+            with open(filename, "w") as f:
+                f.write(self.ephemerides.get(obId, ""))
+            return None, self._versions[("ephemeris", obId)]
+
+    def saveEphemerisFile(
+        self, obId: int, filename: str, version: str
+    ) -> tuple[str, str]:
+        self._enter("saveEphemerisFile")
+        with self._lock:
+            self._ob(obId, "saveEphemerisFile")
+            self._check_version(("ephemeris", obId), version, "saveEphemerisFile")
+            with open(filename) as f:
+                self.ephemerides[obId] = f.read()
+            return os.path.basename(filename), self._bump(("ephemeris", obId))
+
+    def deleteEphemerisFile(self, obId: int, version: str) -> tuple[None, str]:
+        self._enter("deleteEphemerisFile")
+        with self._lock:
+            self._ob(obId, "deleteEphemerisFile")
+            self._check_version(("ephemeris", obId), version, "deleteEphemerisFile")
+            self.ephemerides.pop(obId, None)
+            return None, self._bump(("ephemeris", obId))
+
+    # Finding charts
+
+    def addFindingChart(self, obId: int, filename: str) -> tuple[str, None]:
+        self._enter("addFindingChart")
+        with self._lock:
+            self._ob(obId, "addFindingChart")
+            charts = self.finding_charts[obId]
+            if len(charts) >= 5:
+                raise P2Error(409, "POST", obId, "at most 5 finding charts allowed")
+            charts.append(os.path.basename(filename))
+            return charts[-1], None
+
+    def getFindingChartNames(self, obId: int) -> tuple[list[str], None]:
+        self._enter("getFindingChartNames")
+        with self._lock:
+            self._ob(obId, "getFindingChartNames")
+            return list(self.finding_charts[obId]), None
+
+    def deleteFindingChart(self, obId: int, index: int) -> tuple[None, None]:
+        self._enter("deleteFindingChart")
+        with self._lock:
+            self._ob(obId, "deleteFindingChart")
+            charts = self.finding_charts[obId]
+            if not 1 <= index <= len(charts):
+                raise P2Error(404, "DELETE", obId, "finding chart not found")
+            del charts[index - 1]
+            return None, None
@@ -0,0 +1,191 @@
+"""
+Cached, concurrent traversal of ESO container trees.
+
+Finding the observation blocks of a run means listing a container, then each of
+its sub-containers, and so on, one p2api call per container. ContainerTree walks
+the tree breadth-first and lists all containers of a level concurrently, with a
+bounded number of calls in flight. Container listings and observation blocks are
+cached with their versions, so later lookups, such as whether an OB of a given
+name already exists, are answered locally.
+
+Example:
+    tree = ContainerTree(EsoFacility(), max_workers=8)
+    tree.walk(run_container_id, fetch_obs=True)
+    if not tree.find_obs(name="S250101a"):
+        ...
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+from .facility import EsoFacility
+from .models import ContainerItems, Item, ObservationBlock
+
+logger = logging.getLogger(__name__)
+
+
+class ContainerTree:
+    """
+    Local cache of an ESO container tree.
+
+    Parameters:
+        facility (EsoFacility): Facility used to fetch containers and OBs.
+        max_workers (int): Maximum number of concurrent p2api calls.
+
+    Cached container listings and OBs carry the version they were fetched with.
+    Call add() with OBs returned by EsoFacility.save_ob and the like to keep the
+    cache current, or walk(..., refresh=True) to pick up changes made elsewhere.
+    """
+
+    def __init__(self, facility: EsoFacility, max_workers: int = 8):
+        self.facility = facility
+        self.max_workers = max_workers
+        self.listings: dict[int, ContainerItems] = {}
+        """Items of each walked container, by container id"""
+        self.obs: dict[int, ObservationBlock] = {}
+        """Fetched observation blocks, by OB id"""
+        self.parents: dict[tuple[str, int], int] = {}
+        """Parent container id of every container and OB seen, by ("container",
+        container id) or ("ob", OB id), as ids are only unique per kind"""
+        self._lock = threading.Lock()
+
+    def _list(self, container_id: int) -> ContainerItems:
+        listing = self.facility.get_items(container_id)
+        with self._lock:
+            previous = self.listings.get(container_id)
+            if previous and previous.version != listing.version:
+                # Items removed since the last walk are no longer children
+                for item in previous.items:
+                    if self.parents.get(_key(item)) == container_id:
+                        del self.parents[_key(item)]
+            self.listings[container_id] = listing
+            for item in listing.items:
+                self.parents[_key(item)] = container_id
+        return listing
+
+    def walk(
+        self,
+        container_id: int,
+        fetch_obs: bool = False,
+        max_depth: int | None = None,
+        refresh: bool = False,
+    ) -> list[Item]:
+        """
+        Walk a container's subtree breadth-first.
+
+        Args:
+            container_id: Root of the walk, e.g. a run's top level container.
+            fetch_obs: Also fetch the full observation blocks. OBs already cached
+                are only fetched again if their listed name, status or priority
+                changed.
+            max_depth: Only descend this many levels below the root.
+            refresh: List containers again even if they are cached.
+
+        Returns:
+            Every item below the root, level by level in listing order.
+        """
+        found: list[Item] = []
+        level = [container_id]
+        depth = 0
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            while level:
+                cached = {} if refresh else self.listings
+                missing = [c for c in level if c not in cached]
+                fetched = dict(zip(missing, executor.map(self._list, missing)))
+                listings = [fetched.get(c) or self.listings[c] for c in level]
+                items = [item for listing in listings for item in listing.items]
+                found.extend(items)
+                if fetch_obs:
+                    stale = [
+                        item.ob_id
+                        for item in items
+                        if item.ob_id is not None and self._stale(item)
+                    ]
+                    for ob in executor.map(self.facility.get_ob, stale):
+                        self.add(ob)
+                depth += 1
+                if max_depth is not None and depth > max_depth:
+                    break
+                level = [i.container_id for i in items if i.container_id is not None]
+        logger.debug("Walked %d items below container %s", len(found), container_id)
+        return found
+
+    def _stale(self, item: Item) -> bool:
+        ob = self.obs.get(item.ob_id)  # type: ignore
+        return (
+            ob is None
+            or ob.name != item.name
+            or ob.ob_status != item.ob_status
+            or ob.user_priority != item.user_priority
+        )
+
+    def add(self, ob: ObservationBlock) -> None:
+        """Cache an observation block, replacing any other version of it."""
+        with self._lock:
+            self.obs[ob.ob_id] = ob
+            self.parents[("ob", ob.ob_id)] = ob.parent_container_id
+
+    def forget(self, container_id: int | None = None, ob_id: int | None = None) -> None:
+        """Drop a container listing or OB from the cache, e.g. after deleting it."""
+        with self._lock:
+            if container_id is not None:
+                self.listings.pop(container_id, None)
+                self.parents.pop(("container", container_id), None)
+            if ob_id is not None:
+                self.obs.pop(ob_id, None)
+                self.parents.pop(("ob", ob_id), None)
+
+    def get_ob(self, ob_id: int) -> ObservationBlock:
+        """An observation block from the cache, fetched if it is not cached."""
+        ob = self.obs.get(ob_id)
+        if ob is None:
+            ob = self.facility.get_ob(ob_id)
+            self.add(ob)
+        return ob
+
+    def items(self, container_id: int | None = None) -> Iterator[Item]:
+        """Cached items below a container, or of every walked container."""
+        if container_id is None:
+            for listing in list(self.listings.values()):
+                yield from listing.items
+            return
+        listing = self.listings.get(container_id)
+        for item in listing.items if listing else []:
+            yield item
+            if item.container_id is not None:
+                yield from self.items(item.container_id)
+
+    def find_obs(
+        self,
+        name: str | None = None,
+        status: str | None = None,
+        container_id: int | None = None,
+    ) -> list[Item]:
+        """Cached OBs matching a name and status, optionally below a container."""
+        return [
+            item
+            for item in self.items(container_id)
+            if item.ob_id is not None
+            and (name is None or item.name == name)
+            and (status is None or item.ob_status == status)
+        ]
+
+    def path(
+        self, ob_id: int | None = None, container_id: int | None = None
+    ) -> list[int]:
+        """Ids of the containers above a cached OB or container, root first."""
+        key = ("ob", ob_id) if ob_id is not None else ("container", container_id)
+        path = []
+        while key in self.parents:
+            parent = self.parents[key]
+            path.append(parent)
+            key = ("container", parent)
+        return path[::-1]
+
+
+def _key(item: Item) -> tuple[str, int]:
+    if item.container_id is not None:
+        return "container", item.container_id
+    return "ob", item.ob_id  # type: ignore
@@ -1,2 +1,10 @@
 class ServiceNetworkError(Exception):
     pass
+
+
+class EncodeError(ValueError):
+    pass
+
+
+class DecodeError(ValueError):
+    pass
@@ -0,0 +1,205 @@
+"""
+Timing and metrics instrumentation for outbound facility calls.
+
+Every HTTP request made by the LCO/SOAR facilities and every p2api call made by
+the ESO facility is reported to the registered hooks as a CallEvent. Nothing is
+measured or formatted while no hooks are registered.
+
+Example:
+    collector = MetricsCollector()
+    add_hook(collector)
+    ...
+    print(collector.to_prometheus())
+"""
+
+import bisect
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CallEvent:
+    """A single outbound call made by a facility.
+    For LCO and SOAR the method and endpoint are the HTTP method and URL path.
+    For ESO the method is "p2api" and the endpoint is the ApiConnection method name.
+    """
+
+    facility: str
+    """Name of the facility making the call, e.g. "lco", "soar" or "eso"."""
+    method: str
+    endpoint: str
+    payload_bytes: int
+    """Size of the request body"""
+    response_bytes: int
+    """Size of the response body"""
+    latency: float
+    """Wall clock time of the call in seconds, including retries"""
+    status: int | str
+    """HTTP status code, or "ok"/"error" when the status is not known"""
+    retries: int = 0
+    """Number of times the call was retried"""
+
+
+Hook = Callable[[CallEvent], None]
+
+hooks: list[Hook] = []
+"""Registered hooks. Facilities skip instrumentation entirely while this is empty."""
+
+
+def add_hook(hook: Hook) -> None:
+    """Register a hook to be called with a CallEvent after every facility call."""
+    hooks.append(hook)
+
+
+def remove_hook(hook: Hook) -> None:
+    hooks.remove(hook)
+
+
+def emit(event: CallEvent) -> None:
+    """Report an event to every registered hook. Exceptions raised by hooks are
+    logged and never propagate to the facility call."""
+    for hook in list(hooks):
+        try:
+            hook(event)
+        except Exception:
+            logger.exception("Metrics hook %r failed", hook)
+
+
+# Prometheus client default buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+@dataclass
+class Histogram:
+    """Cumulative histogram with fixed upper bounds, as used by Prometheus."""
+
+    buckets: tuple[float, ...]
+    counts: list[int] = field(default_factory=list)
+    sum: float = 0.0
+    count: int = 0
+
+    def __post_init__(self):
+        # One extra bucket for values above the highest bound (+Inf)
+        self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[int]:
+        """Counts of observations less than or equal to each bucket bound, plus +Inf"""
+        total, result = 0, []
+        for c in self.counts:
+            total += c
+            result.append(total)
+        return result
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation within the containing bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        lower = 0.0
+        for bound, cumulative, count in zip(
+            self.buckets, self.cumulative(), self.counts
+        ):
+            if count and cumulative >= rank:
+                return lower + (bound - lower) * (rank - (cumulative - count)) / count
+            lower = bound
+        return self.buckets[-1]
+
+
+class MetricsCollector:
+    """
+    In-process hook that aggregates call events into histograms of latency and
+    payload size, and counters of calls and retries. Labels are the facility,
+    method and endpoint of the call; call counts are also labelled by status.
+    """
+
+    def __init__(
+        self,
+        latency_buckets: tuple[float, ...] = LATENCY_BUCKETS,
+        size_buckets: tuple[float, ...] = SIZE_BUCKETS,
+    ):
+        self.latency_buckets = latency_buckets
+        self.size_buckets = size_buckets
+        self.latency: dict[tuple[str, str, str], Histogram] = {}
+        self.payload: dict[tuple[str, str, str], Histogram] = {}
+        self.calls: dict[tuple[str, str, str, str], int] = {}
+        self.retries: dict[tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: CallEvent) -> None:
+        key = (event.facility, event.method, event.endpoint)
+        with self._lock:
+            if key not in self.latency:
+                self.latency[key] = Histogram(self.latency_buckets)
+                self.payload[key] = Histogram(self.size_buckets)
+                self.retries[key] = 0
+            self.latency[key].observe(event.latency)
+            self.payload[key].observe(event.payload_bytes)
+            self.retries[key] += event.retries
+            status_key = (*key, str(event.status))
+            self.calls[status_key] = self.calls.get(status_key, 0) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.latency.clear()
+            self.payload.clear()
+            self.calls.clear()
+            self.retries.clear()
+
+    def to_prometheus(self, prefix: str = "aeonlib") -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, help_text, histograms in (
+                ("call_latency_seconds", "Latency of facility calls", self.latency),
+                ("call_payload_bytes", "Request size of facility calls", self.payload),
+            ):
+                lines.append(f"# HELP {prefix}_{name} {help_text}")
+                lines.append(f"# TYPE {prefix}_{name} histogram")
+                for key, histogram in sorted(histograms.items()):
+                    labels = _labels(key)
+                    bounds = [_format_value(b) for b in histogram.buckets] + ["+Inf"]
+                    for bound, count in zip(bounds, histogram.cumulative()):
+                        lines.append(
+                            f'{prefix}_{name}_bucket{{{labels},le="{bound}"}} {count}'
+                        )
+                    lines.append(
+                        f"{prefix}_{name}_sum{{{labels}}} {_format_value(histogram.sum)}"
+                    )
+                    lines.append(f"{prefix}_{name}_count{{{labels}}} {histogram.count}")
+
+            lines.append(f"# HELP {prefix}_calls_total Facility calls by status")
+            lines.append(f"# TYPE {prefix}_calls_total counter")
+            for (*key, status), count in sorted(self.calls.items()):
+                labels = _labels(tuple(key))
+                lines.append(
+                    f'{prefix}_calls_total{{{labels},status="{status}"}} {count}'
+                )
+
+            lines.append(f"# HELP {prefix}_call_retries_total Retried facility calls")
+            lines.append(f"# TYPE {prefix}_call_retries_total counter")
+            for key, count in sorted(self.retries.items()):
+                lines.append(f"{prefix}_call_retries_total{{{_labels(key)}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key: tuple[str, ...]) -> str:
+    names = ("facility", "method", "endpoint")
+    return ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, key))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
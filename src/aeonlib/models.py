@@ -11,10 +11,11 @@ from pydantic.types import (
     StringConstraints,
 )
 
+from aeonlib.serialization import CompactPickle
 from aeonlib.types import Angle, Time
 
 
-class SiderealTarget(BaseModel):
+class SiderealTarget(CompactPickle, BaseModel):
     model_config = ConfigDict(validate_assignment=True)
     name: Annotated[str, StringConstraints(max_length=50)] = "string"
     """The name of this Target"""
@@ -40,7 +41,7 @@ class SiderealTarget(BaseModel):
     """Parallax of the Target in mas, max 2000. Defaults to 0."""
 
 
-class NonSiderealTarget(BaseModel):
+class NonSiderealTarget(CompactPickle, BaseModel):
     model_config = ConfigDict(validate_assignment=True)
     name: Annotated[str, StringConstraints(max_length=50)] = "string"
     """The name of this Target"""
@@ -97,7 +98,7 @@ class NonSiderealTarget(BaseModel):
     extra_params: dict[Any, Any] = {}
 
 
-class Window(BaseModel):
+class Window(CompactPickle, BaseModel):
     """A general time window"""
 
     model_config = ConfigDict(validate_assignment=True)
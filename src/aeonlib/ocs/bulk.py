@@ -0,0 +1,148 @@
+"""
+Bulk validation of request groups across a process pool.
+
+Validation is CPU bound in pydantic and astropy, so large batches (for example
+request groups exported from a planning database) are split into chunks and
+validated in worker processes. Each chunk is sent to a worker in a single task,
+and results come back either as models or as compact JSON bytes, which are much
+cheaper to transfer between processes than models holding astropy objects.
+
+Example:
+    result = validate_many(rows, output="json")
+    for error in result.errors:
+        print(error.index, error.errors)
+"""
+
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Iterable, Iterator, Literal
+
+from pydantic import ValidationError
+
+from aeonlib.ocs.request_models import RequestGroup
+
+logger = logging.getLogger(__name__)
+
+Output = Literal["model", "json"]
+
+# Below this many items the cost of starting workers outweighs the gain
+MIN_PARALLEL_ITEMS = 200
+
+
+@dataclass
+class ItemError:
+    """Validation errors for a single item of a batch"""
+
+    index: int
+    """Position of the item in the input"""
+    errors: list[dict[str, Any]]
+    """Errors as returned by pydantic's ValidationError.errors(), without inputs"""
+
+
+@dataclass
+class BulkResult:
+    results: list[RequestGroup | bytes | None] = field(default_factory=list)
+    """Validated items in input order, None for items that failed validation"""
+    errors: list[ItemError] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def valid(self) -> list[RequestGroup | bytes]:
+        """Validated items, skipping the ones that failed validation"""
+        return [r for r in self.results if r is not None]
+
+
+def _validate_chunk(
+    start: int, chunk: list[dict | str | bytes], output: Output
+) -> tuple[list[RequestGroup | bytes | None], list[ItemError]]:
+    results: list[RequestGroup | bytes | None] = []
+    errors = []
+    for i, item in enumerate(chunk, start):
+        try:
+            if isinstance(item, (str, bytes)):
+                request_group = RequestGroup.model_validate_json(item)
+            else:
+                request_group = RequestGroup.model_validate(item)
+        except ValidationError as e:
+            results.append(None)
+            # Contexts and inputs can be large or unpicklable, leave them behind
+            errors.append(
+                ItemError(
+                    i,
+                    e.errors(
+                        include_url=False, include_context=False, include_input=False
+                    ),
+                )
+            )
+            continue
+        if output == "json":
+            results.append(request_group.model_dump_json(exclude_none=True).encode())
+        else:
+            results.append(request_group)
+    return results, errors
+
+
+def _chunks(
+    items: Iterable[dict | str | bytes], size: int
+) -> Iterator[tuple[int, list[dict | str | bytes]]]:
+    iterator = iter(items)
+    start = 0
+    while chunk := list(islice(iterator, size)):
+        yield start, chunk
+        start += len(chunk)
+
+
+def validate_many(
+    items: Iterable[dict | str | bytes],
+    output: Output = "model",
+    max_workers: int | None = None,
+    chunk_size: int = 250,
+    executor: Executor | None = None,
+) -> BulkResult:
+    """
+    Validate many request groups in parallel.
+
+    Args:
+        items: Raw request groups, as dicts or JSON strings/bytes. JSON input
+            is validated with model_validate_json and is cheaper to send to workers.
+        output: "model" to return RequestGroup instances, or "json" to return the
+            validated request groups serialized as compact JSON bytes.
+        max_workers: Number of worker processes. Defaults to the number of CPUs.
+        chunk_size: Number of items sent to a worker in a single task.
+        executor: An existing executor to use instead of starting a process pool,
+            useful to amortize worker start up over several batches.
+
+    Returns:
+        BulkResult: Results in input order and per item errors. Validation errors
+        never raise.
+    """
+    if output not in ("model", "json"):
+        raise ValueError(f"Unknown output {output!r}, expected 'model' or 'json'")
+    items = items if isinstance(items, list) else list(items)
+    result = BulkResult()
+    workers = max_workers or os.cpu_count() or 1
+    if executor is None and (workers == 1 or len(items) < MIN_PARALLEL_ITEMS):
+        result.results, result.errors = _validate_chunk(0, items, output)
+        return result
+
+    chunks = list(_chunks(items, chunk_size))
+    logger.debug("Validating %d request groups in %d chunks", len(items), len(chunks))
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    try:
+        for results, errors in pool.map(
+            _validate_chunk,
+            [start for start, _ in chunks],
+            [chunk for _, chunk in chunks],
+            [output] * len(chunks),
+        ):
+            result.results.extend(results)
+            result.errors.extend(errors)
+    finally:
+        if executor is None:
+            pool.shutdown()
+    return result
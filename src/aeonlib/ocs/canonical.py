@@ -0,0 +1,256 @@
+"""
+Canonical hashing and deduplication of request groups.
+
+Equivalent request groups often serialize differently: keys in another order,
+an angle that went through a unit conversion, a window end a few microseconds
+later, or an orbital element epoch as MJD rather than a datetime. The canonical
+form rounds angles and times to a fixed precision, orders keys and windows, and
+drops empty values, so equivalent request groups share a hash.
+
+dedupe() uses the hash to collapse the duplicates of a batch before submission,
+and to merge the windows of request groups that differ only in their windows.
+
+Example:
+    result = dedupe(request_groups)
+    for request_group in result.request_groups:
+        facility.submit_request_group(request_group)
+    # result.index[i] is the position of request_groups[i] in the output
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Iterable, Sequence
+
+from aeonlib.models import Window
+from aeonlib.ocs.request_models import RequestGroup
+
+ANGLE_FIELDS = frozenset(
+    {
+        "ra",
+        "dec",
+        "hour_angle",
+        "altitude",
+        "azimuth",
+        "longascnode",
+        "argofperih",
+        "orbinc",
+        "meananom",
+        "meanlong",
+        "longofperih",
+        "dailymot",
+    }
+)
+"""Fields holding angles in degrees, rounded to the angle precision"""
+
+TIME_FIELDS = frozenset({"start", "end", "epochofel", "epochofperih"})
+"""Fields holding times, as ISO strings or MJD, rounded to the time resolution"""
+
+UNORDERED_FIELDS = frozenset({"windows"})
+"""Lists whose order does not matter"""
+
+_MJD_UNIX_EPOCH = 40587.0
+
+
+def _seconds(value: Any) -> float:
+    """Unix time of an ISO timestamp or an MJD."""
+    if isinstance(value, str):
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.timestamp()
+    return (float(value) - _MJD_UNIX_EPOCH) * 86400.0
+
+
+def _sort_key(value: Any) -> str:
+    return json.dumps(value, sort_keys=True)
+
+
+def canonical_form(
+    payload: Any,
+    angle_precision: float = 1e-6,
+    time_resolution: float = 1.0,
+    exclude: Iterable[str] = (),
+) -> Any:
+    """
+    The canonical form of a serialized request group.
+
+    Args:
+        payload: Request group as serialized for the API.
+        angle_precision: Angles in ANGLE_FIELDS are rounded to this many degrees.
+        time_resolution: Times in TIME_FIELDS are rounded to this many seconds.
+        exclude: Dotted paths of fields to leave out, e.g. "name" for the request
+            group name or "requests.configurations.target.name". List positions
+            are not part of paths.
+
+    Returns:
+        JSON compatible data that is equal for equivalent request groups.
+    """
+    excluded = frozenset(tuple(path.split(".")) for path in exclude)
+
+    def normalize(value: Any, path: tuple[str, ...]) -> Any:
+        if isinstance(value, dict):
+            result = {}
+            for key, item in value.items():
+                child = (*path, key)
+                if child in excluded or item is None or item == {} or item == []:
+                    continue
+                if key in ANGLE_FIELDS:
+                    steps = round(float(item) / angle_precision)
+                    if key == "ra":
+                        steps %= round(360 / angle_precision)
+                    result[key] = steps
+                elif key in TIME_FIELDS:
+                    result[key] = round(_seconds(item) / time_resolution)
+                else:
+                    result[key] = normalize(item, child)
+            return result
+        if isinstance(value, list):
+            items = [normalize(item, path) for item in value]
+            if path and path[-1] in UNORDERED_FIELDS:
+                items.sort(key=_sort_key)
+            return items
+        if isinstance(value, float):
+            # 10 and 10.0 are the same exposure time
+            return int(value) if value.is_integer() else round(value, 9)
+        return value
+
+    return normalize(payload, ())
+
+
+def canonical_hash(
+    request_group: RequestGroup | dict,
+    angle_precision: float = 1e-6,
+    time_resolution: float = 1.0,
+    exclude: Iterable[str] = (),
+) -> str:
+    """Hash of the canonical form of a request group, or of its serialized payload.
+    See canonical_form for the arguments."""
+    payload = (
+        request_group.model_dump(mode="json", exclude_none=True)
+        if isinstance(request_group, RequestGroup)
+        else request_group
+    )
+    form = canonical_form(payload, angle_precision, time_resolution, exclude)
+    data = json.dumps(form, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(data.encode(), digest_size=16).hexdigest()
+
+
+@dataclass
+class DedupeResult:
+    """Request groups left after deduplication"""
+
+    request_groups: list[RequestGroup]
+    index: list[int]
+    """Position in request_groups of each input request group"""
+    merged: int = 0
+    """Number of output request groups whose windows were merged"""
+
+    @property
+    def duplicates(self) -> int:
+        """Number of input request groups collapsed into another"""
+        return len(self.index) - len(self.request_groups)
+
+
+def _merge_windows(windows: list[tuple[Window, dict]], gap: float) -> list[Window]:
+    """Union of windows, joining those that overlap or are within gap seconds."""
+    spans = sorted(
+        (
+            (
+                _seconds(payload["start"]) if "start" in payload else float("-inf"),
+                _seconds(payload["end"]),
+                window,
+            )
+            for window, payload in windows
+        ),
+        key=lambda span: span[:2],
+    )
+    # Start and end of each merged span, with the windows they come from
+    merged: list[tuple[float, float, Window, Window]] = []
+    for start, end, window in spans:
+        if merged and start <= merged[-1][1] + gap:
+            span_start, span_end, first, _ = merged[-1]
+            if end > span_end:
+                merged[-1] = (span_start, end, first, window)
+            continue
+        merged.append((start, end, window, window))
+    return [
+        first if first is last else Window(start=first.start, end=last.end)
+        for _, _, first, last in merged
+    ]
+
+
+def dedupe(
+    request_groups: Sequence[RequestGroup],
+    merge_windows: bool = True,
+    merge_gap: float = 0.0,
+    angle_precision: float = 1e-6,
+    time_resolution: float = 1.0,
+    ignore: Iterable[str] = ("name", "requests.configurations.target.name"),
+) -> DedupeResult:
+    """
+    Collapse equivalent request groups of a batch.
+
+    Args:
+        request_groups: The batch.
+        merge_windows: Also combine request groups that differ only in their
+            windows into one, with the union of their windows. Request groups must
+            then have the same number of requests, whose windows are merged
+            request by request.
+        merge_gap: Seconds between two windows under which they are joined.
+        angle_precision, time_resolution: See canonical_form.
+        ignore: Fields that do not make request groups different, by default the
+            request group and target names, which differ between alert streams.
+
+    Returns:
+        The first of each set of equivalent request groups, in input order, and
+        the output position of every input request group.
+    """
+    ignore = tuple(ignore)
+    exclude = (*ignore, "requests.windows") if merge_windows else ignore
+    positions: dict[str, int] = {}
+    members: list[list[tuple[RequestGroup, dict]]] = []
+    index = []
+    for request_group in request_groups:
+        payload = request_group.model_dump(mode="json", exclude_none=True)
+        key = canonical_hash(payload, angle_precision, time_resolution, exclude)
+        if key not in positions:
+            positions[key] = len(members)
+            members.append([])
+        members[positions[key]].append((request_group, payload))
+        index.append(positions[key])
+
+    output = []
+    merged = 0
+    for group in members:
+        first, payload = group[0]
+        if len(group) == 1 or not merge_windows:
+            output.append(first)
+            continue
+        windows = [
+            _merge_windows(
+                [
+                    (window, window_payload)
+                    for rg, rg_payload in group
+                    for window, window_payload in zip(
+                        rg.requests[i].windows, rg_payload["requests"][i]["windows"]
+                    )
+                ],
+                merge_gap,
+            )
+            for i in range(len(first.requests))
+        ]
+        if all(
+            len(merged_windows) == len(request.windows)
+            and all(a is b for a, b in zip(merged_windows, request.windows))
+            for merged_windows, request in zip(windows, first.requests)
+        ):
+            output.append(first)
+            continue
+        copy = first.model_copy(deep=True)
+        for request, request_windows in zip(copy.requests, windows):
+            request.windows = request_windows
+        output.append(copy)
+        merged += 1
+    return DedupeResult(request_groups=output, index=index, merged=merged)
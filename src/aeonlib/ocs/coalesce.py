@@ -0,0 +1,140 @@
+"""
+Coalescing of single request groups into MANY operator request groups.
+
+Pipelines that produce one request group per observation pay one HTTP call and one
+server side validation per request. Requests that share a proposal, observation
+type and IPP value can be submitted together in a MANY operator request group,
+where each request is still scheduled on its own, cutting the number of
+submissions by the size of the groups.
+
+Example:
+    coalesced = coalesce(request_groups, max_requests=50)
+    submitted = [facility.submit_request_group(rg) for rg in coalesced.request_groups]
+    for i, (request_group, request) in enumerate(coalesced.split(submitted)):
+        print(request_groups[i].name, request_group.id, request)
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Callable, Sequence, TypeVar
+
+from aeonlib.ocs.request_models import Request, RequestGroup
+
+logger = logging.getLogger(__name__)
+
+MAX_REQUESTS = 50
+"""Default number of requests per coalesced request group"""
+
+MAX_NAME_LENGTH = 50
+
+G = TypeVar("G", bound=RequestGroup)
+
+
+def default_name(request_groups: list[RequestGroup]) -> str:
+    """The shared name of the coalesced request groups, or the first name and how
+    many others were added to it."""
+    first = request_groups[0].name
+    if all(rg.name == first for rg in request_groups):
+        return first
+    suffix = f" +{len(request_groups) - 1}"
+    return first[: MAX_NAME_LENGTH - len(suffix)] + suffix
+
+
+@dataclass
+class Coalesced:
+    """Request groups to submit, and where each input request ended up"""
+
+    request_groups: list[RequestGroup]
+    positions: list[tuple[int, int]]
+    """(request group, request) position in request_groups of each input request
+    group's request. MANY operator input is mapped to its first request"""
+
+    def split(self, submitted: Sequence[G]) -> list[tuple[G, Request]]:
+        """
+        Map submitted request groups back to the input.
+
+        Args:
+            submitted: The response to submitting each of request_groups, in order.
+
+        Returns:
+            The submitted request group and request of each input request group.
+        """
+        if len(submitted) != len(self.request_groups):
+            raise ValueError(
+                f"Expected {len(self.request_groups)} submitted request groups,"
+                f" got {len(submitted)}"
+            )
+        return [
+            (submitted[group], submitted[group].requests[request])
+            for group, request in self.positions
+        ]
+
+
+def coalesce(
+    request_groups: Sequence[RequestGroup],
+    max_requests: int = MAX_REQUESTS,
+    name: Callable[[list[RequestGroup]], str] = default_name,
+) -> Coalesced:
+    """
+    Pack the requests of SINGLE operator request groups into MANY operator ones.
+
+    Request groups are packed with others of the same proposal, observation type
+    and IPP value, in input order, up to max_requests requests per group. A group
+    left with a single request keeps its SINGLE operator, and request groups that
+    already use the MANY operator are passed through unchanged.
+
+    Args:
+        request_groups: Request groups, each with a single request if SINGLE.
+        max_requests: Maximum number of requests in a coalesced request group.
+        name: Names a coalesced request group from the request groups packed
+            into it. Defaults to default_name.
+
+    Returns:
+        The request groups to submit, ordered by their first input, with the
+        position of each input request in them.
+    """
+    if max_requests < 1:
+        raise ValueError("max_requests must be at least 1")
+    # Members of each output request group, by input index
+    members: list[list[int]] = []
+    open_groups: dict[tuple, int] = {}
+    for i, request_group in enumerate(request_groups):
+        if request_group.operator != "SINGLE" or len(request_group.requests) != 1:
+            members.append([i])
+            continue
+        key = (
+            request_group.proposal,
+            request_group.observation_type,
+            request_group.ipp_value,
+        )
+        group = open_groups.get(key)
+        if group is None or len(members[group]) >= max_requests:
+            open_groups[key] = group = len(members)
+            members.append([])
+        members[group].append(i)
+
+    output: list[RequestGroup] = []
+    positions: list[tuple[int, int]] = [(0, 0)] * len(request_groups)
+    for group, indices in enumerate(members):
+        first = request_groups[indices[0]]
+        if len(indices) == 1:
+            output.append(first)
+            positions[indices[0]] = (group, 0)
+            continue
+        packed = [request_groups[i] for i in indices]
+        # Requests are shared with the input rather than copied
+        output.append(
+            first.model_copy(
+                update={
+                    "name": name(packed),
+                    "operator": "MANY",
+                    "requests": [rg.requests[0] for rg in packed],
+                }
+            )
+        )
+        for position, i in enumerate(indices):
+            positions[i] = (group, position)
+    logger.debug(
+        "Coalesced %d request groups into %d", len(request_groups), len(output)
+    )
+    return Coalesced(request_groups=output, positions=positions)
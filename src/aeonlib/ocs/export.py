@@ -0,0 +1,317 @@
+"""
+Columnar export of request groups.
+
+Paginated /requestgroups/ results are flattened page by page into typed column
+buffers for three tables: request groups, their requests and the requests'
+windows, linked by id. Nested dicts are dropped as soon as a page is flattened,
+so exporting years of requests only holds the columns in memory, or with
+write_parquet, only a bounded number of rows at a time.
+
+Example:
+    with LcoFacility() as facility:
+        tables = export_request_groups(facility, proposal="LCO2025A-001")
+        tables["requests"]
+
+Arrow and Parquet output require the `arrow` dependency group (pyarrow).
+"""
+
+import logging
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterable, Literal
+
+import numpy as np
+from astropy.table import MaskedColumn, Table
+
+from aeonlib.ocs.lco.facility import LcoFacility, iter_pages
+
+logger = logging.getLogger(__name__)
+
+Kind = Literal["int", "float", "str", "datetime"]
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _microseconds(value: str | datetime) -> int:
+    """Microseconds since the Unix epoch of an ISO 8601 timestamp, UTC if naive."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+class ColumnBuffer:
+    """Append only column of a single type. Missing values are masked."""
+
+    def __init__(self, kind: Kind):
+        self.kind = kind
+        self.values: array | list[str]
+        if kind == "str":
+            self.values = []
+        else:
+            self.values = array("d" if kind == "float" else "q")
+        self.mask = array("B")
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def append(self, value: Any) -> None:
+        missing = value is None
+        self.mask.append(missing)
+        if self.kind == "str":
+            self.values.append("" if missing else str(value))  # type: ignore
+        elif self.kind == "float":
+            self.values.append(np.nan if missing else float(value))
+        elif self.kind == "datetime":
+            self.values.append(0 if missing else _microseconds(value))
+        else:
+            self.values.append(0 if missing else int(value))
+
+    def clear(self) -> None:
+        del self.values[:]
+        del self.mask[:]
+
+    def numpy(self) -> tuple[np.ndarray, np.ndarray]:
+        """The values as a numpy array of the column's dtype, and the mask."""
+        mask = np.frombuffer(self.mask, dtype=np.uint8).astype(bool)
+        if self.kind == "str":
+            return np.array(self.values, dtype=str), mask
+        values = np.frombuffer(self.values, dtype=self.values.typecode)  # type: ignore
+        if self.kind == "datetime":
+            values = values.view("datetime64[us]")
+        return values.copy(), mask
+
+
+@dataclass
+class Field:
+    name: str
+    kind: Kind
+    get: Callable[..., Any]
+    """Called with the flattened item followed by its parents, e.g.
+    (window, request, request_group)"""
+
+
+def _first_target(request: dict) -> dict:
+    configurations = request.get("configurations") or [{}]
+    return configurations[0].get("target") or {}
+
+
+REQUEST_GROUP_FIELDS = [
+    Field("id", "int", lambda rg: rg["id"]),
+    Field("name", "str", lambda rg: rg["name"]),
+    Field("proposal", "str", lambda rg: rg["proposal"]),
+    Field("state", "str", lambda rg: rg.get("state")),
+    Field("observation_type", "str", lambda rg: rg["observation_type"]),
+    Field("operator", "str", lambda rg: rg["operator"]),
+    Field("ipp_value", "float", lambda rg: rg["ipp_value"]),
+    Field("submitter", "str", lambda rg: rg.get("submitter")),
+    Field("created", "datetime", lambda rg: rg.get("created")),
+    Field("modified", "datetime", lambda rg: rg.get("modified")),
+    Field("request_count", "int", lambda rg: len(rg["requests"])),
+]
+
+REQUEST_FIELDS = [
+    Field("id", "int", lambda r, rg: r.get("id")),
+    Field("request_group_id", "int", lambda r, rg: rg["id"]),
+    Field("state", "str", lambda r, rg: r.get("state")),
+    Field(
+        "acceptability_threshold",
+        "float",
+        lambda r, rg: r.get("acceptability_threshold"),
+    ),
+    Field("configuration_repeats", "int", lambda r, rg: r.get("configuration_repeats")),
+    Field("optimization_type", "str", lambda r, rg: r.get("optimization_type")),
+    Field("telescope_class", "str", lambda r, rg: r["location"].get("telescope_class")),
+    Field(
+        "instrument_type",
+        "str",
+        lambda r, rg: (r.get("configurations") or [{}])[0].get("instrument_type"),
+    ),
+    Field("configuration_count", "int", lambda r, rg: len(r.get("configurations", []))),
+    Field("target_name", "str", lambda r, rg: _first_target(r).get("name")),
+    Field("target_type", "str", lambda r, rg: _first_target(r).get("type")),
+    Field("target_ra", "float", lambda r, rg: _first_target(r).get("ra")),
+    Field("target_dec", "float", lambda r, rg: _first_target(r).get("dec")),
+    Field("duration", "float", lambda r, rg: r.get("duration")),
+    Field("modified", "datetime", lambda r, rg: r.get("modified")),
+]
+
+WINDOW_FIELDS = [
+    Field("request_id", "int", lambda w, r, rg: r.get("id")),
+    Field("request_group_id", "int", lambda w, r, rg: rg["id"]),
+    Field("start", "datetime", lambda w, r, rg: w.get("start")),
+    Field("end", "datetime", lambda w, r, rg: w["end"]),
+]
+
+
+class Columns:
+    """Column buffers for one flattened table."""
+
+    def __init__(self, fields: list[Field]):
+        self.fields = fields
+        self.buffers = {f.name: ColumnBuffer(f.kind) for f in fields}
+
+    def __len__(self) -> int:
+        return len(self.buffers[self.fields[0].name])
+
+    def append(self, *items: dict) -> None:
+        for field in self.fields:
+            self.buffers[field.name].append(field.get(*items))
+
+    def clear(self) -> None:
+        for buffer in self.buffers.values():
+            buffer.clear()
+
+    def to_table(self) -> Table:
+        table = Table()
+        for name, buffer in self.buffers.items():
+            values, mask = buffer.numpy()
+            table[name] = MaskedColumn(values, mask=mask) if mask.any() else values
+        return table
+
+    def to_arrow(self):
+        pa = _pyarrow()
+        arrays, schema = [], []
+        for name, buffer in self.buffers.items():
+            values, mask = buffer.numpy()
+            type = {
+                "int": pa.int64(),
+                "float": pa.float64(),
+                "str": pa.string(),
+                "datetime": pa.timestamp("us", tz="UTC"),
+            }[buffer.kind]
+            if buffer.kind == "datetime":
+                values = values.view("int64")
+            arrays.append(
+                pa.array(values, type=type, mask=mask if mask.any() else None)
+            )
+            schema.append(pa.field(name, type))
+        return pa.Table.from_arrays(arrays, schema=pa.schema(schema))
+
+
+class RequestGroupColumns:
+    """Flattens request groups, as returned by the API, into three tables:
+    request_groups, requests and windows."""
+
+    def __init__(self):
+        self.tables = {
+            "request_groups": Columns(REQUEST_GROUP_FIELDS),
+            "requests": Columns(REQUEST_FIELDS),
+            "windows": Columns(WINDOW_FIELDS),
+        }
+
+    def __len__(self) -> int:
+        return len(self.tables["request_groups"])
+
+    def extend(self, request_groups: Iterable[dict]) -> None:
+        request_group_table = self.tables["request_groups"]
+        request_table = self.tables["requests"]
+        window_table = self.tables["windows"]
+        for rg in request_groups:
+            request_group_table.append(rg)
+            for request in rg["requests"]:
+                request_table.append(request, rg)
+                for window in request["windows"]:
+                    window_table.append(window, request, rg)
+
+    def clear(self) -> None:
+        for columns in self.tables.values():
+            columns.clear()
+
+    def to_tables(self) -> dict[str, Table]:
+        return {name: columns.to_table() for name, columns in self.tables.items()}
+
+    def to_arrow(self) -> dict:
+        return {name: columns.to_arrow() for name, columns in self.tables.items()}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(
+            "Arrow and Parquet export requires pyarrow."
+            " Install the 'arrow' dependency group for Aeonlib."
+        ) from e
+    return pyarrow
+
+
+def export_request_groups(
+    facility: LcoFacility,
+    format: Literal["table", "arrow"] = "table",
+    page_size: int = 100,
+    **params,
+) -> dict:
+    """
+    Export request groups to astropy Tables or Arrow tables.
+
+    Args:
+        facility: Facility to list request groups from.
+        format: "table" for astropy Tables, "arrow" for pyarrow Tables.
+        page_size: Number of request groups requested per API call.
+        **params: Filters for the /requestgroups/ endpoint, e.g. proposal or state.
+
+    Returns:
+        dict: The request_groups, requests and windows tables.
+    """
+    columns = RequestGroupColumns()
+    for page in iter_pages(
+        facility.get_json, "/requestgroups/", {"limit": page_size, **params}
+    ):
+        columns.extend(page)
+    logger.debug("Exported %d request groups", len(columns))
+    if format == "arrow":
+        return columns.to_arrow()
+    return columns.to_tables()
+
+
+def write_parquet(
+    facility: LcoFacility,
+    directory: str | Path,
+    row_group_size: int = 10000,
+    page_size: int = 100,
+    **params,
+) -> dict[str, Path]:
+    """
+    Stream request groups into request_groups.parquet, requests.parquet and
+    windows.parquet in a directory. At most about row_group_size request groups
+    are held in memory, each flush is written as a Parquet row group.
+
+    Returns:
+        dict: Paths of the written files by table name.
+    """
+    _pyarrow()
+    import pyarrow.parquet as pq
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = {
+        name: directory / f"{name}.parquet" for name in RequestGroupColumns().tables
+    }
+    columns = RequestGroupColumns()
+    writers: dict[str, Any] = {}
+
+    def flush():
+        for name, table in columns.to_arrow().items():
+            if name not in writers:
+                writers[name] = pq.ParquetWriter(paths[name], table.schema)
+            writers[name].write_table(table)
+        columns.clear()
+
+    try:
+        for page in iter_pages(
+            facility.get_json, "/requestgroups/", {"limit": page_size, **params}
+        ):
+            columns.extend(page)
+            if len(columns) >= row_group_size:
+                flush()
+        if len(columns) or not writers:
+            flush()
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return paths
@@ -0,0 +1,355 @@
+"""
+Streaming ingestion of target catalogs into request groups.
+
+Catalogs (CSV, FITS or VOTable) are read in chunks of rows. Each row is mapped
+onto a copy of a serialized template request group through a declarative
+CatalogMapping, and the resulting payloads are validated in batches with
+aeonlib.ocs.bulk.validate_many. Only one chunk is held in memory at a time, so
+million row catalogs can be ingested with bounded memory.
+
+Example:
+    mapping = CatalogMapping(
+        columns={
+            "name": "ID",
+            "target.name": "ID",
+            "target.ra": "RA",
+            "target.dec": "DEC",
+            "instrument_config.exposure_time": "EXPTIME",
+        }
+    )
+    ingest = CatalogIngest(template, mapping)
+    for request_group in ingest.read("targets.fits"):
+        facility.submit_request_group(request_group)
+    print(ingest.errors)
+"""
+
+import copy
+import csv
+import logging
+import math
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from astropy.io import fits, votable
+
+from aeonlib.ocs.bulk import ItemError, validate_many
+from aeonlib.ocs.request_models import RequestGroup
+
+logger = logging.getLogger(__name__)
+
+Rows = list[dict[str, Any]]
+
+SHORTCUTS = {
+    "request": "requests.*",
+    "window": "requests.*.windows.*",
+    "configuration": "requests.*.configurations.*",
+    "target": "requests.*.configurations.*.target",
+    "constraints": "requests.*.configurations.*.constraints",
+    "instrument_config": "requests.*.configurations.*.instrument_configs.*",
+    "optical_elements": (
+        "requests.*.configurations.*.instrument_configs.*.optical_elements"
+    ),
+}
+"""Path prefixes that apply to every request, configuration or instrument config
+of the template"""
+
+
+@dataclass
+class CatalogMapping:
+    """
+    Declarative mapping of catalog columns onto a request group payload.
+
+    Keys of columns are dotted paths in the serialized request group, such as
+    "name", "requests.0.windows.0.start" or "target.ra". Path segments may be list
+    indices or "*" for every item of a list, and may start with one of the
+    SHORTCUTS, e.g. "target.ra" sets the right ascension of every configuration's
+    target. Values are catalog column names.
+
+    Missing values (empty strings, NaN or masked values) remove the field from the
+    payload, so the model default applies, or the row fails validation if the
+    field is required.
+    """
+
+    columns: dict[str, str]
+    """Payload path -> catalog column name"""
+    converters: dict[str, Callable[[Any], Any]] = field(default_factory=dict)
+    """Optional conversion of column values by payload path, e.g. to convert a
+    right ascension in hours to degrees"""
+
+    def compile(self) -> list[tuple[list[str], str, Callable[[Any], Any] | None]]:
+        compiled = []
+        for path, column in self.columns.items():
+            head, _, rest = path.partition(".")
+            expanded = f"{SHORTCUTS[head]}.{rest}" if head in SHORTCUTS else path
+            compiled.append((expanded.split("."), column, self.converters.get(path)))
+        return compiled
+
+
+_MISSING = object()
+
+
+class MappingError(ValueError):
+    """A catalog value could not be converted or placed in the payload"""
+
+    def __init__(self, path: list[str], column: str, error: Exception):
+        super().__init__(f"{column} -> {'.'.join(path)}: {error}")
+        self.path = path
+        self.column = column
+        self.error = error
+
+    def errors(self) -> list[dict[str, Any]]:
+        """The error in the format of pydantic's ValidationError.errors()"""
+        return [
+            {
+                "type": "mapping_error",
+                "loc": tuple(self.path),
+                "msg": f"Column {self.column}: {self.error}",
+            }
+        ]
+
+
+def _set(node: Any, parts: list[str], value: Any) -> None:
+    part, rest = parts[0], parts[1:]
+    if part == "*":
+        for item in node:
+            _set(item, rest, value)
+        return
+    key: int | str = int(part) if isinstance(node, list) else part
+    if rest:
+        _set(node[key], rest, value)
+    elif value is _MISSING:
+        if isinstance(node, dict):
+            node.pop(key, None)
+    else:
+        node[key] = value
+
+
+def _is_missing(value: Any) -> bool:
+    return (
+        value is None or value == "" or (isinstance(value, float) and math.isnan(value))
+    )
+
+
+def read_csv(path: str | Path, chunk_size: int) -> Iterator[Rows]:
+    """Read a CSV file with a header row in chunks of rows. Values are strings
+    and are converted during validation."""
+    with open(path, newline="") as f:
+        rows: Rows = []
+        for row in csv.DictReader(f):
+            rows.append(row)
+            if len(rows) >= chunk_size:
+                yield rows
+                rows = []
+        if rows:
+            yield rows
+
+
+def read_fits(path: str | Path, chunk_size: int, hdu: int = 1) -> Iterator[Rows]:
+    """Read a FITS binary or ASCII table in chunks of rows. The file is memory
+    mapped, so only the rows of the current chunk are loaded."""
+    with fits.open(path, memmap=True) as hdul:
+        data = hdul[hdu].data
+        names = data.columns.names
+        for start in range(0, len(data), chunk_size):
+            chunk = data[start : start + chunk_size]
+            columns = [chunk[name].tolist() for name in names]
+            yield [dict(zip(names, values)) for values in zip(*columns)]
+
+
+def _votable_bool(value: str) -> bool | None:
+    return {"t": True, "true": True, "1": True, "f": False, "false": False}.get(
+        value.strip().lower()
+    )
+
+
+VOTABLE_TYPES: dict[str, Callable[[str], Any]] = {
+    "boolean": _votable_bool,
+    "short": int,
+    "int": int,
+    "long": int,
+    "unsignedByte": int,
+    "float": float,
+    "double": float,
+}
+
+
+def read_votable(path: str | Path, chunk_size: int) -> Iterator[Rows]:
+    """
+    Read the first table of a VOTable in chunks of rows. TABLEDATA serializations
+    are parsed incrementally and parsed rows are discarded as soon as they have
+    been converted. BINARY and FITS serializations are parsed with
+    astropy.io.votable, which loads the whole table.
+    """
+    names: list[str] = []
+    converters: list[Callable[[str], Any]] = []
+    rows: Rows = []
+    tabledata = None
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        tag = elem.tag.rpartition("}")[2]
+        if event == "start":
+            if tag == "TABLEDATA":
+                tabledata = elem
+            elif tag in ("BINARY", "BINARY2", "FITS"):
+                yield from _read_votable_astropy(path, chunk_size)
+                return
+            continue
+        if tag == "FIELD":
+            names.append(elem.get("name") or elem.get("ID") or f"col{len(names)}")
+            datatype = elem.get("datatype", "char")
+            arraysize = elem.get("arraysize")
+            convert = VOTABLE_TYPES.get(datatype, str)
+            converters.append(str if arraysize and datatype != "char" else convert)
+        elif tag == "TR":
+            cells = [td.text for td in elem]
+            rows.append(
+                {
+                    name: convert(text) if text and text.strip() else None
+                    for name, convert, text in zip(names, converters, cells)
+                }
+            )
+            if len(rows) >= chunk_size:
+                yield rows
+                rows = []
+                if tabledata is not None:
+                    tabledata.clear()
+        elif tag == "TABLE":
+            break
+    if rows:
+        yield rows
+
+
+def _read_votable_astropy(path: str | Path, chunk_size: int) -> Iterator[Rows]:
+    table = votable.parse_single_table(path).to_table()
+    for start in range(0, len(table), chunk_size):
+        chunk = table[start : start + chunk_size]
+        # Masked values become None
+        columns = [chunk[name].tolist() for name in chunk.colnames]
+        yield [dict(zip(chunk.colnames, values)) for values in zip(*columns)]
+
+
+READERS: dict[str, Callable[[str | Path, int], Iterator[Rows]]] = {
+    "csv": read_csv,
+    "fits": read_fits,
+    "votable": read_votable,
+}
+
+SUFFIXES = {
+    ".csv": "csv",
+    ".fits": "fits",
+    ".fit": "fits",
+    ".fts": "fits",
+    ".fits.gz": "fits",
+    ".fit.gz": "fits",
+    ".fts.gz": "fits",
+    ".vot": "votable",
+    ".votable": "votable",
+    ".xml": "votable",
+}
+
+
+class CatalogIngest:
+    """
+    Turns catalog rows into validated request groups.
+
+    Parameters:
+        template (RequestGroup): Request group every row is mapped onto.
+        mapping (CatalogMapping): Which catalog columns go where.
+        chunk_size (int): Rows read and validated at a time.
+        max_workers (int): Worker processes used for validation, see validate_many.
+
+    Rows that fail conversion or validation are skipped and recorded in errors,
+    with the row number (starting at 0) as the index.
+    """
+
+    def __init__(
+        self,
+        template: RequestGroup,
+        mapping: CatalogMapping,
+        chunk_size: int = 5000,
+        max_workers: int = 1,
+    ):
+        self.template = template.model_dump(mode="json", exclude_none=True)
+        self.mapping = mapping
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.errors: list[ItemError] = []
+        self.rows_read = 0
+        self._compiled = mapping.compile()
+
+    def payload(self, row: dict[str, Any]) -> dict:
+        """
+        Map a single catalog row onto a copy of the template payload.
+
+        Raises:
+            MappingError: A converter failed or a path does not exist in the
+                template.
+        """
+        payload = copy.deepcopy(self.template)
+        for parts, column, convert in self._compiled:
+            value = row.get(column)
+            try:
+                if _is_missing(value):
+                    value = _MISSING
+                else:
+                    if isinstance(value, bytes):
+                        value = value.decode().strip()
+                    elif isinstance(value, str):
+                        value = value.strip()
+                    if convert:
+                        value = convert(value)
+                _set(payload, parts, value)
+            except Exception as e:
+                raise MappingError(parts, column, e) from e
+        return payload
+
+    def rows(self, rows: Iterator[Rows]) -> Iterator[RequestGroup]:
+        """Validate chunks of rows, yielding request groups for the valid ones."""
+        executor = (
+            ProcessPoolExecutor(self.max_workers) if self.max_workers > 1 else None
+        )
+        try:
+            for chunk in rows:
+                start = self.rows_read
+                self.rows_read += len(chunk)
+                payloads = []
+                # Row number of each payload
+                indices = []
+                errors = []
+                for i, row in enumerate(chunk, start):
+                    try:
+                        payloads.append(self.payload(row))
+                        indices.append(i)
+                    except MappingError as e:
+                        errors.append(ItemError(index=i, errors=e.errors()))
+                result = validate_many(payloads, executor=executor)
+                for error in result.errors:
+                    error.index = indices[error.index]
+                errors.extend(result.errors)
+                self.errors.extend(sorted(errors, key=lambda e: e.index))
+                yield from result.valid()  # type: ignore
+        finally:
+            if executor:
+                executor.shutdown()
+
+    def read(
+        self, path: str | Path, format: str | None = None
+    ) -> Iterator[RequestGroup]:
+        """
+        Stream request groups from a catalog file.
+
+        Args:
+            path: The catalog file.
+            format: "csv", "fits" or "votable". Guessed from the file suffix if not
+                given.
+        """
+        name = Path(path).name.lower()
+        format = format or next(
+            (f for suffix, f in SUFFIXES.items() if name.endswith(suffix)), None
+        )
+        if format not in READERS:
+            raise ValueError(f"Unknown catalog format for {path}, pass format=")
+        logger.debug("Ingesting %s catalog %s", format, path)
+        yield from self.rows(READERS[format](path, self.chunk_size))
@@ -0,0 +1,339 @@
+"""
+Write-ahead journal of request group submissions.
+
+A submitter that crashes half way through a batch cannot tell which request groups
+reached the API, and resubmitting the whole batch creates duplicates. The journal
+records each request group, keyed by the canonical hash of its serialized form
+(see aeonlib.ocs.canonical), before it is sent, and its response id once it has
+been created. On restart, request groups whose submission was started but never
+recorded are reconciled with the API in a single listing per proposal, and only
+those that never arrived are sent again.
+
+Example:
+    with LcoFacility() as facility:
+        journal = SubmissionJournal("submissions.sqlite", facility)
+        entries = journal.submit_many(request_groups)
+        failed = [e for e in entries if e.state == FAILED]
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Iterable
+
+import httpx
+
+from aeonlib.ocs.canonical import canonical_hash
+from aeonlib.ocs.lco.facility import LcoFacility, iter_pages
+from aeonlib.ocs.mirror import timestamp
+from aeonlib.ocs.request_models import RequestGroup, SubmittedRequestGroup
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    hash TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    proposal TEXT NOT NULL,
+    state TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    recorded TEXT NOT NULL,
+    sent TEXT,
+    request_group_id INTEGER,
+    response TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS submissions_state ON submissions (state);
+"""
+
+PENDING = "PENDING"
+"""Recorded, and not known to have been created. In doubt if it was sent"""
+SUBMITTED = "SUBMITTED"
+"""Created by the API, with a request group id"""
+FAILED = "FAILED"
+"""Rejected by the API, so never created"""
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class JournalEntry:
+    """State of one journaled request group"""
+
+    hash: str
+    name: str
+    proposal: str
+    state: str
+    """One of PENDING, SUBMITTED or FAILED"""
+    sent: str | None = None
+    """When the last submission was started, if it was"""
+    request_group_id: int | None = None
+    error: str | None = None
+
+    @property
+    def in_doubt(self) -> bool:
+        """Whether the request group was sent without its outcome being recorded"""
+        return self.state == PENDING and self.sent is not None
+
+
+class SubmissionJournal:
+    """
+    SQLite journal making request group submission idempotent across restarts.
+
+    Parameters:
+        path (str | Path): SQLite database file, or ":memory:".
+        facility (LcoFacility): Facility to submit to, e.g. LcoFacility or
+            SoarFacility.
+        clock_skew (timedelta): Margin for the difference between the local and
+            API clocks when looking for request groups created after they were
+            sent.
+        clock (Callable[[], datetime]): Source of journal timestamps.
+
+    Request groups are identified by the canonical_hash of their serialized form
+    (see aeonlib.ocs.canonical), so submitting the same request group twice, in
+    one batch or across runs, creates it once, even if it was serialized
+    differently. In doubt request groups are matched to the API's request groups
+    by proposal and name, among those created since they were sent. If several in
+    doubt entries share a name, they are matched in the order they were sent.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = ":memory:",
+        facility: LcoFacility | None = None,
+        clock_skew: timedelta = timedelta(minutes=5),
+        clock: Callable[[], datetime] = utcnow,
+    ):
+        self.facility = facility
+        self.clock_skew = clock_skew
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._db:
+            version = self._db.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, SCHEMA_VERSION):
+                raise ValueError(
+                    f"Journal {path} has schema version {version}, "
+                    f"expected {SCHEMA_VERSION}"
+                )
+            self._db.executescript(SCHEMA)
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _facility(self) -> LcoFacility:
+        if self.facility is None:
+            raise ValueError("A facility is required to submit or reconcile")
+        return self.facility
+
+    def _now(self) -> str:
+        return timestamp(self.clock())
+
+    def _update(self, hash: str, **columns) -> None:
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        with self._lock, self._db:
+            self._db.execute(
+                f"UPDATE submissions SET {assignments} WHERE hash = ?",
+                (*columns.values(), hash),
+            )
+
+    @staticmethod
+    def _entry(row: sqlite3.Row) -> JournalEntry:
+        return JournalEntry(
+            hash=row["hash"],
+            name=row["name"],
+            proposal=row["proposal"],
+            state=row["state"],
+            sent=row["sent"],
+            request_group_id=row["request_group_id"],
+            error=row["error"],
+        )
+
+    def record(self, request_groups: Iterable[RequestGroup]) -> list[str]:
+        """
+        Record the intent to submit request groups, without sending them.
+
+        Returns:
+            The hash of each request group, in order. Request groups already in
+            the journal keep their state.
+        """
+        facility = self._facility()
+        rows = []
+        for request_group in request_groups:
+            payload = facility.serialize_request_group(request_group)
+            rows.append(
+                (
+                    canonical_hash(payload),
+                    request_group.name,
+                    request_group.proposal,
+                    PENDING,
+                    json.dumps(payload),
+                    self._now(),
+                )
+            )
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO submissions"
+                " (hash, name, proposal, state, payload, recorded)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return [row[0] for row in rows]
+
+    def get(self, hash: str) -> JournalEntry | None:
+        row = self._db.execute(
+            "SELECT * FROM submissions WHERE hash = ?", (hash,)
+        ).fetchone()
+        return self._entry(row) if row else None
+
+    def entries(self, state: str | None = None) -> list[JournalEntry]:
+        """Journaled request groups in the order they were recorded."""
+        sql = "SELECT * FROM submissions"
+        args: tuple = ()
+        if state:
+            sql += " WHERE state = ?"
+            args = (state,)
+        rows = self._db.execute(sql + " ORDER BY recorded, rowid", args).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def response(self, hash: str) -> SubmittedRequestGroup | None:
+        """The API's response to a submitted request group, if it was recorded."""
+        row = self._db.execute(
+            "SELECT response FROM submissions WHERE hash = ?", (hash,)
+        ).fetchone()
+        if row is None or row["response"] is None:
+            return None
+        return SubmittedRequestGroup.model_validate_json(row["response"])
+
+    def reconcile(self) -> int:
+        """
+        Resolve in doubt entries against the API.
+
+        Request groups found in the API are marked SUBMITTED with their id. The
+        others are marked as never sent, so the next submission sends them.
+
+        Returns:
+            int: Number of in doubt entries found to have been created.
+        """
+        in_doubt = [e for e in self.entries(PENDING) if e.in_doubt]
+        if not in_doubt:
+            return 0
+        facility = self._facility()
+        found = 0
+        for proposal in sorted({e.proposal for e in in_doubt}):
+            entries = sorted(
+                (e for e in in_doubt if e.proposal == proposal),
+                key=lambda e: e.sent,  # type: ignore
+            )
+            earliest = datetime.fromisoformat(entries[0].sent.replace("Z", "+00:00"))  # type: ignore
+            params = {
+                "proposal": proposal,
+                "created_after": timestamp(earliest - self.clock_skew),
+                "ordering": "created",
+            }
+            # Request groups already claimed by another journal entry
+            claimed = {
+                row["request_group_id"]
+                for row in self._db.execute(
+                    "SELECT request_group_id FROM submissions"
+                    " WHERE proposal = ? AND request_group_id IS NOT NULL",
+                    (proposal,),
+                )
+            }
+            candidates: dict[str, list[dict]] = {}
+            for page in iter_pages(facility.get_json, "/requestgroups/", params):
+                for request_group in page:
+                    if request_group["id"] not in claimed:
+                        candidates.setdefault(request_group["name"], []).append(
+                            request_group
+                        )
+            for entry in entries:
+                matches = candidates.get(entry.name)
+                if matches:
+                    self._submitted(entry.hash, matches.pop(0))
+                    found += 1
+                else:
+                    self._update(entry.hash, sent=None)
+        logger.info(
+            "Reconciled %d in doubt submissions, %d had been created",
+            len(in_doubt),
+            found,
+        )
+        return found
+
+    def _submitted(self, hash: str, response: dict) -> None:
+        self._update(
+            hash,
+            state=SUBMITTED,
+            request_group_id=response["id"],
+            response=json.dumps(response),
+            error=None,
+        )
+
+    def _send(self, hash: str) -> None:
+        facility = self._facility()
+        row = self._db.execute(
+            "SELECT payload FROM submissions WHERE hash = ?", (hash,)
+        ).fetchone()
+        # Written before sending, so a crash leaves the entry in doubt
+        self._update(hash, sent=self._now())
+        try:
+            response = facility.send("POST", "/requestgroups/", json=json.loads(row[0]))
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code >= 500:
+                # The request group may have been created regardless
+                self._update(hash, error=str(e))
+                raise
+            self._update(hash, state=FAILED, error=e.response.text)
+            return
+        except httpx.TransportError as e:
+            self._update(hash, error=str(e))
+            raise
+        self._submitted(hash, response.json())
+
+    def submit_many(
+        self, request_groups: Iterable[RequestGroup], retry_failed: bool = False
+    ) -> list[JournalEntry]:
+        """
+        Submit request groups that have not been created yet.
+
+        The batch is recorded before anything is sent, and in doubt entries are
+        reconciled first, so running the same batch again after a crash only
+        sends what is missing.
+
+        Args:
+            request_groups: Request groups to submit.
+            retry_failed: Also resend request groups the API rejected before.
+
+        Returns:
+            The journal entry of each request group, in order. Rejected request
+            groups are FAILED with the API's errors.
+
+        Raises:
+            httpx.TransportError, httpx.HTTPStatusError: The API could not be
+                reached or failed with a server error. Run submit_many again to
+                resume.
+        """
+        hashes = self.record(request_groups)
+        self.reconcile()
+        for hash in dict.fromkeys(hashes):
+            entry = self.get(hash)
+            assert entry is not None
+            if entry.state == PENDING or (entry.state == FAILED and retry_failed):
+                self._send(hash)
+        return [self.get(hash) for hash in hashes]  # type: ignore
+
+    def submit(self, request_group: RequestGroup) -> JournalEntry:
+        """Submit a single request group, see submit_many."""
+        return self.submit_many([request_group])[0]
@@ -1,27 +1,60 @@
 import logging
-from typing import Any, Callable, Literal
+import time
+from typing import Any, Callable, Iterator, Literal, Self
 
 import httpx
 from astropy.table import Table
 
+from aeonlib import metrics
 from aeonlib.conf import settings as default_settings
 from aeonlib.ocs.request_models import RequestGroup, SubmittedRequestGroup
+from aeonlib.ocs.transport import clients
 
 logger = logging.getLogger(__name__)
 
 
-def walk_pagination(response: dict, callback: Callable[[dict], None]):
+# Responses that are safe to retry because the request was not processed
+RETRY_STATUSES = (429, 503)
+# Methods that can be repeated without changing the result, and so are retried
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+MAX_RETRY_DELAY = 30.0
+
+
+def walk_pagination(
+    get_json: Callable[[str], dict], response: dict, callback: Callable[[dict], None]
+):
     while response["next"]:
-        response = httpx.get(response["next"]).json()
+        response = get_json(response["next"])
         callback(response)
 
 
+def iter_pages(
+    get_json: Callable[..., dict], url: str, params: dict | None = None
+) -> Iterator[list[dict]]:
+    """Yield the results of each page of a paginated list endpoint, so that only
+    one page is held in memory at a time."""
+    response = get_json(url, params=params)
+    yield response["results"]
+    while response["next"]:
+        response = get_json(response["next"])
+        yield response["results"]
+
+
+def retry_delay(response: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before retrying, from the Retry-After header if present
+    or exponential backoff otherwise."""
+    try:
+        delay = float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        delay = 0.5 * 2 ** (attempt - 1)
+    return min(delay, MAX_RETRY_DELAY)
+
+
 def dict_table(proposals: list[dict], fields: list[str]) -> Table:
     """Construct an Astropy Table from the given list of dictionaries, containing
     only the specified fields.
     """
-    ps = [{field: p[field] for field in fields} for p in proposals]
-    return Table(rows=ps)
+    return Table({field: [p[field] for p in proposals] for field in fields})
 
 
 class LcoFacility:
@@ -30,32 +63,133 @@ class LcoFacility:
     Configuration:
         - AEON_LCO_TOKEN: API token for authentication
         - AEON_LCO_API_ROOT: Root URL of the API
+    Connections are pooled per API root, token and pool settings and shared between
+    facilities, see aeonlib.ocs.transport. Use the facility as a context manager, or
+    call close(), to release its client.
     """
 
+    name = "lco"
+    """Facility name reported to metrics hooks"""
+
     def __init__(self, settings=default_settings):
+        api_root, token = self.credentials(settings)
+        self.client = clients.acquire(api_root, token, settings)
+        self._released = False
+        self.max_retries = settings.http_max_retries
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def credentials(self, settings) -> tuple[str, str]:
+        """Returns the API root and token this facility authenticates with."""
         if not settings.lco_token:
             logger.info(
                 "AEON_LCO_TOKEN setting is missing, request will be unauthenticated"
             )
-            headers = {}
+        return settings.lco_api_root, settings.lco_token
+
+    def close(self) -> None:
+        """Release this facility's client back to the shared pool. Closing a
+        facility more than once has no further effect."""
+        if self._released:
+            return
+        self._released = True
+        clients.release(self.client)
+
+    def send(
+        self, method: str, url: str, retry_unsafe: bool = False, **kwargs
+    ) -> httpx.Response:
+        """Send a request through the pooled client.
+        Responses with a status in RETRY_STATUSES are retried up to
+        AEON_HTTP_MAX_RETRIES times if the method is in IDEMPOTENT_METHODS. Other
+        methods, such as POST, are only retried if retry_unsafe is set, as a
+        request that timed out behind a proxy may still have been processed.
+        Each call, including its retries, is reported to the aeonlib.metrics
+        hooks if any are registered.
+        """
+        start = time.perf_counter()
+        retries = 0
+        max_retries = (
+            self.max_retries
+            if retry_unsafe or method.upper() in IDEMPOTENT_METHODS
+            else 0
+        )
+        try:
+            while True:
+                response = self.client.request(method, url, **kwargs)
+                if response.status_code not in RETRY_STATUSES or retries >= max_retries:
+                    break
+                retries += 1
+                delay = retry_delay(response, retries)
+                logger.info(
+                    "%s %s returned %s, retrying in %.1fs",
+                    method,
+                    url,
+                    response.status_code,
+                    delay,
+                )
+                time.sleep(delay)
+        except httpx.HTTPError:
+            if metrics.hooks:
+                self._emit(method, url, None, start, retries)
+            raise
+        if metrics.hooks:
+            self._emit(method, url, response, start, retries)
+        return response
+
+    def _emit(
+        self,
+        method: str,
+        url: str,
+        response: httpx.Response | None,
+        start: float,
+        retries: int,
+    ) -> None:
+        latency = time.perf_counter() - start
+        if response is None:
+            endpoint, payload_bytes, response_bytes, status = url, 0, 0, "error"
         else:
-            headers = {"Authorization": f"Token {settings.lco_token}"}
-        self.client = httpx.Client(base_url=settings.lco_api_root, headers=headers)
+            endpoint = response.request.url.path
+            payload_bytes = len(response.request.content)
+            response_bytes = len(response.content)
+            status = response.status_code
+        metrics.emit(
+            metrics.CallEvent(
+                facility=self.name,
+                method=method,
+                endpoint=endpoint,
+                payload_bytes=payload_bytes,
+                response_bytes=response_bytes,
+                latency=latency,
+                status=status,
+                retries=retries,
+            )
+        )
 
-    def __del__(self):
-        self.client.close()
+    def get_json(self, url: str, **kwargs) -> Any:
+        response = self.send("GET", url, **kwargs)
+        response.raise_for_status()
+        return response.json()
 
     def proposals(
-        self, format: Literal["dict", "table"] = "table"
+        self,
+        format: Literal["dict", "table"] = "table",
+        fields: list[str] | None = None,
     ) -> Table | list[dict]:
-        response = self.client.get("/proposals/")
-        response.raise_for_status()
-        proposals = response.json()["results"]
-        walk_pagination(response.json(), lambda x: proposals.extend(x["results"]))
+        """All proposals visible to the token. Tables contain the given fields,
+        by default the id, active flag, title and request group count."""
+        response = self.get_json("/proposals/")
+        proposals = response["results"]
+        walk_pagination(
+            self.get_json, response, lambda x: proposals.extend(x["results"])
+        )
         if format == "dict":
             return proposals
         elif format == "table":
-            fields = ["id", "active", "title", "requestgroup_count"]
+            fields = fields or ["id", "active", "title", "requestgroup_count"]
             return dict_table(proposals, fields)
 
     def serialize_request_group(self, request_group: RequestGroup) -> dict:
@@ -71,7 +205,10 @@ class LcoFacility:
     ) -> tuple[bool, list[Any]]:
         payload = self.serialize_request_group(request_group)
         logger.debug("LcoFacility.validate_request_group -> %s", payload)
-        response = self.client.post("/requestgroups/validate/", json=payload)
+        # Validation has no side effects, so it is safe to retry
+        response = self.send(
+            "POST", "/requestgroups/validate/", retry_unsafe=True, json=payload
+        )
         response = response.json()
         logger.debug("<- %s", response)
         if response.get("request_durations"):
@@ -84,7 +221,7 @@ class LcoFacility:
     ) -> SubmittedRequestGroup:
         payload = self.serialize_request_group(request_group)
         logger.debug("-> %s", payload)
-        response = self.client.post("/requestgroups/", json=payload)
+        response = self.send("POST", "/requestgroups/", json=payload)
         response.raise_for_status()
         logger.debug("<- %s", response.content)
         return SubmittedRequestGroup.model_validate_json(response.content)
@@ -0,0 +1,210 @@
+"""
+Low latency submission of RAPID_RESPONSE request groups.
+
+A HotStandby keeps an authenticated connection to the OCS API open and holds a
+pre-serialized request group template. When an alert arrives only the target
+coordinates and observing window are patched into a copy of the template, so no
+pydantic validation or astropy object construction happens on the hot path.
+"""
+
+import copy
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Self
+
+import httpx
+
+from aeonlib.models import SiderealTarget
+from aeonlib.ocs.lco.facility import LcoFacility
+from aeonlib.ocs.request_models import RequestGroup, SubmittedRequestGroup
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LatencyTrace:
+    """Per-stage latencies, in seconds, of a single submission."""
+
+    build: float = 0.0
+    """Time spent patching the template into a payload"""
+    serialize: float = 0.0
+    """Time spent encoding the payload to JSON"""
+    network: float = 0.0
+    """Time between sending the request and receiving the full response"""
+    parse: float = 0.0
+    """Time spent validating the response into a SubmittedRequestGroup"""
+
+    @property
+    def total(self) -> float:
+        return self.build + self.serialize + self.network + self.parse
+
+
+class HotStandby:
+    """
+    Pre-warmed submission path for time sensitive alerts.
+
+    Example:
+        with HotStandby(LcoFacility(), template) as standby:
+            submitted, trace = standby.submit(ra=202.469, dec=47.195, name="S250101a")
+
+    Parameters:
+        facility (LcoFacility): The facility (LCO or SOAR) to submit through.
+        template (RequestGroup): A complete RAPID_RESPONSE request group whose
+            targets are all ICRS sidereal targets. Every configuration target is
+            replaced with the alert coordinates on submission.
+        window (timedelta): Length of the observing window opened at submission
+            time when no explicit window is given.
+        keepalive_interval (float): Seconds between keep-alive pings. This must be
+            shorter than the connection pool keep-alive expiry, which is set by
+            AEON_HTTP_KEEPALIVE_EXPIRY and defaults to 5 seconds.
+        ping_endpoint (str): Cheap authenticated endpoint used for keep-alive pings.
+    """
+
+    def __init__(
+        self,
+        facility: LcoFacility,
+        template: RequestGroup,
+        window: timedelta = timedelta(hours=6),
+        keepalive_interval: float = 4.0,
+        ping_endpoint: str = "/profile/",
+    ):
+        if template.observation_type != "RAPID_RESPONSE":
+            raise ValueError(
+                "HotStandby templates must have observation type RAPID_RESPONSE,"
+                f" not {template.observation_type}"
+            )
+        for request in template.requests:
+            for configuration in request.configurations:
+                target = configuration.target
+                if not isinstance(target, SiderealTarget) or target.type != "ICRS":
+                    raise ValueError(
+                        "HotStandby templates must only have ICRS sidereal targets,"
+                        f" not {target.type} target {target.name}"
+                    )
+        self.facility = facility
+        self.template = facility.serialize_request_group(template)
+        self.window = window
+        self.keepalive_interval = keepalive_interval
+        self.ping_endpoint = ping_endpoint
+        self.last_trace: LatencyTrace | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def ping(self, raise_errors: bool = False) -> float:
+        """Make a request to the ping endpoint to open or refresh the pooled
+        connection. Returns the round trip time in seconds. Failures, including
+        error responses such as 401 for an expired token, are logged, or raised
+        if raise_errors is set."""
+        start = time.perf_counter()
+        try:
+            self.facility.send("GET", self.ping_endpoint).raise_for_status()
+        except httpx.HTTPError:
+            if raise_errors:
+                raise
+            logger.warning("HotStandby keep-alive ping failed", exc_info=True)
+        return time.perf_counter() - start
+
+    def start(self) -> None:
+        """Warm the connection and start the background keep-alive thread.
+        Raises httpx.HTTPError if the ping endpoint cannot be reached or
+        returns an error, so that a bad token is found before an alert."""
+        if self._thread and self._thread.is_alive():
+            return
+        logger.debug("HotStandby warmed up in %.3fs", self.ping(raise_errors=True))
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._keepalive, name="aeonlib-hot-standby", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the keep-alive thread. The facility connection is left open."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _keepalive(self) -> None:
+        while not self._stop.wait(self.keepalive_interval):
+            self.ping()
+
+    def build_payload(
+        self,
+        ra: float,
+        dec: float,
+        name: str | None = None,
+        window: tuple[datetime, datetime] | None = None,
+    ) -> dict:
+        """Patch a copy of the serialized template with the alert target and window.
+
+        Parameters:
+            ra (float): Right ascension in decimal degrees.
+            dec (float): Declination in decimal degrees.
+            name (str): Target name, and request group name, for this alert.
+            window (tuple[datetime, datetime]): Observing window. Defaults to now
+                until now plus the standby window length.
+        Returns:
+            dict: A payload ready to post to the requestgroups endpoint.
+        """
+        if window is None:
+            start = datetime.now(timezone.utc)
+            window = (start, start + self.window)
+        windows = [{"start": window[0].isoformat(), "end": window[1].isoformat()}]
+        payload = copy.deepcopy(self.template)
+        if name:
+            payload["name"] = name
+        for request in payload["requests"]:
+            request["windows"] = windows
+            for configuration in request["configurations"]:
+                target = configuration["target"]
+                target["ra"] = ra
+                target["dec"] = dec
+                if name:
+                    target["name"] = name
+        return payload
+
+    def submit(
+        self,
+        ra: float,
+        dec: float,
+        name: str | None = None,
+        window: tuple[datetime, datetime] | None = None,
+    ) -> tuple[SubmittedRequestGroup, LatencyTrace]:
+        """Submit the template for a new alert position.
+
+        See build_payload for a description of the parameters.
+        Returns:
+            tuple[SubmittedRequestGroup, LatencyTrace]: The submitted request group
+            and the time spent in each stage of the submission.
+        """
+        trace = LatencyTrace()
+        t0 = time.perf_counter()
+        payload = self.build_payload(ra, dec, name=name, window=window)
+        t1 = time.perf_counter()
+        content = json.dumps(payload).encode()
+        t2 = time.perf_counter()
+        response = self.facility.send(
+            "POST",
+            "/requestgroups/",
+            content=content,
+            headers={"Content-Type": "application/json"},
+        )
+        t3 = time.perf_counter()
+        trace.build, trace.serialize, trace.network = t1 - t0, t2 - t1, t3 - t2
+        self.last_trace = trace
+        response.raise_for_status()
+        submitted = SubmittedRequestGroup.model_validate_json(response.content)
+        trace.parse = time.perf_counter() - t3
+        logger.debug("HotStandby.submit %s", trace)
+        return submitted, trace
@@ -0,0 +1,270 @@
+"""
+Local SQLite mirror of the request groups stored in an OCS API.
+
+Listing every request group of a large proposal through the API takes minutes.
+The mirror does an initial bulk load once and afterwards only fetches request
+groups modified since the newest one it has seen, so status views can query
+indexed local tables instead of the API.
+
+Example:
+    with LcoFacility() as facility:
+        mirror = RequestGroupMirror("requestgroups.sqlite", facility)
+        mirror.sync(proposal="LCO2025A-001")
+        pending = mirror.query(state="PENDING", proposal="LCO2025A-001")
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Literal
+
+from astropy.table import Table
+
+from aeonlib.ocs.lco.facility import LcoFacility, dict_table
+from aeonlib.ocs.request_models import SubmittedRequestGroup
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS request_groups (
+    id INTEGER PRIMARY KEY,
+    proposal TEXT NOT NULL,
+    state TEXT NOT NULL,
+    name TEXT NOT NULL,
+    observation_type TEXT NOT NULL,
+    submitter TEXT NOT NULL,
+    created TEXT NOT NULL,
+    modified TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS request_groups_proposal_state
+    ON request_groups (proposal, state);
+CREATE INDEX IF NOT EXISTS request_groups_state ON request_groups (state);
+CREATE INDEX IF NOT EXISTS request_groups_created ON request_groups (created);
+CREATE INDEX IF NOT EXISTS request_groups_modified ON request_groups (modified);
+CREATE TABLE IF NOT EXISTS sync_state (
+    scope TEXT PRIMARY KEY,
+    modified TEXT NOT NULL,
+    synced_at TEXT NOT NULL
+);
+"""
+
+# Columns shown when querying with format="table"
+SUMMARY_FIELDS = ["id", "name", "proposal", "state", "observation_type", "modified"]
+
+
+def timestamp(value: str | datetime) -> str:
+    """Normalize a timestamp to a fixed width UTC string, so that timestamps
+    compare correctly as text in SQLite."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class RequestGroupMirror:
+    """
+    SQLite backed mirror of the request groups visible to a facility's token.
+
+    Request groups are stored as the JSON returned by the API, alongside indexed
+    columns for the proposal, state, name, observation type and timestamps.
+    Syncs are incremental: each scope (all request groups, or one proposal)
+    remembers the newest modification time it has seen and only asks the API for
+    request groups modified since then.
+
+    Parameters:
+        path (str | Path): SQLite database file, or ":memory:".
+        facility (LcoFacility): Facility to sync from, e.g. LcoFacility or SoarFacility.
+            Not needed to query an existing mirror.
+        page_size (int): Number of request groups requested per API call.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = ":memory:",
+        facility: LcoFacility | None = None,
+        page_size: int = 100,
+    ):
+        self.facility = facility
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._db:
+            version = self._db.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, SCHEMA_VERSION):
+                raise ValueError(
+                    f"Mirror {path} has schema version {version}, "
+                    f"expected {SCHEMA_VERSION}"
+                )
+            self._db.executescript(SCHEMA)
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        self._db.close()
+
+    def watermark(self, proposal: str | None = None) -> str | None:
+        """Newest modification time synced for a proposal, or for all proposals."""
+        row = self._db.execute(
+            "SELECT modified FROM sync_state WHERE scope = ?", (proposal or "*",)
+        ).fetchone()
+        return row["modified"] if row else None
+
+    def sync(self, proposal: str | None = None, full: bool = False) -> int:
+        """
+        Fetch request groups created or modified since the last sync.
+
+        Args:
+            proposal: Only sync this proposal. Each proposal keeps its own watermark.
+            full: Ignore the watermark and reload every request group.
+
+        Returns:
+            int: Number of distinct request groups fetched from the API.
+        """
+        if self.facility is None:
+            raise ValueError("A facility is required to sync the mirror")
+        watermark = None if full else self.watermark(proposal)
+        params: dict[str, Any] = {"ordering": "modified", "limit": self.page_size}
+        if proposal:
+            params["proposal"] = proposal
+        if watermark:
+            params["modified_after"] = watermark
+        logger.debug("Syncing request groups modified after %s", watermark)
+
+        seen: set[int] = set()
+        response = self.facility.get_json("/requestgroups/", params=params)
+        while True:
+            results = response["results"]
+            self.upsert(results)
+            seen.update(rg["id"] for rg in results)
+            newest = max((timestamp(rg["modified"]) for rg in results), default=None)
+            if newest and (watermark is None or newest > watermark):
+                watermark = newest
+                self._save_watermark(proposal, watermark)
+            if not response["next"]:
+                break
+            if newest and newest == params.get("modified_after"):
+                # A full page of request groups modified at the same instant
+                response = self.facility.get_json(response["next"])
+            else:
+                # Restart from the newest modification time instead of following
+                # offsets, which would skip records modified during the sync
+                params["modified_after"] = watermark
+                response = self.facility.get_json("/requestgroups/", params=params)
+        logger.info("Synced %d request groups", len(seen))
+        return len(seen)
+
+    def _save_watermark(self, proposal: str | None, modified: str) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO sync_state (scope, modified, synced_at) VALUES (?, ?, ?)"
+                " ON CONFLICT (scope) DO UPDATE SET"
+                " modified = excluded.modified, synced_at = excluded.synced_at",
+                (proposal or "*", modified, timestamp(datetime.now(timezone.utc))),
+            )
+
+    def upsert(self, request_groups: list[dict]) -> int:
+        """Insert or update request groups as returned by the API. Older versions
+        never replace newer ones."""
+        rows = [
+            (
+                rg["id"],
+                rg["proposal"],
+                rg["state"],
+                rg["name"],
+                rg["observation_type"],
+                rg["submitter"],
+                timestamp(rg["created"]),
+                timestamp(rg["modified"]),
+                json.dumps(rg),
+            )
+            for rg in request_groups
+        ]
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO request_groups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (id) DO UPDATE SET"
+                " proposal = excluded.proposal, state = excluded.state,"
+                " name = excluded.name, observation_type = excluded.observation_type,"
+                " submitter = excluded.submitter, created = excluded.created,"
+                " modified = excluded.modified, data = excluded.data"
+                " WHERE excluded.modified >= request_groups.modified",
+                rows,
+            )
+        return len(rows)
+
+    def get(self, request_group_id: int) -> SubmittedRequestGroup | None:
+        row = self._db.execute(
+            "SELECT data FROM request_groups WHERE id = ?", (request_group_id,)
+        ).fetchone()
+        return SubmittedRequestGroup.model_validate_json(row["data"]) if row else None
+
+    def query(
+        self,
+        state: str | list[str] | None = None,
+        proposal: str | list[str] | None = None,
+        observation_type: str | None = None,
+        created_after: datetime | None = None,
+        created_before: datetime | None = None,
+        modified_after: datetime | None = None,
+        modified_before: datetime | None = None,
+        limit: int | None = None,
+        format: Literal["model", "dict", "table"] = "model",
+    ) -> list[SubmittedRequestGroup] | list[dict] | Table:
+        """
+        Query mirrored request groups, newest modification first.
+
+        Returns:
+            SubmittedRequestGroup models, the request groups as returned by the
+            API, or a table of their SUMMARY_FIELDS depending on format.
+        """
+        clauses: list[str] = []
+        args: list[Any] = []
+        for column, value in (("state", state), ("proposal", proposal)):
+            if value is None:
+                continue
+            values = [value] if isinstance(value, str) else value
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+            args.extend(values)
+        if observation_type:
+            clauses.append("observation_type = ?")
+            args.append(observation_type)
+        for column, op, value in (
+            ("created", ">=", created_after),
+            ("created", "<", created_before),
+            ("modified", ">=", modified_after),
+            ("modified", "<", modified_before),
+        ):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                args.append(timestamp(value))
+        sql = "SELECT * FROM request_groups"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY modified DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+        rows = self._db.execute(sql, args).fetchall()
+
+        if format == "table":
+            return dict_table([dict(row) for row in rows], SUMMARY_FIELDS)
+        if format == "dict":
+            return [json.loads(row["data"]) for row in rows]
+        return [SubmittedRequestGroup.model_validate_json(row["data"]) for row in rows]
+
+    def counts(self, proposal: str | None = None) -> dict[str, int]:
+        """Number of request groups in each state, for one or all proposals."""
+        sql = "SELECT state, COUNT(*) AS n FROM request_groups"
+        args: tuple = ()
+        if proposal:
+            sql += " WHERE proposal = ?"
+            args = (proposal,)
+        rows = self._db.execute(sql + " GROUP BY state", args).fetchall()
+        return {row["state"]: row["n"] for row in rows}
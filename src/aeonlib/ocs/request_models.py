@@ -13,6 +13,7 @@ from pydantic.types import (
 from aeonlib.models import Window
 from aeonlib.ocs.lco.instruments import LCO_INSTRUMENTS
 from aeonlib.ocs.soar.instruments import SOAR_INSTRUMENTS
+from aeonlib.serialization import CompactPickle
 
 
 class Location(BaseModel):
@@ -75,7 +76,7 @@ class Request(BaseModel):
     location: Location
 
 
-class RequestGroup(BaseModel):
+class RequestGroup(CompactPickle, BaseModel):
     """
     An Observation request for any observatory that supports an OCS API.
     """
@@ -0,0 +1,504 @@
+"""
+Offline forecasts of how many request groups of a semester will complete.
+
+The semester's nights at each site of the network are divided into slots. Each
+request is placed, in priority order, in the earliest run of free slots long
+enough for it, on a telescope of its class, within one of its windows, with its
+target under its airmass limit and the night not lost to weather. Many weather
+realizations are packed at once, as the rows of one array per site, so a
+semester of thousands of requests is simulated in seconds. The fraction of
+realizations in which a request was placed is its completion probability.
+
+This is a capacity forecast, not a replica of the LCO scheduler: requests are
+packed greedily rather than optimally, lunar and seeing constraints are
+ignored, and non-sidereal targets are treated as always above the airmass
+limit.
+
+Example:
+    forecast = simulate(request_groups, datetime(2025, 8, 1), datetime(2026, 2, 1))
+    for request_group, p in zip(request_groups, forecast.completion):
+        print(request_group.name, p)
+"""
+
+import logging
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Sequence
+
+import astropy.time
+import astropy.units as u
+import erfa
+import numpy as np
+from astropy.coordinates import EarthLocation
+
+from aeonlib.coordinates import TargetArrays, site_frames
+from aeonlib.models import SiderealTarget
+from aeonlib.ocs.request_models import Request, RequestGroup
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Site:
+    """
+    An observatory site of the network.
+
+    Parameters:
+        name (str): Site code, as in Location.site.
+        location (EarthLocation): Where the site is.
+        telescopes (dict[str, int]): Number of telescopes of each class, e.g.
+            {"1m0": 3}.
+        weather_loss (float): Probability that a night is lost to weather.
+    """
+
+    name: str
+    location: EarthLocation
+    telescopes: dict[str, int]
+    weather_loss: float = 0.0
+
+
+def _site(
+    name: str,
+    lon: float,
+    lat: float,
+    height: float,
+    telescopes: dict[str, int],
+    weather_loss: float,
+) -> Site:
+    location = EarthLocation.from_geodetic(
+        lon=lon * u.deg, lat=lat * u.deg, height=height * u.m
+    )
+    return Site(name, location, telescopes, weather_loss)
+
+
+LCO_SITES = {
+    site.name: site
+    for site in [
+        _site("coj", 149.0708, -31.2729, 1116, {"2m0": 1, "1m0": 2, "0m4": 2}, 0.35),
+        _site("cpt", 20.8101, -32.3805, 1460, {"1m0": 3, "0m4": 1}, 0.3),
+        _site("elp", -104.0152, 30.6801, 2070, {"1m0": 2, "0m4": 1}, 0.25),
+        _site("lsc", -70.8048, -30.1674, 2198, {"1m0": 3, "0m4": 2}, 0.15),
+        _site("ogg", -156.2576, 20.7069, 3055, {"2m0": 1, "0m4": 2}, 0.2),
+        _site("tfn", -16.5117, 28.3002, 2330, {"1m0": 2, "0m4": 2}, 0.25),
+        _site("tlv", 34.7635, 30.5953, 875, {"1m0": 1}, 0.2),
+    ]
+}
+"""Sites of the LCO network with their telescopes and rough fractions of nights
+lost to weather. Adjust them to the semester being forecast."""
+
+REQUEST_OVERHEAD = 180.0
+"""Seconds to slew to and acquire the target of a request"""
+
+CONFIGURATION_OVERHEAD = 30.0
+"""Seconds to set up each configuration"""
+
+EXPOSURE_OVERHEAD = 15.0
+"""Seconds to read out each exposure"""
+
+TYPE_PRIORITY = {"RAPID_RESPONSE": 4, "DIRECT": 3, "TIME_CRITICAL": 2, "NORMAL": 1}
+
+SIDEREAL_RATE = 2 * math.pi * 1.00273781191135448
+"""Rotation of the Earth relative to the stars, in radians per day"""
+
+CHUNK = 256
+"""Number of start slots searched at once for each request"""
+
+
+def estimate_duration(request: Request) -> float:
+    """
+    Rough duration of a request in seconds: its exposures, or the repeat duration
+    of REPEAT_ configurations, with fixed overheads per exposure, configuration and
+    request.
+    """
+    total = 0.0
+    for configuration in request.configurations:
+        if configuration.repeat_duration:
+            total += configuration.repeat_duration
+        else:
+            total += sum(
+                c.exposure_count * (c.exposure_time + EXPOSURE_OVERHEAD)
+                for c in configuration.instrument_configs
+            )
+        total += CONFIGURATION_OVERHEAD
+    return REQUEST_OVERHEAD + total * request.configuration_repeats
+
+
+def default_priority(request_group: RequestGroup) -> float:
+    """Observation types in order of TYPE_PRIORITY, then IPP value."""
+    return TYPE_PRIORITY[request_group.observation_type] * 1e3 + request_group.ipp_value
+
+
+def _mjd(value: astropy.time.Time | datetime) -> float:
+    if not isinstance(value, astropy.time.Time):
+        value = astropy.time.Time(value)
+    if value.scale != "utc":
+        value = value.utc
+    # Cheaper than Time.mjd, which converts through the mjd format
+    return (float(value.jd1) - 2400000.5) + float(value.jd2)
+
+
+@dataclass
+class _Nights:
+    """The dark slots of a site"""
+
+    site: Site
+    start: np.ndarray
+    """MJD of the start of each slot"""
+    cos_lst: np.ndarray
+    sin_lst: np.ndarray
+    night: np.ndarray
+    """Index of the night of each slot"""
+    breaks: np.ndarray
+    """Number of gaps in time up to each slot. Runs of slots without a gap are
+    contiguous"""
+    sin_lat: float
+    cos_lat: float
+
+    @classmethod
+    def compute(
+        cls, site: Site, start: float, end: float, slot: float, twilight: float
+    ) -> "_Nights":
+        count = int((end - start) * 86400 // slot)
+        starts = start + np.arange(count) * (slot / 86400)
+        # Evaluated at the middle of each slot
+        middles = starts + slot / 172800
+        # The Earth orientation is computed daily and interpolated, as computing it
+        # for every slot of a semester would take longer than the packing
+        nodes = np.arange(math.floor(start), math.ceil(end) + 1, dtype=float)
+        frames = site_frames(
+            site.location, astropy.time.Time(nodes, format="mjd", scale="utc")
+        )
+        node = np.clip(np.floor(middles - nodes[0]).astype(np.int64), 0, len(nodes) - 1)
+        lst = frames.sidereal_time[node] + (middles - nodes[node]) * SIDEREAL_RATE
+        sun_ra, sun_dec = frames.sun_radec()
+        sun_ra = np.interp(middles, nodes, np.unwrap(sun_ra))
+        sun_dec = np.interp(middles, nodes, sun_dec)
+        _, sun_altitude = erfa.hd2ae(lst - sun_ra, sun_dec, frames.latitude)
+        dark = np.flatnonzero(sun_altitude < math.radians(twilight))
+        # Nights run from local noon to local noon
+        local = starts[dark] + site.location.lon.to_value(u.deg) / 360 - 0.5
+        night = np.floor(local).astype(np.int64)
+        return cls(
+            site=site,
+            start=starts[dark],
+            cos_lst=np.cos(lst[dark]),
+            sin_lst=np.sin(lst[dark]),
+            night=night - night.min() if len(night) else night,
+            breaks=np.cumsum(np.diff(dark, prepend=-1) != 1),
+            sin_lat=math.sin(frames.latitude),
+            cos_lat=math.cos(frames.latitude),
+        )
+
+    @property
+    def night_count(self) -> int:
+        return int(self.night.max()) + 1 if len(self.night) else 0
+
+
+@dataclass
+class _Candidates:
+    """Where a request can start at one site, before other requests are placed"""
+
+    site: int
+    """Index of the site in the simulated sites"""
+    slots: np.ndarray
+    """Dark slots in the request's windows with the target observable"""
+    starts: np.ndarray
+    """Positions in slots where enough contiguous slots follow"""
+
+
+def _observable(
+    nights: _Nights,
+    slots: np.ndarray,
+    target,
+    place: tuple[float, float] | None,
+    max_airmass: float,
+) -> np.ndarray:
+    """Which slots have the target under max_airmass. place is the apparent right
+    ascension, or the hour angle, and declination of the target, in radians."""
+    if place is None:
+        return np.ones(len(slots), dtype=bool)
+    sin_min = 1 / max_airmass
+    if target.type == "ALTAZ":
+        return np.full(len(slots), math.sin(target.altitude.rad) >= sin_min)
+    ra, dec = place
+    # The target is under the limit where cos(hour angle) >= threshold
+    denominator = math.cos(dec) * nights.cos_lat
+    numerator = sin_min - math.sin(dec) * nights.sin_lat
+    if abs(denominator) < 1e-12:
+        threshold = -math.inf if numerator <= 0 else math.inf
+    else:
+        threshold = numerator / denominator
+    if target.type == "HOUR_ANGLE":
+        return np.full(len(slots), math.cos(ra) >= threshold)
+    cos_ha = nights.cos_lst[slots] * math.cos(ra) + nights.sin_lst[slots] * math.sin(ra)
+    return cos_ha >= threshold
+
+
+def _candidates(
+    request: Request,
+    duration: float,
+    nights: list[_Nights],
+    places: dict[int, tuple[float, float]],
+    slot: float,
+    begin: float,
+    finish: float,
+) -> list[_Candidates]:
+    telescope_class = request.location.telescope_class
+    length = math.ceil(duration / slot)
+    target = request.configurations[0].target
+    max_airmass = min(c.constraints.max_airmass for c in request.configurations)
+    spans = [
+        (begin if w.start is None else _mjd(w.start), _mjd(w.end))
+        for w in request.windows
+    ]
+    result = []
+    for site, n in enumerate(nights):
+        if not n.site.telescopes.get(telescope_class):
+            continue
+        if request.location.site not in (None, n.site.name):
+            continue
+        # Slots that lie entirely within a window
+        slots = np.concatenate(
+            [
+                np.arange(
+                    np.searchsorted(n.start, max(a, begin)),
+                    np.searchsorted(n.start, min(b, finish) - slot / 86400, "right"),
+                )
+                for a, b in spans
+            ]
+            or [np.zeros(0, dtype=np.int64)]
+        )
+        if len(spans) > 1:
+            slots = np.unique(slots)
+        slots = slots[
+            _observable(n, slots, target, places.get(id(target)), max_airmass)
+        ]
+        if len(slots) < length:
+            continue
+        # Starts followed by length - 1 slots that are contiguous in time
+        last = np.arange(length - 1, len(slots))
+        first = last - (length - 1)
+        contiguous = (slots[last] - slots[first] == length - 1) & (
+            n.breaks[slots[last]] == n.breaks[slots[first]]
+        )
+        starts = first[contiguous]
+        if len(starts):
+            result.append(_Candidates(site=site, slots=slots, starts=starts))
+    return result
+
+
+def _first_fit(
+    candidate: _Candidates,
+    length: int,
+    nights: _Nights,
+    free: np.ndarray,
+    lost: np.ndarray,
+) -> np.ndarray:
+    """The first slot of the earliest run of length free slots in each
+    realization, or -1."""
+    realizations = free.shape[0]
+    first = np.full(realizations, -1, dtype=np.int64)
+    pending = np.arange(realizations)
+    slots, starts = candidate.slots, candidate.starts
+    # Most realizations find a run early, so starts are searched a chunk at a time
+    for lo in range(0, len(starts), CHUNK):
+        chunk = starts[lo : lo + CHUNK]
+        span = slots[chunk[0] : chunk[-1] + length]
+        available = (free[pending[:, np.newaxis], span] > 0) & ~lost[
+            pending[:, np.newaxis], nights.night[span]
+        ]
+        counts = np.zeros((len(pending), len(span) + 1), dtype=np.int32)
+        np.cumsum(available, axis=1, out=counts[:, 1:])
+        offsets = chunk - chunk[0]
+        fits = counts[:, offsets + length] - counts[:, offsets] == length
+        found = fits.any(axis=1)
+        first[pending[found]] = slots[chunk[fits[found].argmax(axis=1)]]
+        pending = pending[~found]
+        if not len(pending):
+            break
+    return first
+
+
+@dataclass
+class Forecast:
+    """Outcome of simulate"""
+
+    request_groups: list[RequestGroup]
+    sites: list[str]
+    placed: np.ndarray
+    """Site index of each request in each realization, -1 where it was not
+    placed, shaped (realizations, requests). Requests are in request group order"""
+    offsets: np.ndarray
+    """Column in placed of the first request of each request group, followed by
+    the number of requests"""
+    durations: np.ndarray
+    """Estimated seconds of each request"""
+
+    @property
+    def realizations(self) -> int:
+        return self.placed.shape[0]
+
+    @property
+    def request_completion(self) -> np.ndarray:
+        """Probability that each request completes"""
+        return (self.placed >= 0).mean(axis=0)
+
+    @property
+    def completion(self) -> np.ndarray:
+        """Probability that all the requests of each request group complete"""
+        done = self.placed >= 0
+        return np.array(
+            [
+                done[:, a:b].all(axis=1).mean()
+                for a, b in zip(self.offsets[:-1], self.offsets[1:])
+            ]
+        )
+
+    @property
+    def expected_completed(self) -> float:
+        """Expected number of request groups with all their requests complete"""
+        return float(self.completion.sum())
+
+    def site_hours(self) -> dict[str, float]:
+        """Mean hours of observations placed at each site"""
+        return {
+            name: float(
+                ((self.placed == i) * self.durations).sum() / self.realizations / 3600
+            )
+            for i, name in enumerate(self.sites)
+        }
+
+
+def simulate(
+    request_groups: Sequence[RequestGroup],
+    start: astropy.time.Time | datetime,
+    end: astropy.time.Time | datetime,
+    sites: Sequence[Site] = tuple(LCO_SITES.values()),
+    realizations: int = 100,
+    slot: float = 600.0,
+    twilight: float = -12.0,
+    duration: Callable[[Request], float] = estimate_duration,
+    priority: Callable[[RequestGroup], float] = default_priority,
+    seed: int | None = None,
+) -> Forecast:
+    """
+    Forecast the completion of request groups over a semester.
+
+    Args:
+        request_groups: The semester's request groups.
+        start, end: The semester.
+        sites: Sites of the network, with their telescopes and weather losses.
+        realizations: Number of weather realizations simulated.
+        slot: Length of a scheduling slot in seconds. Request durations are
+            rounded up to a whole number of slots.
+        twilight: Altitude in degrees under which the Sun must be for a slot to
+            be usable.
+        duration: Estimated seconds of a request, see estimate_duration.
+        priority: Request groups are placed in decreasing priority, see
+            default_priority. Ties go to the requests with fewer places to go.
+        seed: Seed of the weather realizations.
+
+    Returns:
+        The site each request was placed at in each realization, from which
+        completion probabilities are derived.
+    """
+    begin, finish = _mjd(start), _mjd(end)
+    rng = np.random.default_rng(seed)
+    nights = [_Nights.compute(s, begin, finish, slot, twilight) for s in sites]
+    # Free telescopes of each class, and lost nights, per site and realization
+    free = [
+        {
+            telescope_class: np.full((realizations, len(n.start)), count, np.int16)
+            for telescope_class, count in n.site.telescopes.items()
+        }
+        for n in nights
+    ]
+    lost = [
+        rng.random((realizations, n.night_count)) < n.site.weather_loss for n in nights
+    ]
+
+    requests = [r for rg in request_groups for r in rg.requests]
+    offsets = np.cumsum([0] + [len(rg.requests) for rg in request_groups])
+    durations = np.array([duration(r) for r in requests], dtype=float)
+    places = _apparent(requests, (begin + finish) / 2)
+    candidates = [
+        _candidates(request, durations[i], nights, places, slot, begin, finish)
+        for i, request in enumerate(requests)
+    ]
+    request_priority = [priority(rg) for rg in request_groups for _ in rg.requests]
+    order = sorted(
+        range(len(requests)),
+        key=lambda i: (
+            -request_priority[i],
+            sum(len(c.starts) for c in candidates[i]),
+            i,
+        ),
+    )
+
+    placed = np.full((realizations, len(requests)), -1, dtype=np.int16)
+    rows = np.arange(realizations)
+    for i in order:
+        if not candidates[i]:
+            continue
+        telescope_class = requests[i].location.telescope_class
+        length = math.ceil(durations[i] / slot)
+        best_time = np.full(realizations, np.inf)
+        best_site = np.full(realizations, -1)
+        best_slot = np.zeros(realizations, dtype=np.int64)
+        for candidate in candidates[i]:
+            site = candidate.site
+            first = _first_fit(
+                candidate, length, nights[site], free[site][telescope_class], lost[site]
+            )
+            found = first >= 0
+            time = np.where(found, nights[site].start[np.maximum(first, 0)], np.inf)
+            better = time < best_time
+            best_time[better] = time[better]
+            best_site[better] = site
+            best_slot[better] = first[better]
+        for site in np.unique(best_site[best_site >= 0]):
+            chosen = rows[best_site == site]
+            taken = best_slot[chosen][:, np.newaxis] + np.arange(length)
+            free[site][telescope_class][chosen[:, np.newaxis], taken] -= 1
+        placed[:, i] = best_site
+    forecast = Forecast(
+        request_groups=list(request_groups),
+        sites=[s.name for s in sites],
+        placed=placed,
+        offsets=offsets,
+        durations=durations,
+    )
+    logger.info(
+        "Forecast %d of %d request groups to complete over %d realizations",
+        forecast.expected_completed,
+        len(request_groups),
+        realizations,
+    )
+    return forecast
+
+
+def _apparent(requests: list[Request], mjd: float) -> dict[int, tuple[float, float]]:
+    """The apparent right ascension, or hour angle, and declination in radians of
+    the sidereal targets of requests, in the middle of the semester, by target id.
+    ICRS targets are transformed all at once."""
+    targets = {
+        id(r.configurations[0].target): r.configurations[0].target
+        for r in requests
+        if r.configurations and isinstance(r.configurations[0].target, SiderealTarget)
+    }
+    places: dict[int, tuple[float, float]] = {}
+    icrs = [t for t in targets.values() if t.type == "ICRS"]
+    if icrs:
+        time = astropy.time.Time([mjd], format="mjd", scale="utc")
+        # Apparent places do not depend on the site
+        frames = site_frames(EarthLocation.from_geocentric(0, 0, 0, unit=u.m), time)
+        ra, dec = frames.apparent(TargetArrays.from_targets(icrs))
+        for j, target in enumerate(icrs):
+            places[id(target)] = (float(ra[0, j]), float(dec[0, j]))
+    for key, target in targets.items():
+        if target.type == "HOUR_ANGLE":
+            places[key] = (target.hour_angle.rad, target.dec.rad)  # type: ignore
+        elif target.type == "ALTAZ":
+            places[key] = (0.0, 0.0)
+    return places
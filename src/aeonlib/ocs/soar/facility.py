@@ -1,8 +1,5 @@
 from logging import getLogger
 
-import httpx
-
-from aeonlib.conf import settings as default_settings
 from aeonlib.ocs.lco.facility import LcoFacility
 
 logger = getLogger(__name__)
@@ -18,21 +15,18 @@ class SoarFacility(LcoFacility):
         - AEON_SOAR_API_ROOT: Root URL of the API
     """
 
-    def __init__(self, settings=default_settings):
+    name = "soar"
+
+    def credentials(self, settings) -> tuple[str, str]:
         """
         Attempt to authenticate with the SOAR specific credentials, or fall back
         to LCO credentials if they don't exist.
         """
         if not settings.soar_token:
-            logger.warn("AEON_SOAR_TOKEN setting is missing, trying LCO credentials")
+            logger.warning("AEON_SOAR_TOKEN setting is missing, trying LCO credentials")
             if not settings.lco_token:
-                logger.warn(
+                logger.warning(
                     "AEON_LCO_TOKEN setting is missing, requests will be unauthenticated"
                 )
-            else:
-                self.headers = {"Authorization": f"Token {settings.lco_token}"}
-        else:
-            self.headers = {"Authorization": f"Token {settings.soar_token}"}
-        self.client = httpx.Client(
-            base_url=settings.soar_api_root, headers=self.headers
-        )
+            return settings.soar_api_root, settings.lco_token
+        return settings.soar_api_root, settings.soar_token
@@ -0,0 +1,311 @@
+"""
+In-process stand-in for the OCS API, for offline tests and benchmarks.
+
+The stand-in implements the parts of the observation portal API used by the LCO
+and SOAR facilities with an in-memory database and an httpx.MockTransport, so
+facilities talk to it through their normal code paths. Latency, error rates and
+429 throttling are configurable and deterministic for a given seed.
+
+Example:
+    with OcsStandIn(latency=0.05, throttle_every=10) as ocs:
+        facility = LcoFacility(ocs.settings(http_max_retries=3))
+        facility.submit_request_group(request_group)
+"""
+
+import json
+import logging
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Self
+
+import httpx
+from pydantic import ValidationError
+
+from aeonlib.conf import Settings
+from aeonlib.ocs.request_models import RequestGroup
+from aeonlib.ocs.transport import clients
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = ("COMPLETED", "WINDOW_EXPIRED", "FAILURE_LIMIT_REACHED", "CANCELED")
+
+# Rough per-configuration and per-exposure overheads used for request durations
+CONFIGURATION_OVERHEAD = 90.0
+EXPOSURE_OVERHEAD = 10.0
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _isoformat(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _parse_datetime(value: str) -> datetime:
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class OcsStandIn:
+    """
+    In-memory OCS API serving /profile/, /proposals/, /requestgroups/,
+    /requestgroups/validate/, /requestgroups/{id}/ and /requestgroups/{id}/cancel/.
+
+    Parameters:
+        api_root (str): The API root facilities should be configured with.
+        proposals (list[dict]): Proposals to serve. Defaults to a single active
+            proposal with the id TEST_PROPOSAL.
+        page_size (int): Default page size of list endpoints.
+        latency (float): Seconds to sleep before answering each request.
+        error_rate (float): Probability of answering a request with a 500 error.
+        throttle_every (int): Answer every nth request with a 429 response.
+        retry_after (float): Retry-After value sent with 429 responses.
+        seed (int): Seed for the error injection random number generator.
+        clock (Callable[[], datetime]): Source of created/modified timestamps.
+    """
+
+    def __init__(
+        self,
+        api_root: str = "http://ocs.standin/api/",
+        proposals: list[dict] | None = None,
+        page_size: int = 10,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_every: int | None = None,
+        retry_after: float = 0.0,
+        seed: int = 0,
+        clock: Callable[[], datetime] = utcnow,
+    ):
+        self.api_root = api_root
+        self.proposals = proposals or [
+            {"id": "TEST_PROPOSAL", "active": True, "title": "Stand-in proposal"}
+        ]
+        self.page_size = page_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.clock = clock
+        self.request_groups: dict[int, dict] = {}
+        self.request_count = 0
+        """Total number of requests received, including throttled ones"""
+        self.path_counts: dict[str, int] = {}
+        """Number of requests received per method and path, e.g. "GET /proposals/" """
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._next_request_id = 1
+        self._prefix = httpx.URL(api_root).path.rstrip("/")
+        self._routes: list[tuple[str, re.Pattern, Callable[..., httpx.Response]]] = [
+            ("GET", re.compile(r"/profile/"), self._profile),
+            ("GET", re.compile(r"/proposals/"), self._list_proposals),
+            ("GET", re.compile(r"/requestgroups/"), self._list_request_groups),
+            ("POST", re.compile(r"/requestgroups/"), self._submit),
+            ("POST", re.compile(r"/requestgroups/validate/"), self._validate),
+            ("GET", re.compile(r"/requestgroups/(\d+)/"), self._get_request_group),
+            ("POST", re.compile(r"/requestgroups/(\d+)/cancel/"), self._cancel),
+        ]
+
+    def __enter__(self) -> Self:
+        self.install()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.uninstall()
+
+    @property
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def install(self) -> None:
+        """Route all facility clients for this api_root to the stand-in."""
+        clients.mount(self.api_root, self.transport)
+
+    def uninstall(self) -> None:
+        clients.unmount(self.api_root)
+
+    def settings(self, **kwargs) -> Settings:
+        """Settings that point LCO and SOAR facilities at this stand-in."""
+        defaults: dict[str, Any] = {
+            "lco_api_root": self.api_root,
+            "lco_token": "standin",
+            "soar_api_root": self.api_root,
+            "soar_token": "standin",
+        }
+        return Settings(**{**defaults, **kwargs})
+
+    def set_state(self, request_group_id: int, state: str) -> None:
+        """Change the state of a stored request group and its requests, as the
+        scheduler would."""
+        with self._lock:
+            request_group = self.request_groups[request_group_id]
+            request_group["state"] = state
+            request_group["modified"] = _isoformat(self.clock())
+            for request in request_group["requests"]:
+                request["state"] = state
+                request["modified"] = request_group["modified"]
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.removeprefix(self._prefix)
+        with self._lock:
+            self.request_count += 1
+            count = self.request_count
+            key = f"{request.method} {path}"
+            self.path_counts[key] = self.path_counts.get(key, 0) + 1
+            error = self.error_rate and self._random.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if self.throttle_every and count % self.throttle_every == 0:
+            return httpx.Response(
+                429,
+                headers={"Retry-After": str(self.retry_after)},
+                json={"detail": "Request was throttled."},
+            )
+        if error:
+            return httpx.Response(500, json={"detail": "Stand-in injected error."})
+        for method, pattern, view in self._routes:
+            match = pattern.fullmatch(path)
+            if match and method == request.method:
+                return view(request, *match.groups())
+        return httpx.Response(404, json={"detail": "Not found."})
+
+    def _paginate(self, request: httpx.Request, results: list[dict]) -> httpx.Response:
+        params = request.url.params
+        limit = int(params.get("limit", self.page_size))
+        offset = int(params.get("offset", 0))
+        next_url = None
+        if offset + limit < len(results):
+            next_url = str(
+                request.url.copy_merge_params(
+                    {"limit": limit, "offset": offset + limit}
+                )
+            )
+        return httpx.Response(
+            200,
+            json={
+                "count": len(results),
+                "next": next_url,
+                "previous": None,
+                "results": results[offset : offset + limit],
+            },
+        )
+
+    def _profile(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"username": "standin"})
+
+    def _list_proposals(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            counts: dict[str, int] = {}
+            for rg in self.request_groups.values():
+                counts[rg["proposal"]] = counts.get(rg["proposal"], 0) + 1
+            proposals = [
+                {**p, "requestgroup_count": counts.get(p["id"], 0)}
+                for p in self.proposals
+            ]
+        return self._paginate(request, proposals)
+
+    def _list_request_groups(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        with self._lock:
+            results = list(self.request_groups.values())
+        if "id" in params:
+            ids = {int(i) for value in params.get_list("id") for i in value.split(",")}
+            results = [rg for rg in results if rg["id"] in ids]
+        for field in ("state", "proposal", "name", "observation_type"):
+            if field in params:
+                values = set(params.get_list(field))
+                results = [rg for rg in results if rg[field] in values]
+        for field in ("modified", "created"):
+            for suffix, keep in (("after", True), ("before", False)):
+                if f"{field}_{suffix}" in params:
+                    bound = _parse_datetime(params[f"{field}_{suffix}"])
+                    results = [
+                        rg
+                        for rg in results
+                        if (_parse_datetime(rg[field]) >= bound) == keep
+                    ]
+        ordering = params.get("ordering", "-id")
+        field = ordering.lstrip("-")
+        results.sort(key=lambda rg: rg[field], reverse=ordering.startswith("-"))
+        return self._paginate(request, results)
+
+    def _get_request_group(
+        self, request: httpx.Request, request_group_id: str
+    ) -> httpx.Response:
+        request_group = self.request_groups.get(int(request_group_id))
+        if request_group is None:
+            return httpx.Response(404, json={"detail": "Not found."})
+        return httpx.Response(200, json=request_group)
+
+    def _cancel(self, request: httpx.Request, request_group_id: str) -> httpx.Response:
+        if int(request_group_id) not in self.request_groups:
+            return httpx.Response(404, json={"detail": "Not found."})
+        self.set_state(int(request_group_id), "CANCELED")
+        return self._get_request_group(request, request_group_id)
+
+    def _check(self, request: httpx.Request) -> tuple[dict, dict | None]:
+        """Validate a request group payload. Returns the payload and the errors
+        in the shape returned by the OCS API, or None if it is valid."""
+        payload = json.loads(request.content)
+        try:
+            RequestGroup.model_validate(payload)
+        except ValidationError as e:
+            errors: dict[str, list[str]] = {}
+            for error in e.errors(include_url=False):
+                loc = ".".join(str(p) for p in error["loc"]) or "non_field_errors"
+                errors.setdefault(loc, []).append(error["msg"])
+            return payload, errors
+        if not any(p["id"] == payload["proposal"] for p in self.proposals):
+            return payload, {"proposal": ["Invalid proposal."]}
+        return payload, None
+
+    @staticmethod
+    def _durations(payload: dict) -> dict:
+        durations = []
+        for request in payload.get("requests", []):
+            duration = 0.0
+            for configuration in request["configurations"]:
+                duration += CONFIGURATION_OVERHEAD
+                for ic in configuration.get("instrument_configs", []):
+                    duration += ic["exposure_count"] * (
+                        ic["exposure_time"] + EXPOSURE_OVERHEAD
+                    )
+            durations.append(
+                {"duration": duration * request.get("configuration_repeats", 1)}
+            )
+        return {
+            "requests": durations,
+            "duration": sum(d["duration"] for d in durations),
+        }
+
+    def _validate(self, request: httpx.Request) -> httpx.Response:
+        payload, errors = self._check(request)
+        if errors:
+            return httpx.Response(200, json={"request_durations": {}, "errors": errors})
+        return httpx.Response(
+            200, json={"request_durations": self._durations(payload), "errors": {}}
+        )
+
+    def _submit(self, request: httpx.Request) -> httpx.Response:
+        payload, errors = self._check(request)
+        if errors:
+            return httpx.Response(400, json=errors)
+        now = _isoformat(self.clock())
+        with self._lock:
+            request_group_id = len(self.request_groups) + 1
+            for r in payload["requests"]:
+                r.update(id=self._next_request_id, state="PENDING", modified=now)
+                self._next_request_id += 1
+            request_group = {
+                **payload,
+                "id": request_group_id,
+                "state": "PENDING",
+                "submitter": "standin",
+                "created": now,
+                "modified": now,
+            }
+            self.request_groups[request_group_id] = request_group
+        return httpx.Response(201, json=request_group)
@@ -0,0 +1,147 @@
+"""
+Process-wide registry of pooled HTTP clients for OCS APIs.
+
+LCO and SOAR share the same API root, so facilities using the same root, token and
+pool settings share a single httpx.Client and its connection pool instead of each
+opening their own.
+"""
+
+import atexit
+import logging
+import threading
+from dataclasses import dataclass
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PooledClient:
+    client: httpx.Client
+    users: int = 0
+
+
+class ClientRegistry:
+    """
+    Thread safe registry of httpx clients keyed by API root, credential and pool
+    settings.
+
+    Clients are created on first use with the pool limits, timeouts and HTTP
+    version from aeonlib.conf.Settings, so facilities with different pool settings
+    get different clients. Clients stay pooled after their last user releases them, so
+    short lived facilities reuse open connections. Use close_idle() to close clients
+    no longer in use, or close() to close every client. All clients are closed at
+    interpreter exit.
+
+    A custom httpx transport can be mounted for an API root, for example to route
+    requests to aeonlib.ocs.standin.OcsStandIn instead of the network.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: dict[tuple, _PooledClient] = {}
+        self._transports: dict[str, httpx.BaseTransport] = {}
+
+    def mount(self, api_root: str, transport: httpx.BaseTransport) -> None:
+        """Use a transport for all clients created for an API root. Existing
+        clients for the root are closed so that new facilities pick it up."""
+        with self._lock:
+            self._transports[api_root] = transport
+            self._drop_root(api_root)
+
+    def unmount(self, api_root: str) -> None:
+        with self._lock:
+            self._transports.pop(api_root, None)
+            self._drop_root(api_root)
+
+    def _drop_root(self, api_root: str) -> None:
+        for key in [k for k in self._clients if k[0] == api_root]:
+            self._clients.pop(key).client.close()
+
+    @staticmethod
+    def key(api_root: str, token: str, settings) -> tuple:
+        return (
+            api_root,
+            token,
+            settings.http2,
+            settings.http_max_connections,
+            settings.http_max_keepalive_connections,
+            settings.http_keepalive_expiry,
+            settings.http_timeout,
+        )
+
+    def acquire(self, api_root: str, token: str, settings) -> httpx.Client:
+        """Get the shared client for an API root, token and the settings' pool
+        settings, creating it if needed."""
+        key = self.key(api_root, token, settings)
+        with self._lock:
+            pooled = self._clients.get(key)
+            if pooled is None or pooled.client.is_closed:
+                pooled = _PooledClient(
+                    self._create(
+                        api_root, token, settings, self._transports.get(api_root)
+                    )
+                )
+                self._clients[key] = pooled
+            pooled.users += 1
+            return pooled.client
+
+    def release(self, client: httpx.Client) -> None:
+        """Signal that a facility is done with a client. Clients not created
+        by this registry are ignored."""
+        with self._lock:
+            for pooled in self._clients.values():
+                if pooled.client is client:
+                    pooled.users = max(pooled.users - 1, 0)
+                    return
+
+    def close_idle(self) -> None:
+        """Close and forget all clients that have no users."""
+        with self._lock:
+            for key, pooled in list(self._clients.items()):
+                if pooled.users == 0:
+                    pooled.client.close()
+                    del self._clients[key]
+
+    def close(self) -> None:
+        """Close and forget every client, including ones still in use."""
+        with self._lock:
+            for pooled in self._clients.values():
+                pooled.client.close()
+            self._clients.clear()
+
+    @staticmethod
+    def _create(
+        api_root: str,
+        token: str,
+        settings,
+        transport: httpx.BaseTransport | None = None,
+    ) -> httpx.Client:
+        headers = {"Authorization": f"Token {token}"} if token else {}
+        http2 = settings.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning(
+                    "AEON_HTTP2 is set but h2 is not installed, falling back to HTTP/1.1."
+                    " Install the 'http2' dependency group for Aeonlib."
+                )
+                http2 = False
+        return httpx.Client(
+            base_url=api_root,
+            headers=headers,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive_connections,
+                keepalive_expiry=settings.http_keepalive_expiry,
+            ),
+            timeout=settings.http_timeout,
+            transport=transport,
+        )
+
+
+clients = ClientRegistry()
+atexit.register(clients.close)
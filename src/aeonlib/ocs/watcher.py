@@ -0,0 +1,231 @@
+"""
+Batched state watcher for submitted request groups.
+
+Instead of polling every request group individually, the watcher groups all the
+request groups that are due for a check into list queries of up to batch_size
+ids. How often a request group is checked depends on its windows: not before its
+first window opens, frequently while a window is open, and less and less often
+while nothing changes.
+
+Example:
+    watcher = RequestGroupWatcher(LcoFacility())
+    watcher.watch(submitted)
+    watcher.on_change(lambda change: print(change.id, change.state))
+    watcher.run()
+
+Or asynchronously:
+    async for change in watcher.changes():
+        ...
+"""
+
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Callable
+
+import astropy.time
+
+from aeonlib.ocs.lco.facility import LcoFacility
+from aeonlib.ocs.request_models import SubmittedRequestGroup
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = ("COMPLETED", "WINDOW_EXPIRED", "FAILURE_LIMIT_REACHED", "CANCELED")
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _utc(value: datetime | astropy.time.Time) -> datetime:
+    if isinstance(value, astropy.time.Time):
+        value = value.to_datetime(timezone=timezone.utc)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+@dataclass
+class StateChange:
+    id: int
+    previous: str | None
+    """State before the change, None if it was not known when watching started"""
+    state: str
+    request_group: SubmittedRequestGroup
+
+
+@dataclass
+class _Watched:
+    state: str | None
+    next_poll: datetime
+    interval: timedelta
+    window_start: datetime | None = None
+    window_end: datetime | None = None
+
+
+class RequestGroupWatcher:
+    """
+    Watches many submitted request groups for state changes with batched polling.
+
+    Parameters:
+        facility (LcoFacility): Facility the request groups were submitted to.
+        min_interval (timedelta): Polling interval while a window is open and after
+            a state change.
+        max_interval (timedelta): Longest time between two checks of a request group.
+        backoff (float): Factor the interval grows by after each check that found
+            no change.
+        batch_size (int): Maximum number of ids in a single list query.
+        clock (Callable[[], datetime]): Source of the current time, in UTC.
+
+    Request groups in a terminal state are reported once and then no longer watched.
+    """
+
+    def __init__(
+        self,
+        facility: LcoFacility,
+        min_interval: timedelta = timedelta(seconds=30),
+        max_interval: timedelta = timedelta(hours=1),
+        backoff: float = 2.0,
+        batch_size: int = 100,
+        clock: Callable[[], datetime] = utcnow,
+    ):
+        self.facility = facility
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.batch_size = batch_size
+        self.clock = clock
+        self.callbacks: list[Callable[[StateChange], None]] = []
+        self._watched: dict[int, _Watched] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._watched)
+
+    def __contains__(self, request_group_id: int) -> bool:
+        return request_group_id in self._watched
+
+    def on_change(self, callback: Callable[[StateChange], None]) -> None:
+        """Register a callback to be called with every StateChange."""
+        self.callbacks.append(callback)
+
+    def watch(self, request_group: SubmittedRequestGroup | int) -> None:
+        """Start watching a request group. Passing the submitted request group
+        rather than its id lets the watcher schedule checks around its windows."""
+        now = self.clock()
+        if isinstance(request_group, int):
+            watched = _Watched(state=None, next_poll=now, interval=self.min_interval)
+            request_group_id = request_group
+        else:
+            windows = [w for r in request_group.requests for w in r.windows]
+            starts = [_utc(w.start) for w in windows if w.start is not None]
+            watched = _Watched(
+                state=request_group.state,
+                next_poll=now,
+                interval=self.min_interval,
+                window_start=min(starts) if len(starts) == len(windows) else None,
+                window_end=max((_utc(w.end) for w in windows), default=None),
+            )
+            watched.next_poll = self._schedule(watched, now)
+            request_group_id = request_group.id
+        with self._lock:
+            self._watched[request_group_id] = watched
+
+    def unwatch(self, request_group_id: int) -> None:
+        with self._lock:
+            self._watched.pop(request_group_id, None)
+
+    def _schedule(self, watched: _Watched, now: datetime) -> datetime:
+        """Time of the next check of a request group."""
+        if watched.window_start and now < watched.window_start:
+            # Nothing will happen before the first window opens
+            return min(watched.window_start, now + self.max_interval)
+        next_poll = now + watched.interval
+        if watched.window_end and now < watched.window_end:
+            # Check again soon after the last window closes, when it may expire
+            next_poll = min(next_poll, watched.window_end + self.min_interval)
+        return next_poll
+
+    def next_poll(self) -> datetime | None:
+        """Time of the next check of any watched request group."""
+        with self._lock:
+            return min((w.next_poll for w in self._watched.values()), default=None)
+
+    def due(self) -> list[int]:
+        now = self.clock()
+        with self._lock:
+            return [i for i, w in self._watched.items() if w.next_poll <= now]
+
+    def poll(self) -> list[StateChange]:
+        """Check every request group that is due, in batched list queries. Callbacks
+        are called for each change, which are also returned."""
+        due = self.due()
+        changes = []
+        for start in range(0, len(due), self.batch_size):
+            batch = due[start : start + self.batch_size]
+            response = self.facility.get_json(
+                "/requestgroups/",
+                params={"id": ",".join(str(i) for i in batch), "limit": len(batch)},
+            )
+            changes.extend(self._update(batch, response["results"]))
+        for change in changes:
+            for callback in self.callbacks:
+                callback(change)
+        return changes
+
+    def _update(self, batch: list[int], results: list[dict]) -> list[StateChange]:
+        now = self.clock()
+        changes = []
+        by_id = {rg["id"]: rg for rg in results}
+        with self._lock:
+            for request_group_id in batch:
+                watched = self._watched.get(request_group_id)
+                if watched is None:
+                    continue
+                result = by_id.get(request_group_id)
+                if result is None:
+                    logger.debug("Request group %s was not found", request_group_id)
+                elif result["state"] != watched.state:
+                    changes.append(
+                        StateChange(
+                            id=request_group_id,
+                            previous=watched.state,
+                            state=result["state"],
+                            request_group=SubmittedRequestGroup.model_validate(result),
+                        )
+                    )
+                    watched.state = result["state"]
+                    if watched.state in TERMINAL_STATES:
+                        del self._watched[request_group_id]
+                        continue
+                    watched.interval = self.min_interval
+                    watched.next_poll = self._schedule(watched, now)
+                    continue
+                watched.interval = min(
+                    watched.interval * self.backoff, self.max_interval
+                )
+                watched.next_poll = self._schedule(watched, now)
+        return changes
+
+    def run(self, stop: threading.Event | None = None) -> None:
+        """Poll until no request groups are watched or stop is set."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            self.poll()
+            next_poll = self.next_poll()
+            if next_poll is None:
+                return
+            stop.wait(max((next_poll - self.clock()).total_seconds(), 0))
+
+    async def changes(self) -> AsyncIterator[StateChange]:
+        """Yield state changes as they are found, until no request groups are
+        watched. Polling runs in a worker thread."""
+        while True:
+            for change in await asyncio.to_thread(self.poll):
+                yield change
+            next_poll = self.next_poll()
+            if next_poll is None:
+                return
+            await asyncio.sleep(max((next_poll - self.clock()).total_seconds(), 0))
@@ -0,0 +1,248 @@
+"""
+Compact binary serialization of Aeonlib models.
+
+Pickling a pydantic model that holds astropy Angle and Time objects stores the
+full state of every astropy object, which makes request groups slow to send to
+worker processes and bulky to cache. This module pickles models as their class,
+field values and private attributes only, angles as a float64 value and unit,
+and times as a pair of float64 Julian dates, and rebuilds them without
+re-running validation.
+
+The encoded bytes start with a magic string and a format version so that data
+written by other versions can be recognised and decoded, or rejected:
+
+    data = encode(request_group)
+    request_group = decode(data)
+
+RequestGroup, SiderealTarget, NonSiderealTarget and Window use this format when
+pickled, so it is also used transparently by multiprocessing and caches that
+pickle their values. Decoding only loads Aeonlib models, datetimes, numpy arrays
+and astropy angles, times and locations, never arbitrary classes. Models holding
+any other value cannot be encoded, and are pickled the usual way instead.
+"""
+
+import functools
+import io
+import pickle
+from datetime import date, datetime, time, timedelta, timezone
+from types import FunctionType
+from typing import Any, Callable
+
+import astropy.coordinates
+import astropy.time
+import astropy.units as u
+import numpy as np
+from astropy.utils.masked import Masked
+from pydantic import BaseModel
+
+from aeonlib.exceptions import DecodeError, EncodeError
+
+MAGIC = b"AEON"
+VERSION = 1
+
+_SAFE_GLOBALS = {
+    ("datetime", "datetime"): datetime,
+    ("datetime", "date"): date,
+    ("datetime", "time"): time,
+    ("datetime", "timedelta"): timedelta,
+    ("datetime", "timezone"): timezone,
+}
+
+
+_SAFE_TYPES = frozenset(_SAFE_GLOBALS.values())
+
+_FUNCTIONS = ("_angle", "_array", "_location", "_time", "_model")
+
+
+def _angle(value: float | np.ndarray, unit: str = "deg") -> astropy.coordinates.Angle:
+    return astropy.coordinates.Angle(value, unit=unit)
+
+
+def _array(data: bytes, dtype: str, shape: tuple[int, ...]) -> np.ndarray | np.generic:
+    """A numpy array, or a numpy scalar if shape is None."""
+    value = np.frombuffer(data, dtype=dtype)
+    if shape is None:
+        return value[0]
+    return value.reshape(shape).copy()
+
+
+def _location(
+    x: float | np.ndarray, y: float | np.ndarray, z: float | np.ndarray, ellipsoid: str
+) -> astropy.coordinates.EarthLocation:
+    location = astropy.coordinates.EarthLocation.from_geocentric(x, y, z, unit=u.m)
+    location.ellipsoid = ellipsoid
+    return location
+
+
+def _time(
+    jd1: float | np.ndarray,
+    jd2: float | np.ndarray,
+    scale: str,
+    format: str,
+    location: astropy.coordinates.EarthLocation | None = None,
+    mask: np.ndarray | None = None,
+) -> astropy.time.Time:
+    if np.isscalar(jd1) and location is None and mask is None:
+        # Copying is several times cheaper than building a Time, and request
+        # groups decoded together often share their windows
+        return _scalar_time(jd1, jd2, scale, format).copy()
+    if mask is not None:
+        jd1 = Masked(jd1, mask=mask)
+    t = astropy.time.Time(jd1, jd2, format="jd", scale=scale, location=location)
+    t.format = format
+    return t
+
+
+@functools.lru_cache(maxsize=1024)
+def _scalar_time(jd1: float, jd2: float, scale: str, format: str) -> astropy.time.Time:
+    t = astropy.time.Time(jd1, jd2, format="jd", scale=scale)
+    t.format = format
+    return t
+
+
+def _model(
+    cls: type[BaseModel],
+    values: dict[str, Any],
+    fields_set: tuple[str, ...],
+    extra: dict[str, Any] | None,
+    private: dict[str, Any] | None = None,
+) -> BaseModel:
+    # The values were validated before they were encoded, restore them the same
+    # way pydantic restores a pickled model.
+    if private is None and cls.__private_attributes__:
+        # Encoded without its private attributes, start from their defaults
+        private = {
+            name: attribute.get_default()
+            for name, attribute in cls.__private_attributes__.items()
+        }
+    model = cls.__new__(cls)
+    model.__setstate__(
+        {
+            "__dict__": values,
+            "__pydantic_fields_set__": set(fields_set),
+            "__pydantic_extra__": extra,
+            "__pydantic_private__": private,
+        }
+    )
+    return model
+
+
+class _Pickler(pickle.Pickler):
+    def reducer_override(self, obj: Any) -> tuple[Callable, tuple] | Any:
+        if isinstance(obj, BaseModel):
+            return _model, (
+                type(obj),
+                obj.__dict__,
+                tuple(obj.model_fields_set),
+                obj.__pydantic_extra__,
+                obj.__pydantic_private__,
+            )
+        if type(obj) is astropy.coordinates.Angle:
+            # Keep the unit, serialization renders angles in their own unit
+            value = float(obj.value) if obj.isscalar else obj.value
+            if obj.unit == u.deg:
+                return _angle, (value,)
+            return _angle, (value, obj.unit.to_string())
+        if type(obj) is astropy.time.Time:
+            if obj.isscalar and obj.location is None and not obj.masked:
+                return _time, (float(obj.jd1), float(obj.jd2), obj.scale, obj.format)
+            jd1, jd2, mask = obj.jd1, obj.jd2, None
+            if obj.masked:
+                jd1, jd2, mask = jd1.unmasked, jd2.unmasked, np.asarray(obj.mask)
+            return _time, (
+                np.asarray(jd1),
+                np.asarray(jd2),
+                obj.scale,
+                obj.format,
+                obj.location,
+                mask,
+            )
+        if type(obj) is astropy.coordinates.EarthLocation:
+            x, y, z = (c.to_value(u.m) for c in obj.geocentric)
+            return _location, (x, y, z, obj.ellipsoid)
+        if type(obj) is np.ndarray or isinstance(obj, np.generic):
+            if obj.dtype.hasobject or obj.dtype.fields is not None:
+                raise EncodeError(f"Cannot encode numpy values of dtype {obj.dtype}")
+            shape = None if isinstance(obj, np.generic) else obj.shape
+            return _array, (obj.tobytes(), obj.dtype.str, shape)
+        if isinstance(obj, type):
+            if (obj.__module__, obj.__qualname__) in _SAFE_GLOBALS or (
+                issubclass(obj, BaseModel) and obj.__module__.split(".")[0] == "aeonlib"
+            ):
+                return NotImplemented
+        elif type(obj) in _SAFE_TYPES or (
+            type(obj) is FunctionType
+            and obj.__module__ == __name__
+            and obj.__name__ in _FUNCTIONS
+        ):
+            return NotImplemented
+        # Fail here rather than write data that decode would refuse
+        raise EncodeError(
+            f"Cannot encode {type(obj).__module__}.{type(obj).__qualname__}"
+        )
+
+
+class _Unpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str) -> Any:
+        if (module, name) in _SAFE_GLOBALS:
+            return _SAFE_GLOBALS[module, name]
+        if module == __name__ and name in _FUNCTIONS:
+            return globals()[name]
+        if module.split(".")[0] == "aeonlib":
+            cls = super().find_class(module, name)
+            if isinstance(cls, type) and issubclass(cls, BaseModel):
+                return cls
+        raise DecodeError(f"Refusing to decode {module}.{name}")
+
+
+def encode(model: BaseModel) -> bytes:
+    """Encode a model in the compact binary format.
+
+    Raises:
+        EncodeError: If the model holds a value that decode would refuse.
+    """
+    buffer = io.BytesIO()
+    buffer.write(MAGIC)
+    buffer.write(bytes([VERSION]))
+    _Pickler(buffer, protocol=5).dump(model)
+    return buffer.getvalue()
+
+
+def _decode_v1(body: bytes) -> BaseModel:
+    return _Unpickler(io.BytesIO(body)).load()
+
+
+DECODERS: dict[int, Callable[[bytes], BaseModel]] = {1: _decode_v1}
+"""Decoders for every format version that can still be read"""
+
+
+def decode(data: bytes) -> Any:
+    """Decode bytes produced by encode() back into a model.
+
+    Raises:
+        DecodeError: If the data is not in the compact format, was written by an
+        unsupported format version, or references a class that is not an
+        Aeonlib model.
+    """
+    if data[: len(MAGIC)] != MAGIC or len(data) <= len(MAGIC):
+        raise DecodeError("Data is not in the Aeonlib compact format")
+    version = data[len(MAGIC)]
+    if version not in DECODERS:
+        raise DecodeError(f"Unsupported compact format version {version}")
+    try:
+        return DECODERS[version](data[len(MAGIC) + 1 :])
+    except DecodeError:
+        raise
+    except Exception as e:
+        raise DecodeError(f"Corrupt compact format data: {e}") from e
+
+
+class CompactPickle:
+    """Mixin for models that should pickle using the compact format, or the
+    usual way if they hold values the compact format cannot encode."""
+
+    def __reduce_ex__(self, protocol):
+        try:
+            return decode, (encode(self),)  # type: ignore
+        except EncodeError:
+            return super().__reduce_ex__(protocol)
@@ -4,6 +4,7 @@ from typing import Annotated, Any, Type, Union
 
 import astropy.coordinates
 import astropy.time
+import astropy.units
 from pydantic import GetCoreSchemaHandler, GetJsonSchemaHandler
 from pydantic.json_schema import JsonSchemaValue
 from pydantic_core import core_schema
@@ -100,7 +101,12 @@ class _AstropyAngleType:
         """https://docs.pydantic.dev/latest/concepts/types/#handling-third-party-types"""
 
         def validate_from_str(angle_value: str) -> astropy.coordinates.Angle:
-            return astropy.coordinates.Angle(angle_value)
+            try:
+                return astropy.coordinates.Angle(angle_value)
+            except astropy.units.UnitsError:
+                # Decimal strings without a unit, as in OCS API payloads, are in
+                # degrees, like floats.
+                return astropy.coordinates.Angle(float(angle_value), unit="deg")
 
         def validate_from_float(angle_value: float) -> astropy.coordinates.Angle:
             return astropy.coordinates.Angle(angle_value, unit="deg")
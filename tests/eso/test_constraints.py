@@ -0,0 +1,85 @@
+from datetime import datetime, time
+
+import astropy.units as u
+import numpy as np
+import pytest
+from astropy.coordinates import EarthLocation
+from astropy.time import Time
+
+from aeonlib.eso.constraints import (
+    local_sidereal_time,
+    time_constraints,
+    time_constraints_many,
+)
+from aeonlib.eso.models import AbsoluteTimeConstraint
+from aeonlib.models import Window
+
+GREENWICH = EarthLocation.from_geodetic(lon=0 * u.deg, lat=51.48 * u.deg)
+
+
+def test_local_sidereal_time():
+    # GMST at J2000.0 is 18h 41m 50.55s
+    times = Time([2451545.0, 2451545.0], format="jd", scale="utc")
+    lst = local_sidereal_time(times, np.array([0.0, -90.0]) * u.deg)
+    assert lst == pytest.approx([18.697375, 12.697375], abs=1e-5)
+
+
+def test_time_constraints():
+    windows = [
+        Window(start=datetime(2000, 1, 1, 12), end=datetime(2000, 1, 1, 18)),
+        Window(start=datetime(2025, 4, 10), end=datetime(2025, 4, 12)),
+    ]
+    absolute, sidereal = time_constraints(windows, site=GREENWICH)
+
+    assert [(c.start, c.end) for c in absolute.constraints] == [
+        (datetime(2000, 1, 1, 12), datetime(2000, 1, 1, 18)),
+        (datetime(2025, 4, 10), datetime(2025, 4, 12)),
+    ]
+    # Six solar hours are a little over six sidereal hours, 18:41:51 + 6:00:59
+    first = sidereal.constraints[0]
+    assert (first.start, first.end) == (time(18, 41, 51), time(0, 42, 50))
+    # Windows longer than a sidereal day do not restrict the LST
+    second = sidereal.constraints[1]
+    assert (second.start, second.end) == (time(0), time(23, 59, 59))
+
+    assert sidereal.model_dump(mode="json")["constraints"][0] == {
+        "from": "18:41:51",
+        "to": "00:42:50",
+    }
+
+
+def test_time_constraints_many_matches_single_conversion():
+    groups = [
+        [
+            Window(
+                start=Time(60775.0 + i + j / 24, format="mjd"),
+                end=Time(60775.1 + i + j / 24, format="mjd"),
+            )
+            for j in range(i % 3)
+        ]
+        for i in range(10)
+    ]
+    results = time_constraints_many(groups, site="lasilla")
+    assert len(results) == 10
+    for group, (absolute, sidereal) in zip(groups, results):
+        assert absolute.constraints == [
+            AbsoluteTimeConstraint.construct_from(w) for w in group
+        ]
+        assert len(sidereal.constraints) == len(group)
+
+
+def test_non_utc_windows_are_converted():
+    window = Window(
+        start=Time("2025-04-10T00:01:09.184", scale="tt"),
+        end=Time("2025-04-11T00:01:09.184", scale="tt"),
+    )
+    absolute, _ = time_constraints([window])
+    assert absolute.constraints[0].start == datetime(2025, 4, 10, 0, 0)
+
+
+def test_time_constraints_errors():
+    with pytest.raises(ValueError):
+        time_constraints([Window(end=datetime(2025, 4, 10))])
+    with pytest.raises(ValueError):
+        time_constraints([], site="nowhere")
+    assert time_constraints([])[0].constraints == []
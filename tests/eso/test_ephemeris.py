@@ -0,0 +1,136 @@
+import astropy.units as u
+import numpy as np
+import pytest
+from astropy.coordinates import get_body
+from astropy.time import Time
+
+from aeonlib.eso.ephemeris import (
+    compute_ephemerides,
+    format_ephemeris,
+    generate_ephemerides,
+    parse_ephemeris,
+    solve_kepler,
+)
+from aeonlib.models import NonSiderealTarget
+
+# Approximate J2000 elements of Mars (Standish, JPL)
+MARS = NonSiderealTarget(
+    name="Mars",
+    type="ORBITAL_ELEMENTS",
+    scheme="JPL_MAJOR_PLANET",
+    epochofel=Time(2451545.0, format="jd", scale="tt"),
+    orbinc=1.84969142,
+    longascnode=49.55953891,
+    argofperih=0,
+    eccentricity=0.09339410,
+    meandist=1.52371034,
+    meananom=0,
+    meanlong=-4.55343205,
+    longofperih=-23.94362959,
+    dailymot=19140.30268499 / 36525,
+)
+
+CERES = """
+PAF.HDR.START,            # Start of PAF Header
+PAF.NAME                  "{PAFNAME}",# Name of PAF
+PAF.HDR.END,              # End of PAF Header
+#                              Date & Time (UT)             JD              RA (J2000)     Dec (J2000)    dRA ("/s)   dDEC ("/s)   V-mag  Slit PA
+INS.EPHEM.RECORD          "2025-04-30T10:00:00.000, 60795.41666666666, 23 52 34.5819, -10 14 26.580, 0.01342419, 0.00461927, 9.2919, 0.000, *"
+INS.EPHEM.RECORD          "2025-04-30T11:00:00.000, 60795.45833333334, 23 52 37.8514, -10 14 09.945, 0.01338837, 0.00462241, 9.2919, 0.000, *"
+"""
+
+TIMES = Time("2000-03-01") + np.arange(48) * u.hour
+
+
+def test_solve_kepler():
+    mean_anomaly = np.linspace(0, 2 * np.pi, 50)
+    eccentricity = np.linspace(0, 0.99, 50)
+    anomaly = solve_kepler(mean_anomaly, eccentricity)
+    assert anomaly - eccentricity * np.sin(anomaly) == pytest.approx(mean_anomaly)
+
+
+def test_positions_match_astropy():
+    (records,) = compute_ephemerides([MARS], TIMES, site=None)
+    mars = get_body("mars", TIMES)
+    # Astropy positions are apparent, so differ by up to ~20" of aberration
+    assert records.ra == pytest.approx(mars.ra.deg, abs=0.01)
+    assert records.dec == pytest.approx(mars.dec.deg, abs=0.01)
+    # Rates are in arcsec/s, RA rates include cos(dec)
+    ra_rate = np.gradient(records.ra) * np.cos(np.deg2rad(records.dec))
+    assert records.ra_rate == pytest.approx(ra_rate, rel=1e-3)
+    assert records.dec_rate == pytest.approx(np.gradient(records.dec), rel=1e-3)
+
+
+def test_topocentric_parallax():
+    (geocentric,) = compute_ephemerides([MARS], TIMES, site=None)
+    (paranal,) = compute_ephemerides([MARS], TIMES, site="paranal")
+    # Mars is ~1.2 AU away, a parallax of at most ~7"
+    difference = np.hypot(
+        (paranal.ra - geocentric.ra) * np.cos(np.deg2rad(paranal.dec)),
+        paranal.dec - geocentric.dec,
+    )
+    assert 1 / 3600 < difference.max() < 10 / 3600
+
+
+def test_magnitudes():
+    (records,) = compute_ephemerides([MARS], TIMES, h=-1.5)
+    assert np.all((records.magnitude > -3) & (records.magnitude < 3))
+    (records,) = compute_ephemerides([MARS], TIMES)
+    assert np.all(records.magnitude == 0)
+
+
+def test_round_trip():
+    (ephemeris,) = generate_ephemerides([MARS], TIMES, h=-1.5, slit_pa=45.0)
+    assert '"Mars"' in ephemeris.text
+    (records,) = compute_ephemerides([MARS], TIMES, h=-1.5, slit_pa=45.0)
+    parsed = parse_ephemeris(ephemeris.text)
+    assert len(parsed) == 48
+    assert parsed.times.mjd == pytest.approx(TIMES.mjd)
+    assert parsed.ra == pytest.approx(records.ra, abs=1e-6)
+    assert parsed.dec == pytest.approx(records.dec, abs=1e-6)
+    assert parsed.ra_rate == pytest.approx(records.ra_rate, abs=1e-8)
+    assert parsed.magnitude == pytest.approx(records.magnitude, abs=1e-4)
+    assert np.all(parsed.slit_pa == 45.0)
+
+
+def test_parse_eso_ephemeris():
+    records = parse_ephemeris(CERES)
+    assert len(records) == 2
+    assert records.times[0].isot == "2025-04-30T10:00:00.000"
+    assert records.ra[0] == pytest.approx((23 + 52 / 60 + 34.5819 / 3600) * 15)
+    assert records.dec[0] == pytest.approx(-(10 + 14 / 60 + 26.58 / 3600))
+    assert records.dec_rate[1] == 0.00462241
+    assert records.magnitude[0] == 9.2919
+
+
+def test_negative_zero_declination():
+    records = compute_ephemerides([MARS], TIMES[:2])[0]
+    records.dec[:] = [-0.5 / 60, 0.0]
+    text = format_ephemeris(records)
+    assert "-00 00 30.000" in text
+    assert parse_ephemeris(text).dec[0] == pytest.approx(-0.5 / 60)
+
+
+def test_errors():
+    with pytest.raises(ValueError):
+        generate_ephemerides([MARS], TIMES[:1])
+    with pytest.raises(ValueError):
+        compute_ephemerides([MARS.model_copy(update={"eccentricity": 1.2})], TIMES)
+    with pytest.raises(ValueError):
+        parse_ephemeris("PAF.HDR.START;")
+
+
+def test_missing_elements():
+    comet = MARS.model_copy(
+        update={"scheme": "MPC_COMET", "meandist": 0.0, "meanlong": None}
+    )
+    with pytest.raises(ValueError, match="perihdist and epochofperih"):
+        compute_ephemerides([comet], TIMES)
+    comet = comet.model_copy(
+        update={"perihdist": 1.38, "epochofperih": Time(2451500.0, format="jd")}
+    )
+    assert len(compute_ephemerides([comet], TIMES)) == 1
+    with pytest.raises(ValueError, match="longofperih"):
+        compute_ephemerides([MARS.model_copy(update={"longofperih": None})], TIMES)
+    with pytest.raises(ValueError, match="meandist"):
+        compute_ephemerides([MARS.model_copy(update={"meandist": 0.0})], TIMES)
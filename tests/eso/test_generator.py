@@ -0,0 +1,78 @@
+import ast
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("jinja2")
+
+GENERATOR = Path(__file__).parents[2] / "codegen" / "eso" / "generator.py"
+
+
+@pytest.fixture(scope="module")
+def generator():
+    spec = importlib.util.spec_from_file_location("eso_generator", GENERATOR)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def render(generator, *signatures: dict) -> str:
+    return generator.generate_template_params(json.dumps(list(signatures)), "UVES")
+
+
+def test_generated_module_compiles(generator):
+    source = render(
+        generator,
+        {
+            "templateName": "UVES_blue_acq_slit",
+            "type": "acquisition",
+            "parameters": [
+                {
+                    "name": "INS.DROT.MODE",
+                    "type": "keyword",
+                    "defaultValue": "ELEV",
+                    "allowedValues": ["ELEV", "SKY"],
+                    "label": 'Rotator mode, "ELEV" or """SKY"""',
+                },
+                {
+                    "name": "TEL.TARG.ALPHA",
+                    "type": "coord",
+                    "defaultValue": "00:00:00.000",
+                    "label": "Path ending in C:\\",
+                },
+                {"name": "SEQ.FILE", "type": "unknown", "defaultValue": None},
+            ],
+        },
+    )
+    namespace: dict = {}
+    exec(compile(source, "templates.py", "exec"), namespace)
+    model = namespace["TEMPLATES"]["UVES_blue_acq_slit"]
+    assert "from typing import Any, Literal" in source
+    assert model.model_validate({"INS.DROT.MODE": "SKY"}).ins_drot_mode == "SKY"
+    # Labels are kept verbatim as field docstrings
+    docstrings = [
+        node.value.value
+        for node in ast.walk(ast.parse(source))
+        if isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)
+    ]
+    assert 'Rotator mode, "ELEV" or """SKY"""' in docstrings
+    assert "Path ending in C:\\" in docstrings
+
+
+def test_only_used_names_are_imported(generator):
+    source = render(
+        generator,
+        {
+            "templateName": "UVES_blue_obs_exp",
+            "type": "science",
+            "parameters": [
+                {"name": "SEQ.NEXPO", "type": "integer", "defaultValue": 1},
+            ],
+        },
+    )
+    compile(source, "templates.py", "exec")
+    assert "typing" not in source
+    assert "Coordinate" not in source
+    assert "from pydantic import Field" in source
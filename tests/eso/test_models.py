@@ -4,7 +4,7 @@ import pytest
 from astropy.coordinates.earth import Angle
 from astropy.time import Time
 
-from aeonlib.eso.models import AbsoluteTimeConstraint, Target
+from aeonlib.eso.models import AbsoluteTimeConstraint, Target, Template
 from aeonlib.models import SiderealTarget, Window
 
 
@@ -52,3 +52,72 @@ def test_eso_target_from_sidereal_target():
     assert eso_target.name == "Test Target"
     assert eso_target.ra == "24:30:00.000"
     assert eso_target.dec == "12:30:00.000"
+
+
+def test_change_tracking():
+    target = Target(
+        dec="00:00:00.000",
+        differential_dec=0.0,
+        differential_ra=0.0,
+        epoch=2000.0,
+        equinox="J2000",
+        name="No name",
+        proper_motion_dec=0.0,
+        proper_motion_ra=0.0,
+        ra="00:00:00.000",
+    )
+    assert not target.is_dirty
+    # Assigning the current value is not a change
+    target.name = "No name"
+    assert not target.is_dirty
+    target.name = "M51"
+    assert target.changed_fields() == {"name"}
+    # Setting the loaded value back undoes the change
+    target.name = "No name"
+    assert not target.is_dirty
+    target.name = "M51"
+    target.mark_clean()
+    assert not target.is_dirty
+
+
+def test_equality_ignores_change_tracking():
+    data = {
+        "dec": "00:00:00.000",
+        "differentialDec": 0.0,
+        "differentialRa": 0.0,
+        "epoch": 2000.0,
+        "equinox": "J2000",
+        "name": "x",
+        "properMotionDec": 0.0,
+        "properMotionRa": 0.0,
+        "ra": "00:00:00.000",
+    }
+    a, b = Target.model_validate(data), Target.model_validate(data)
+    a.name = "y"
+    assert a != b
+    a.name = "x"
+    assert a == b
+    b.name = "y"
+    b.mark_clean()
+    b.name = "x"
+    assert a == b and b.is_dirty
+
+
+def test_change_tracking_in_place():
+    template = Template.model_validate(
+        {
+            "templateId": 1,
+            "templateName": "UVES_blue_acq_slit",
+            "type": "acquisition",
+            "parameters": [{"name": "INS.DROT.MODE", "value": "ELEV"}],
+            "version": '"1"',
+        }
+    )
+    template.version = '"2"'
+    assert not template.is_dirty
+    template.parameters[0]["value"] = "SKY"
+    assert template.changed_fields() == {"parameters"}
+    copied = template.model_copy(deep=True)
+    template.mark_clean()
+    assert not template.is_dirty
+    assert copied.is_dirty
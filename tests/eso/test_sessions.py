@@ -0,0 +1,131 @@
+import threading
+
+import pytest
+from p2api import P2Error
+
+from aeonlib.conf import Settings
+from aeonlib.eso import facility as eso_facility
+from aeonlib.eso.facility import EsoFacility
+from aeonlib.eso.sessions import SessionRegistry
+from aeonlib.eso.standin import P2StandIn
+
+SETTINGS = Settings(eso_environment="demo", eso_username="52052", eso_password="pw")
+
+
+class Portal:
+    """Logs in by returning P2StandIns, recording every login."""
+
+    def __init__(self):
+        self.logins: list[tuple] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, environment, username, password, debug=False):
+        with self._lock:
+            self.logins.append((environment, username, password, debug))
+        return P2StandIn()
+
+
+@pytest.fixture
+def portal() -> Portal:
+    return Portal()
+
+
+@pytest.fixture
+def registry(portal: Portal, monkeypatch) -> SessionRegistry:
+    registry = SessionRegistry(connect=portal)
+    monkeypatch.setattr(eso_facility, "sessions", registry)
+    yield registry
+    registry.close()
+
+
+def test_facilities_share_one_login(registry: SessionRegistry, portal: Portal):
+    with EsoFacility(SETTINGS) as a, EsoFacility(SETTINGS) as b:
+        assert a.api is b.api
+    assert portal.logins == [("demo", "52052", "pw", False)]
+
+
+def test_debug_is_opt_in(registry: SessionRegistry, portal: Portal):
+    EsoFacility(Settings(eso_username="a")).close()
+    EsoFacility(Settings(eso_username="b", eso_debug=True)).close()
+    assert [login[3] for login in portal.logins] == [False, True]
+
+
+def test_different_users_get_different_connections(registry: SessionRegistry):
+    with EsoFacility(SETTINGS) as a, EsoFacility(Settings(eso_username="x")) as b:
+        assert a.api is not b.api
+
+
+def test_concurrent_acquire_logs_in_once(registry: SessionRegistry, portal: Portal):
+    barrier = threading.Barrier(8)
+
+    def acquire():
+        barrier.wait()
+        return registry.acquire(SETTINGS)
+
+    threads = [threading.Thread(target=acquire) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(portal.logins) == 1
+
+
+def test_failed_login_is_not_pooled(registry: SessionRegistry, portal: Portal):
+    def refuse(*args, **kwargs):
+        raise P2Error(401, "POST", "login", "invalid credentials")
+
+    registry._connect = refuse
+    with pytest.raises(P2Error):
+        registry.acquire(SETTINGS)
+    registry._connect = portal
+    assert registry.acquire(SETTINGS) is not None
+    assert len(portal.logins) == 1
+
+
+def test_expired_token_is_refreshed_once(registry: SessionRegistry, portal: Portal):
+    a, b = EsoFacility(SETTINGS), EsoFacility(SETTINGS)
+    stale = a.api
+
+    def expired(*args):
+        raise P2Error(401, "GET", "/containers", "token expired")
+
+    stale.createFolder = stale.getContainer = expired
+    container = a.create_folder(stale.root_container_id, "after refresh")
+    assert a.api is not stale
+    assert container.name == "after refresh"
+    # b still holds the stale connection and picks up a's refreshed one
+    b.get_container(a.api.root_container_id)
+    assert b.api is a.api
+    assert len(portal.logins) == 2
+    a.close()
+    b.close()
+
+
+def test_close_idle_keeps_connections_in_use(registry: SessionRegistry):
+    in_use = EsoFacility(SETTINGS)
+    idle = EsoFacility(Settings(eso_username="idle"))
+    idle.close()
+    registry.close_idle()
+    assert EsoFacility(SETTINGS).api is in_use.api
+    assert EsoFacility(Settings(eso_username="idle")).api is not idle.api
+
+
+def test_explicit_api_skips_pool(registry: SessionRegistry, portal: Portal):
+    api = P2StandIn()
+    with EsoFacility(api=api) as facility:
+        assert facility.api is api
+    assert portal.logins == []
+
+
+def test_other_credentials_log_in_again(registry: SessionRegistry, portal: Portal):
+    api = registry.acquire(SETTINGS)
+    wrong = SETTINGS.model_copy(update={"eso_password": "WRONG"})
+    assert registry.acquire(wrong) is not api
+    debug = SETTINGS.model_copy(update={"eso_debug": True})
+    assert registry.acquire(debug) is not api
+    assert [login[2:] for login in portal.logins] == [
+        ("pw", False),
+        ("WRONG", False),
+        ("pw", True),
+    ]
+    assert "pw" not in repr(registry.key(SETTINGS))
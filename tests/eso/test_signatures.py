@@ -0,0 +1,122 @@
+import pytest
+from pydantic import ValidationError
+
+from aeonlib.eso.facility import EsoFacility
+from aeonlib.eso.models import ObservationBlock
+from aeonlib.eso.signatures import SignatureCache
+from aeonlib.eso.standin import P2StandIn
+
+
+@pytest.fixture
+def api() -> P2StandIn:
+    return P2StandIn()
+
+
+@pytest.fixture
+def facility(api: P2StandIn) -> EsoFacility:
+    return EsoFacility(api=api)
+
+
+@pytest.fixture
+def ob(api: P2StandIn, facility: EsoFacility) -> ObservationBlock:
+    return facility.create_ob(facility.get_container(api.root_container_id), "ob")
+
+
+def test_validate_converts_params(facility: EsoFacility, ob: ObservationBlock):
+    params = facility.signatures.validate(
+        ob, "UVES_blue_obs_exp", {"DET.WIN1.UIT1": 120, "SEQ.NEXPO": "3"}
+    )
+    assert params == {"DET.WIN1.UIT1": 120.0, "SEQ.NEXPO": 3}
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"INS.DROT.MODE": "UP"},
+        {"INS.NOPE": 1},
+        {"TEL.GS1.ALPHA": "noon"},
+    ],
+)
+def test_invalid_params_are_rejected(
+    facility: EsoFacility, ob: ObservationBlock, params: dict
+):
+    with pytest.raises(ValidationError):
+        facility.signatures.validate(ob, "UVES_blue_acq_slit", params)
+
+
+def test_update_rejected_without_call(
+    api: P2StandIn, facility: EsoFacility, ob: ObservationBlock
+):
+    template = facility.create_template(ob, "UVES_blue_obs_exp")
+    with pytest.raises(ValidationError, match="less than or equal to 3600"):
+        facility.update_template_params(
+            ob, template, {"DET.WIN1.UIT1": 7200}, validate=True
+        )
+    assert "setTemplateParams" not in api.call_counts
+    assert "saveTemplate" not in api.call_counts
+    # Signatures are only fetched once per template
+    facility.update_template_params(
+        ob, template, {"DET.WIN1.UIT1": 1200}, validate=True
+    )
+    assert api.call_counts["getTemplateSignature"] == 1
+
+
+def test_update_unvalidated_by_default(
+    api: P2StandIn, facility: EsoFacility, ob: ObservationBlock
+):
+    template = facility.create_template(ob, "UVES_blue_obs_exp")
+    facility.update_template_params(ob, template, {"DET.WIN1.UIT1": 1200})
+    assert "getTemplateSignature" not in api.call_counts
+    assert api.call_counts["saveTemplate"] == 1
+
+
+def test_update_unvalidated_without_signature(
+    api: P2StandIn,
+    facility: EsoFacility,
+    ob: ObservationBlock,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+):
+    template = facility.create_template(ob, "UVES_blue_obs_exp")
+
+    def unavailable(*args):
+        raise RuntimeError("unavailable")
+
+    monkeypatch.setattr(api, "getTemplateSignature", unavailable)
+    facility.update_template_params(
+        ob, template, {"DET.WIN1.UIT1": 1200}, validate=True
+    )
+    assert api.call_counts["saveTemplate"] == 1
+    assert "sending parameters unvalidated" in caplog.text
+
+
+def test_ip_version_text(api: P2StandIn, facility: EsoFacility, ob: ObservationBlock):
+    data = ob.model_dump(mode="json") | {"ipVersion": "110.10"}
+    loaded = ObservationBlock.model_validate(data)
+    assert loaded.ip_version == 110.1
+    assert loaded.ip_version_text == "110.10"
+    assert loaded.model_copy().ip_version_text == "110.10"
+    assert ob.ip_version_text == "110.0"
+    facility.signatures.validate(loaded, "UVES_blue_acq_slit", {})
+    assert ("UVES", "110.10", "UVES_blue_acq_slit") in facility.signatures._models
+
+
+def test_disk_cache(api: P2StandIn, ob: ObservationBlock, tmp_path):
+    SignatureCache(EsoFacility(api=api), tmp_path).model("UVES", "110.0", "acq")
+    assert (tmp_path / "UVES" / "110.0" / "acq.json").exists()
+    other = SignatureCache(EsoFacility(api=api), tmp_path)
+    assert other.signature("UVES", "110.0", "acq").template_name == "acq"
+    assert api.call_counts["getTemplateSignature"] == 1
+
+
+def test_prefetch(api: P2StandIn, facility: EsoFacility, ob: ObservationBlock):
+    assert facility.signatures.prefetch("UVES", "110.0") == 2
+    facility.signatures.validate(ob, "UVES_blue_acq_slit", {"INS.ADC.MODE": "AUTO"})
+    assert "getTemplateSignature" not in api.call_counts
+
+
+def test_model_defaults(facility: EsoFacility):
+    model = facility.signatures.model("UVES", "110.0", "UVES_blue_acq_slit")
+    params = model(ins_drot_mode="SKY")
+    assert params.ins_adc_mode == "OFF"
+    assert params.model_dump() == {"INS.DROT.MODE": "SKY"}
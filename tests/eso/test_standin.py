@@ -0,0 +1,215 @@
+"""
+Runs the ESO facility against the in-process p2api stand-in.
+"""
+
+from datetime import datetime, time, timedelta
+from io import BytesIO
+from time import perf_counter
+
+import pytest
+
+from aeonlib import metrics
+from aeonlib.eso.facility import EsoFacility, ESONetworkError, VerificationReport
+from aeonlib.eso.models import (
+    AbsoluteTimeConstraint,
+    AbsoluteTimeConstraints,
+    Ephemeris,
+    SiderealTimeConstraint,
+    SiderealTimeConstraints,
+)
+from aeonlib.eso.standin import P2StandIn
+from aeonlib.metrics import MetricsCollector
+
+
+@pytest.fixture
+def api() -> P2StandIn:
+    return P2StandIn()
+
+
+@pytest.fixture
+def facility(api: P2StandIn) -> EsoFacility:
+    return EsoFacility(api=api)
+
+
+def test_folder_lifecycle(api: P2StandIn, facility: EsoFacility):
+    folder = facility.create_folder(api.root_container_id, "folder")
+    assert folder.parent_container_id == api.root_container_id
+    assert facility.get_container(api.root_container_id).item_count == 1
+    facility.delete_container(folder)
+    assert facility.get_container(api.root_container_id).item_count == 0
+
+
+def test_save_ob_and_stale_version(api: P2StandIn, facility: EsoFacility):
+    folder = facility.create_folder(api.root_container_id, "folder")
+    ob = facility.create_ob(folder, "ob")
+    ob.target.name = "m51"
+    new_ob = facility.save_ob(ob)
+    assert new_ob.target.name == "m51"
+    assert new_ob.version != ob.version
+    # Saving with the old version is rejected, as by the real API
+    with pytest.raises(ESONetworkError):
+        facility.save_ob(ob)
+
+
+def test_templates(api: P2StandIn, facility: EsoFacility):
+    ob = facility.create_ob(facility.get_container(api.root_container_id), "ob")
+    template = facility.create_template(ob, "UVES_blue_acq_slit")
+    assert template.type == "acquisition"
+    template = facility.update_template_params(ob, template, {"INS.DROT.MODE": "SKY"})
+    assert {"name": "INS.DROT.MODE", "type": "keyword", "value": "SKY"} in (
+        facility.get_template(ob, template.template_id).parameters
+    )
+    facility.delete_template(ob, template)
+    assert not api.templates[ob.ob_id]
+
+
+def test_time_constraints(api: P2StandIn, facility: EsoFacility):
+    ob = facility.create_ob(facility.get_container(api.root_container_id), "ob")
+    start = datetime(2025, 1, 1)
+    absolute = facility.save_absolute_time_constraints(
+        ob,
+        AbsoluteTimeConstraints(
+            constraints=[
+                AbsoluteTimeConstraint(start=start, end=start + timedelta(days=1))
+            ]
+        ),
+    )
+    assert absolute.constraints[0].start == start
+    sidereal = facility.save_sidereal_time_constraints(
+        ob,
+        SiderealTimeConstraints(
+            constraints=[SiderealTimeConstraint(start=time(2), end=time(12))]
+        ),
+    )
+    assert sidereal.constraints[0].end == time(12)
+
+
+def test_ephemeris_and_finding_charts(api: P2StandIn, facility: EsoFacility):
+    ob = facility.create_ob(facility.get_container(api.root_container_id), "ob")
+    ephemeris = facility.save_ephemeris(ob, Ephemeris(text="PAF.HDR.START;"))
+    assert facility.get_ephemeris(ob).text == "PAF.HDR.START;"
+    facility.delete_ephemeris(ob, ephemeris)
+    assert facility.get_ephemeris(ob).text == ""
+
+    facility.add_finding_chart(ob, BytesIO(b"jpeg"), name="test")
+    assert len(facility.get_finding_chart_names(ob)) == 1
+    facility.delete_finding_chart(ob, 1)
+    assert api.finding_charts[ob.ob_id] == []
+
+
+def test_verify(api: P2StandIn, facility: EsoFacility):
+    ob = facility.create_ob(facility.get_container(api.root_container_id), "ob")
+    messages, observable = facility.verify(ob, False)
+    assert not observable
+    assert "OB must contain at least one template." in messages
+
+    ob.target.name = "M32"
+    ob = facility.save_ob(ob)
+    facility.create_template(ob, "UVES_blue_acq_slit")
+    assert facility.verify(ob, True) == ([], True)
+    assert facility.get_ob(ob.ob_id).ob_status == "D"
+
+
+def test_calls_are_instrumented(api: P2StandIn, facility: EsoFacility):
+    collector = MetricsCollector()
+    metrics.add_hook(collector)
+    try:
+        facility.get_container(api.root_container_id)
+        with pytest.raises(ESONetworkError):
+            facility.get_ob(1)
+    finally:
+        metrics.remove_hook(collector)
+    assert collector.calls[("eso", "p2api", "getContainer", "ok")] == 1
+    assert collector.calls[("eso", "p2api", "getOB", "404")] == 1
+
+
+def test_unchanged_models_are_not_saved(api: P2StandIn, facility: EsoFacility):
+    ob = facility.create_ob(facility.get_container(api.root_container_id), "ob")
+    template = facility.create_template(ob, "UVES_blue_acq_slit")
+    ob = facility.get_ob(ob.ob_id)
+    assert facility.save_ob(ob) is ob
+    assert facility.save_template(ob, template) is template
+    assert "saveOB" not in api.call_counts
+    assert "saveTemplate" not in api.call_counts
+
+    ob.target.name = "M51"
+    saved = facility.save_ob(ob)
+    assert saved.version != ob.version
+    assert not saved.is_dirty
+    # The given OB is left unsaved
+    assert saved is not ob and ob.is_dirty
+    assert api.call_counts["saveOB"] == 1
+    facility.save_ob(saved, force=True)
+    assert api.call_counts["saveOB"] == 2
+
+
+def test_flush(api: P2StandIn, facility: EsoFacility):
+    container = facility.get_container(api.root_container_id)
+    obs = [facility.create_ob(container, f"ob-{i}") for i in range(20)]
+    template = facility.create_template(obs[0], "UVES_blue_acq_slit")
+    obs[0] = facility.get_ob(obs[0].ob_id)
+    for ob in obs[::2]:
+        ob.user_priority = 2
+    template.parameters[0]["value"] = "12:00:00.000"
+
+    assert facility.flush([*obs, (obs[0], template)]) == 11
+    assert api.call_counts["saveOB"] == 10
+    assert api.call_counts["saveTemplate"] == 1
+    assert not any(ob.is_dirty for ob in obs)
+    assert obs[0].version == api._versions[("ob", obs[0].ob_id)]
+    assert template.version == api._versions[("template", template.template_id)]
+    assert not template.is_dirty
+    assert api.obs[obs[2].ob_id]["userPriority"] == 2
+    assert (
+        api.templates[obs[0].ob_id][template.template_id]["parameters"][0]["value"]
+        == "12:00:00.000"
+    )
+    # Nothing left to save
+    assert facility.flush(obs) == 0
+
+
+def test_flush_failures(api: P2StandIn, facility: EsoFacility):
+    container = facility.get_container(api.root_container_id)
+    obs = [facility.create_ob(container, f"ob-{i}") for i in range(3)]
+    for ob in obs:
+        ob.user_priority = 3
+    obs[1].version = '"stale"'
+    with pytest.raises(ExceptionGroup) as group:
+        facility.flush(obs)
+    assert len(group.value.exceptions) == 1
+    assert not obs[0].is_dirty and not obs[2].is_dirty
+    assert obs[1].is_dirty
+
+
+def test_verify_many(api: P2StandIn, facility: EsoFacility):
+    container = facility.get_container(api.root_container_id)
+    obs = [facility.create_ob(container, f"ob {i}") for i in range(6)]
+    for ob in obs[:4]:
+        ob.target.name = "M32"
+        ob = facility.save_ob(ob)
+        facility.create_template(ob, "UVES_blue_acq_slit")
+
+    report = VerificationReport.collect(
+        facility.verify_many(obs + [999], submit=True, max_workers=4)
+    )
+    assert sorted(report.observable) == [ob.ob_id for ob in obs[:4]]
+    assert set(report.messages) == {obs[4].ob_id, obs[5].ob_id}
+    assert "Target name must be set." in report.messages[obs[5].ob_id]
+    assert list(report.errors) == [999]
+    assert facility.get_ob(obs[0].ob_id).ob_status == "D"
+    assert report.summary().startswith("4 of 7 observation blocks observable")
+
+
+def test_verify_many_streams_results():
+    api = P2StandIn(latency=0.05)
+    facility = EsoFacility(api=api)
+    container = facility.get_container(api.root_container_id)
+    ob_ids = [facility.create_ob(container, f"ob {i}").ob_id for i in range(8)]
+
+    start = perf_counter()
+    results = facility.verify_many(ob_ids, submit=False, max_workers=8)
+    first = next(results)
+    assert first.ob_id in ob_ids
+    assert len(list(results)) == 7
+    # Eight verifications at 50ms each, run together
+    assert perf_counter() - start < 0.3
@@ -0,0 +1,97 @@
+import time
+
+import pytest
+
+from aeonlib.eso.facility import EsoFacility
+from aeonlib.eso.standin import P2StandIn
+from aeonlib.eso.tree import ContainerTree
+
+
+@pytest.fixture
+def api() -> P2StandIn:
+    """A run with 3 folders of 3 folders of 2 OBs each"""
+    api = P2StandIn()
+    for i in range(3):
+        folder, _ = api.createFolder(api.root_container_id, f"folder-{i}")
+        for j in range(3):
+            subfolder, _ = api.createFolder(folder["containerId"], f"folder-{i}-{j}")
+            for k in range(2):
+                api.createOB(subfolder["containerId"], f"ob-{i}-{j}-{k}")
+    api.call_counts.clear()
+    return api
+
+
+@pytest.fixture
+def tree(api: P2StandIn) -> ContainerTree:
+    return ContainerTree(EsoFacility(api=api), max_workers=8)
+
+
+def test_walk(api: P2StandIn, tree: ContainerTree):
+    items = tree.walk(api.root_container_id, fetch_obs=True)
+    assert len(items) == 3 + 9 + 18
+    assert [i.name for i in items[:3]] == ["folder-0", "folder-1", "folder-2"]
+    assert api.call_counts == {"getItems": 13, "getOB": 18}
+
+    # Lookups are now local
+    (item,) = tree.find_obs(name="ob-1-2-0")
+    assert tree.get_ob(item.ob_id).name == "ob-1-2-0"  # type: ignore
+    assert len(tree.find_obs(container_id=items[0].container_id)) == 6
+    assert len(tree.path(item.ob_id)) == 3  # type: ignore
+    assert tree.path(item.ob_id)[0] == api.root_container_id  # type: ignore
+    tree.walk(api.root_container_id, fetch_obs=True)
+    assert api.call_counts == {"getItems": 13, "getOB": 18}
+
+
+def test_walk_is_concurrent(api: P2StandIn, tree: ContainerTree):
+    api.latency = 0.02
+    start = time.perf_counter()
+    tree.walk(api.root_container_id, fetch_obs=True)
+    # 31 sequential calls would take over 0.6s
+    assert time.perf_counter() - start < 0.4
+
+
+def test_max_depth(api: P2StandIn, tree: ContainerTree):
+    items = tree.walk(api.root_container_id, max_depth=1)
+    assert len(items) == 12
+    assert api.call_counts == {"getItems": 4}
+
+
+def test_refresh(api: P2StandIn, tree: ContainerTree):
+    items = tree.walk(api.root_container_id, fetch_obs=True)
+    subfolder = items[3].container_id
+    ob, _ = api.createOB(subfolder, "S250101a")
+    assert not tree.find_obs(name="S250101a")
+
+    tree.walk(api.root_container_id, fetch_obs=True, refresh=True)
+    assert tree.find_obs(name="S250101a")
+    # Only the new OB is fetched again
+    assert api.call_counts["getOB"] == 19
+
+    api.deleteOB(ob["obId"], api._versions[("ob", ob["obId"])])
+    tree.walk(api.root_container_id, refresh=True)
+    assert not tree.find_obs(name="S250101a")
+    assert ("ob", ob["obId"]) not in tree.parents
+
+
+def test_add_replaces_cached_version(api: P2StandIn, tree: ContainerTree):
+    facility = tree.facility
+    items = tree.walk(api.root_container_id, fetch_obs=True)
+    ob = tree.get_ob(tree.find_obs(name="ob-0-0-0")[0].ob_id)  # type: ignore
+    ob.user_priority = 2
+    saved = facility.save_ob(ob)
+    tree.add(saved)
+    assert tree.get_ob(ob.ob_id).version == saved.version
+    assert len(items) == 30
+
+
+def test_containers_and_obs_with_the_same_id(api: P2StandIn, tree: ContainerTree):
+    items = tree.walk(api.root_container_id, fetch_obs=True)
+    folder = items[0].container_id
+    ob = tree.find_obs(name="ob-2-2-1")[0]
+    # p2 ids are only unique per kind, so an OB can share a container's id
+    tree.add(tree.get_ob(ob.ob_id).model_copy(update={"ob_id": folder}))  # type: ignore
+    assert tree.path(container_id=folder) == [api.root_container_id]
+    assert len(tree.path(ob_id=folder)) == 3
+    tree.forget(ob_id=folder)
+    assert tree.path(container_id=folder) == [api.root_container_id]
+    assert folder in tree.listings
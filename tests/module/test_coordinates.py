@@ -0,0 +1,80 @@
+import astropy.units as u
+import numpy as np
+import pytest
+from astropy.coordinates import AltAz, EarthLocation, SkyCoord, get_sun
+from astropy.time import Time
+
+from aeonlib.coordinates import TargetArrays, clear_cache, site_frames
+from aeonlib.models import SiderealTarget
+
+PARANAL = EarthLocation.from_geodetic(
+    lon=-70.4045 * u.deg, lat=-24.6272 * u.deg, height=2635 * u.m
+)
+TIMES = Time("2021-03-01T00:00") + np.arange(0, 12, 1.5) * u.hour
+
+
+def icrs(ra: float, dec: float) -> SiderealTarget:
+    return SiderealTarget(name=f"{ra} {dec}", type="ICRS", ra=ra, dec=dec)
+
+
+def test_altaz_matches_astropy():
+    targets = [icrs(10, -30), icrs(200, 20), icrs(83.6, -5), icrs(359, -80)]
+    alt, az = site_frames(PARANAL, TIMES).altaz(targets)
+    assert alt.shape == (len(TIMES), len(targets))
+
+    coords = SkyCoord(
+        ra=[t.ra.deg for t in targets] * u.deg,  # type: ignore
+        dec=[t.dec.deg for t in targets] * u.deg,  # type: ignore
+    )
+    expected = coords[np.newaxis].transform_to(
+        AltAz(obstime=TIMES[:, np.newaxis], location=PARANAL)
+    )
+    arcsec = 1 / 3600
+    assert np.abs(alt - expected.alt.deg).max() < 10 * arcsec
+    az_error = (az - expected.az.deg + 180) % 360 - 180
+    assert np.abs(az_error * np.cos(np.deg2rad(alt))).max() < 10 * arcsec
+
+
+def test_proper_motion():
+    moving = SiderealTarget(
+        type="ICRS", ra=10, dec=-30, proper_motion_dec=10000, epoch=2000
+    )
+    frames = site_frames(PARANAL, TIMES)
+    # Ten arcseconds per year for the 21.16 years since 2000
+    _, dec = frames.hadec([icrs(10, -30), moving])
+    assert dec[0, 1] - dec[0, 0] == pytest.approx(211.6 / 3600, abs=1e-4)
+
+
+def test_fixed_targets():
+    targets = [
+        SiderealTarget(type="HOUR_ANGLE", ra=0, dec=-24.6272, hour_angle=0),
+        SiderealTarget(type="ALTAZ", ra=0, dec=0, altitude=45, azimuth=120),
+    ]
+    frames = site_frames(PARANAL, TIMES)
+    alt, az = frames.altaz(targets)
+    assert np.allclose(alt[:, 0], 90)
+    assert np.allclose(alt[:, 1], 45)
+    assert np.allclose(az[:, 1], 120)
+    ha, _ = frames.hadec(targets)
+    # East of the meridian
+    assert (ha[:, 1] < 0).all()
+    assert np.isinf(frames.airmass([icrs(0, 80)])).all()
+
+
+def test_missing_coordinates():
+    with pytest.raises(ValueError, match="missing its coordinates"):
+        TargetArrays.from_targets([SiderealTarget(type="ALTAZ", ra=0, dec=0)])
+
+
+def test_frames_are_cached():
+    clear_cache()
+    frames = site_frames(PARANAL, TIMES)
+    assert site_frames(PARANAL, Time(TIMES.isot, scale="utc")) is frames
+    assert site_frames(PARANAL, TIMES[1:]) is not frames
+
+
+def test_sun_matches_astropy():
+    alt, az = site_frames(PARANAL, TIMES).sun_altaz()
+    expected = get_sun(TIMES).transform_to(AltAz(obstime=TIMES, location=PARANAL))
+    assert np.abs(alt - expected.alt.deg).max() < 1 / 60
+    assert np.abs((az - expected.az.deg + 180) % 360 - 180).max() < 2 / 60
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from aeonlib.dispatch import Dispatcher, EsoRoute, FollowUp, OcsRoute
+from aeonlib.eso.facility import EsoFacility
+from aeonlib.eso.standin import P2StandIn
+from aeonlib.models import SiderealTarget, Window
+from aeonlib.ocs.lco.facility import LcoFacility
+from aeonlib.ocs.soar.facility import SoarFacility
+from aeonlib.ocs.standin import OcsStandIn
+
+from ..ocs.lco_requests import LCO_REQUESTS
+from ..ocs.soar_requests import SOAR_REQUESTS
+
+FOLLOWUP = FollowUp(
+    name="S250101a",
+    target=SiderealTarget(name="S250101a", type="ICRS", ra=202.469, dec=47.195),
+    windows=[Window(start=datetime(2025, 1, 1), end=datetime(2025, 1, 2))],
+)
+
+
+@pytest.fixture
+def ocs():
+    with OcsStandIn(latency=0.1) as ocs:
+        yield ocs
+
+
+@pytest.fixture
+def routes(ocs: OcsStandIn) -> list:
+    api = P2StandIn(latency=0.02)
+    return [
+        OcsRoute(LcoFacility(ocs.settings()), LCO_REQUESTS["lco_1m0_scicam_sinistro"]),
+        OcsRoute(SoarFacility(ocs.settings()), SOAR_REQUESTS["soar_triplespec"]),
+        EsoRoute(
+            EsoFacility(api=api),
+            api.root_container_id,
+            templates=[("UVES_blue_acq_slit", {"INS.DROT.MODE": "SKY"})],
+        ),
+    ]
+
+
+def test_dispatch(ocs: OcsStandIn, routes: list):
+    with Dispatcher(routes) as dispatcher:
+        result = dispatcher.dispatch(FOLLOWUP)
+
+    assert result.ok, result.errors
+    assert set(result.results) == {"lco", "soar", "eso"}
+    for name in ("lco", "soar"):
+        submitted = result[name].result
+        assert submitted.name == "S250101a"
+        configuration = submitted.requests[0].configurations[0]
+        assert configuration.target.ra.degree == pytest.approx(202.469)
+        assert submitted.requests[0].windows[0].end.isot.startswith("2025-01-02")
+    assert len(ocs.request_groups) == 2
+
+    eso = result["eso"].result
+    assert eso.observable
+    assert eso.ob.name == "S250101a"
+    assert eso.ob.target.name == "S250101a"
+    assert eso.ob.target.dec == "47:11:42.000"
+    assert eso.ob.ob_status == "D"
+
+    # Facilities are submitted to concurrently
+    latencies = [r.latency for r in result.results.values()]
+    assert result.latency < sum(latencies)
+    assert result.latency >= max(latencies)
+
+
+def test_failures_are_per_facility(ocs: OcsStandIn, routes: list):
+    followup = FOLLOWUP.model_copy(
+        update={"windows": [Window(end=datetime(2025, 1, 2))]}
+    )
+    with Dispatcher(routes) as dispatcher:
+        result = dispatcher.dispatch(followup)
+    # ESO requires a window start, the OCS does not
+    assert not result.ok
+    assert set(result.errors) == {"eso"}
+    assert isinstance(result["eso"].error, ValueError)
+    assert result["lco"].ok and result["soar"].ok
+
+
+def test_translate_leaves_template_untouched():
+    template = LCO_REQUESTS["lco_1m0_scicam_sinistro"]
+    route = OcsRoute(LcoFacility(), template)
+    request_group = route.translate(
+        FOLLOWUP.model_copy(
+            update={"windows": [Window(end=datetime(2025, 1, 1) + timedelta(days=3))]}
+        )
+    )
+    assert request_group.requests[0].configurations[0].target.name == "S250101a"
+    assert template.requests[0].configurations[0].target.name != "S250101a"
+    assert len(request_group.requests[0].windows) == 1
+
+
+def test_route_names_must_be_unique(ocs: OcsStandIn):
+    facility = LcoFacility(ocs.settings())
+    template = LCO_REQUESTS["lco_1m0_scicam_sinistro"]
+    with pytest.raises(ValueError):
+        Dispatcher([OcsRoute(facility, template), OcsRoute(facility, template)])
@@ -0,0 +1,94 @@
+import httpx
+import pytest
+
+from aeonlib import metrics
+from aeonlib.conf import Settings
+from aeonlib.metrics import CallEvent, Histogram, MetricsCollector
+from aeonlib.ocs.lco.facility import LcoFacility
+from aeonlib.ocs.transport import clients
+
+
+@pytest.fixture
+def collector():
+    collector = MetricsCollector()
+    metrics.add_hook(collector)
+    yield collector
+    metrics.remove_hook(collector)
+
+
+def event(**kwargs) -> CallEvent:
+    defaults = {
+        "facility": "lco",
+        "method": "GET",
+        "endpoint": "/api/proposals/",
+        "payload_bytes": 0,
+        "response_bytes": 100,
+        "latency": 0.02,
+        "status": 200,
+    }
+    return CallEvent(**{**defaults, **kwargs})
+
+
+class TestHistogram:
+    def test_observe(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        assert histogram.cumulative() == [2, 3, 4]
+        assert histogram.count == 4
+        assert histogram.sum == pytest.approx(2.65)
+
+    def test_quantile(self):
+        histogram = Histogram((1.0, 2.0))
+        for value in (0.5, 1.5, 1.5, 1.5):
+            histogram.observe(value)
+        assert histogram.quantile(0.25) == pytest.approx(1.0)
+        assert histogram.quantile(1.0) == pytest.approx(2.0)
+
+
+class TestMetricsCollector:
+    def test_prometheus_text(self, collector: MetricsCollector):
+        metrics.emit(event())
+        metrics.emit(event(status=429, retries=2, latency=1.5))
+        text = collector.to_prometheus()
+        labels = 'facility="lco",method="GET",endpoint="/api/proposals/"'
+        assert "# TYPE aeonlib_call_latency_seconds histogram" in text
+        assert f'aeonlib_call_latency_seconds_bucket{{{labels},le="0.025"}} 1' in text
+        assert f'aeonlib_call_latency_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+        assert f"aeonlib_call_latency_seconds_count{{{labels}}} 2" in text
+        assert f'aeonlib_calls_total{{{labels},status="429"}} 1' in text
+        assert f"aeonlib_call_retries_total{{{labels}}} 2" in text
+
+    def test_failing_hook_does_not_propagate(self, collector: MetricsCollector):
+        def broken(event):
+            raise RuntimeError
+
+        metrics.add_hook(broken)
+        try:
+            metrics.emit(event())
+        finally:
+            metrics.remove_hook(broken)
+        assert collector.latency
+
+
+def test_lco_calls_are_instrumented_and_retried(collector: MetricsCollector):
+    responses = iter(
+        [
+            httpx.Response(429, headers={"Retry-After": "0"}),
+            httpx.Response(200, json={"results": [], "next": None}),
+        ]
+    )
+    api_root = "http://metrics.test/api/"
+    clients.mount(api_root, httpx.MockTransport(lambda request: next(responses)))
+    facility = LcoFacility(
+        Settings(lco_token="", lco_api_root=api_root, http_max_retries=1)
+    )
+    try:
+        assert facility.proposals(format="dict") == []
+    finally:
+        facility.close()
+        clients.unmount(api_root)
+    key = ("lco", "GET", "/api/proposals/")
+    assert collector.latency[key].count == 1
+    assert collector.retries[key] == 1
+    assert collector.calls[(*key, "200")] == 1
@@ -0,0 +1,203 @@
+import pickle
+from collections import OrderedDict
+from datetime import datetime
+
+import astropy.units as u
+import numpy as np
+import pytest
+from astropy.coordinates import Angle, EarthLocation
+from astropy.time import Time
+
+from aeonlib.eso.models import Target as EsoTarget
+from aeonlib.exceptions import DecodeError, EncodeError
+from aeonlib.models import NonSiderealTarget, SiderealTarget, Window
+from aeonlib.ocs import Constraints, Location, Request, RequestGroup
+from aeonlib.ocs.lco.instruments import Lco1M0ScicamSinistro
+from aeonlib.serialization import MAGIC, decode, encode
+
+
+@pytest.fixture
+def sidereal_target() -> SiderealTarget:
+    return SiderealTarget(name="M10", type="ICRS", ra="16h57m08.9s", dec=-4.1)
+
+
+@pytest.fixture
+def comet() -> NonSiderealTarget:
+    return NonSiderealTarget(
+        name="C/2023 A3",
+        type="ORBITAL_ELEMENTS",
+        scheme="MPC_COMET",
+        epochofel=Time(60600.0, format="mjd", scale="tt"),
+        orbinc=139.1,
+        longascnode=21.6,
+        argofperih=308.5,
+        eccentricity=1.0001,
+        meandist=0.0,
+        meananom=0.0,
+        perihdist=0.39,
+        epochofperih=Time(60580.9, format="mjd"),
+    )
+
+
+@pytest.fixture
+def request_group(sidereal_target: SiderealTarget) -> RequestGroup:
+    return RequestGroup(
+        name="test",
+        observation_type="NORMAL",
+        operator="SINGLE",
+        proposal="TEST_PROPOSAL",
+        ipp_value=1.0,
+        requests=[
+            Request(
+                location=Location(telescope_class="1m0"),
+                configurations=[
+                    Lco1M0ScicamSinistro(
+                        type="EXPOSE",
+                        target=sidereal_target,
+                        constraints=Constraints(max_airmass=3.0),
+                        instrument_configs=[
+                            Lco1M0ScicamSinistro.config_class(
+                                exposure_count=1,
+                                exposure_time=10,
+                                mode="central_2k_2x2",
+                                optical_elements=Lco1M0ScicamSinistro.optical_elements_class(
+                                    filter="B"
+                                ),
+                            )
+                        ],
+                        acquisition_config=Lco1M0ScicamSinistro.acquisition_config_class(
+                            mode="OFF"
+                        ),
+                        guiding_config=Lco1M0ScicamSinistro.guiding_config_class(
+                            mode="ON", optional=True
+                        ),
+                    )
+                ],
+                windows=[Window(start=datetime(2025, 1, 1), end=datetime(2025, 1, 31))],
+            )
+        ],
+    )
+
+
+def test_sidereal_target_round_trip(sidereal_target: SiderealTarget):
+    decoded = decode(encode(sidereal_target))
+    assert decoded == sidereal_target
+    assert isinstance(decoded.ra, Angle)
+    assert decoded.ra.degree == sidereal_target.ra.degree
+
+
+def test_non_sidereal_target_round_trip(comet: NonSiderealTarget):
+    decoded = decode(encode(comet))
+    assert decoded == comet
+    assert decoded.epochofel.scale == "tt"
+    assert decoded.epochofel.format == "mjd"
+    assert decoded.epochofel.jd1 == comet.epochofel.jd1
+    assert decoded.epochofel.jd2 == comet.epochofel.jd2
+    assert decoded.model_fields_set == comet.model_fields_set
+
+
+def test_request_group_round_trip(request_group: RequestGroup):
+    decoded = decode(encode(request_group))
+    assert decoded == request_group
+    assert decoded.model_dump_json() == request_group.model_dump_json()
+    # Decoded models still validate assignments
+    with pytest.raises(ValueError):
+        decoded.operator = "SOME"
+
+
+def test_pickle_uses_compact_format(request_group: RequestGroup):
+    data = pickle.dumps(request_group)
+    assert MAGIC in data
+    assert pickle.loads(data) == request_group
+    window = request_group.requests[0].windows[0]
+    assert pickle.loads(pickle.dumps(window)) == window
+
+
+def test_decode_rejects_other_data():
+    with pytest.raises(DecodeError):
+        decode(b"not compact data")
+    with pytest.raises(DecodeError):
+        decode(MAGIC + bytes([99]) + b"...")
+
+
+def test_decode_rejects_foreign_classes():
+    data = MAGIC + bytes([1]) + pickle.dumps(OrderedDict(a=1))
+    with pytest.raises(DecodeError):
+        decode(data)
+
+
+def test_private_attributes_round_trip():
+    target = EsoTarget.model_validate(
+        {
+            "dec": "-04:43:12.000",
+            "differentialDec": 0.0,
+            "differentialRa": 0.0,
+            "epoch": 2000.0,
+            "equinox": "J2000",
+            "name": "M10",
+            "properMotionDec": 0.0,
+            "properMotionRa": 0.0,
+            "ra": "16:57:08.900",
+        }
+    )
+    target.name = "x"
+    decoded = decode(encode(target))
+    assert decoded.changed_fields() == target.changed_fields()
+    decoded.name = "y"
+    assert decoded.name == "y"
+
+
+def test_time_format_and_scale_are_kept():
+    t = Time("2025-01-01T00:00:00.123456", scale="tai")
+    decoded = decode(encode(Window(start=t, end=t))).end
+    assert (decoded.format, decoded.scale) == ("isot", "tai")
+    assert (decoded.jd1, decoded.jd2) == (t.jd1, t.jd2)
+
+
+def test_time_with_location_round_trip():
+    location = EarthLocation.from_geodetic(-70.7 * u.deg, -29.3 * u.deg, 2200 * u.m)
+    window = Window(start=Time("2025-01-01", location=location), end=Time("2025-01-02"))
+    decoded = pickle.loads(pickle.dumps(window))
+    assert decoded == window
+    assert decoded.start.location.geodetic == location.geodetic
+    assert decoded.start.location.ellipsoid == "WGS84"
+
+
+def test_masked_and_array_times_round_trip():
+    times = Time(["2025-01-01", "2025-01-02", "2025-01-03"], scale="tt")
+    masked = times.copy()
+    masked[1] = np.ma.masked
+    window = Window(start=times, end=masked)
+    decoded = pickle.loads(pickle.dumps(window))
+    assert (decoded.start == times).all()
+    assert decoded.start.format == "iso" and decoded.start.scale == "tt"
+    assert list(decoded.end.mask) == [False, True, False]
+    assert decoded.end[2] == masked[2]
+
+
+def test_angle_arrays_round_trip():
+    target = SiderealTarget(
+        name="grid", type="ICRS", ra=Angle([1, 2], unit="hourangle"), dec=-4.1
+    )
+    decoded = pickle.loads(pickle.dumps(target))
+    assert decoded.ra.unit == u.hourangle
+    assert list(decoded.ra.hour) == [1, 2]
+
+
+def test_numpy_extra_params_round_trip(request_group: RequestGroup):
+    extra = {"weights": np.arange(6.0).reshape(2, 3), "count": np.int64(3)}
+    request_group.requests[0].configurations[0].extra_params = extra
+    decoded = decode(encode(request_group))
+    params = decoded.requests[0].configurations[0].extra_params
+    assert (params["weights"] == extra["weights"]).all()
+    assert params["count"] == 3 and isinstance(params["count"], np.int64)
+
+
+def test_unencodable_values_pickle_the_usual_way(request_group: RequestGroup):
+    request_group.requests[0].configurations[0].extra_params = {"id": OrderedDict()}
+    with pytest.raises(EncodeError):
+        encode(request_group)
+    data = pickle.dumps(request_group)
+    # Only the windows, which can be encoded, are in the compact format
+    assert data.index(b"RequestGroup") < data.index(MAGIC)
+    assert pickle.loads(data) == request_group
@@ -111,6 +111,13 @@ class TestAstropyAngle:
         dumped = t.model_dump_json()
         assert dumped == '{"ra":"10.5","dec":"20"}'
 
+    def test_from_decimal_str(self):
+        """Test decimal strings without units, as in API payloads, are degrees"""
+        t = Target(ra="10.5", dec="-20")
+        assert t.ra.degree == 10.5
+        assert t.dec.degree == -20
+        assert Target.model_validate_json(t.model_dump_json()) == t
+
     def test_angle_attributes(self):
         """Test angles are accessible on the model"""
         t = Target(ra="1h", dec="2d")
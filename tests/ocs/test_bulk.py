@@ -0,0 +1,52 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from aeonlib.ocs.bulk import validate_many
+from aeonlib.ocs.request_models import RequestGroup
+
+from .lco_requests import LCO_REQUESTS
+from .soar_requests import SOAR_REQUESTS
+
+
+@pytest.fixture
+def payloads() -> list[dict]:
+    request_groups = [*LCO_REQUESTS.values(), *SOAR_REQUESTS.values()]
+    return [rg.model_dump(mode="json", exclude_none=True) for rg in request_groups]
+
+
+def test_validate_many_models(payloads: list[dict]):
+    result = validate_many(payloads)
+    assert result.ok
+    assert all(isinstance(rg, RequestGroup) for rg in result.results)
+    assert [rg.model_dump(mode="json", exclude_none=True) for rg in result.results] == (
+        payloads
+    )
+
+
+def test_validate_many_reports_errors_per_item(payloads: list[dict]):
+    payloads[1] = {**payloads[1], "operator": "SOME"}
+    payloads.append({"name": "missing everything"})
+    result = validate_many(payloads, output="json")
+    assert [e.index for e in result.errors] == [1, len(payloads) - 1]
+    assert result.errors[0].errors[0]["loc"] == ("operator",)
+    assert result.results[1] is None
+    assert len(result.valid()) == len(payloads) - 2
+    assert all(isinstance(r, bytes) for r in result.valid())
+
+
+def test_validate_many_in_worker_processes(payloads: list[dict]):
+    items = [RequestGroup.model_validate(p).model_dump_json() for p in payloads] * 4
+    items[5] = "{}"
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        result = validate_many(items, output="json", chunk_size=3, executor=executor)
+    assert [e.index for e in result.errors] == [5]
+    assert len(result.results) == len(items)
+    assert RequestGroup.model_validate_json(result.results[0]) == (
+        RequestGroup.model_validate_json(items[0])
+    )
+
+
+def test_validate_many_unknown_output():
+    with pytest.raises(ValueError):
+        validate_many([], output="pickle")  # type: ignore
@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+
+from aeonlib.models import NonSiderealTarget, SiderealTarget, Window
+from aeonlib.ocs.canonical import (
+    ANGLE_FIELDS,
+    TIME_FIELDS,
+    canonical_form,
+    canonical_hash,
+    dedupe,
+)
+from aeonlib.ocs.lco.facility import LcoFacility
+from aeonlib.ocs.request_models import RequestGroup
+
+from .lco_requests import LCO_REQUESTS
+
+START = datetime(2025, 1, 1)
+
+
+def variant(
+    name: str = "test",
+    ra: float = 254.287,
+    target_name: str = "M10",
+    windows: list[tuple[float, float]] = [(0, 2)],
+) -> RequestGroup:
+    """The 1m0 Sinistro request group with another target and windows, given as
+    hours after START."""
+    request_group = LCO_REQUESTS["lco_1m0_scicam_sinistro"].model_copy(deep=True)
+    request_group.name = name
+    for request in request_group.requests:
+        request.windows = [
+            Window(start=START + timedelta(hours=a), end=START + timedelta(hours=b))
+            for a, b in windows
+        ]
+        for configuration in request.configurations:
+            configuration.target = SiderealTarget(
+                name=target_name, type="ICRS", ra=ra, dec=-4.72
+            )
+    return request_group
+
+
+def test_hash_ignores_key_order_and_precision():
+    payload = variant().model_dump(mode="json", exclude_none=True)
+    reordered = dict(reversed(payload.items()))
+    assert canonical_hash(payload) == canonical_hash(reordered)
+    assert canonical_hash(variant()) == canonical_hash(variant(ra=254.287 + 1e-9))
+    assert canonical_hash(variant()) != canonical_hash(variant(ra=254.288))
+    # Windows rounded to the second, in any order
+    microseconds = variant(windows=[(1, 2), (0, 1e-7)])
+    assert canonical_hash(microseconds) == canonical_hash(
+        variant(windows=[(0, 0), (1, 2)])
+    )
+
+
+def test_hash_of_api_payload_matches_model():
+    # The facility serializes some times differently from model_dump
+    request_group = variant()
+    payload = LcoFacility.serialize_request_group(None, request_group)  # type: ignore
+    assert canonical_hash(payload) == canonical_hash(request_group)
+
+
+def test_canonical_form_exclude():
+    form = canonical_form(
+        variant().model_dump(mode="json", exclude_none=True),
+        exclude=["name", "requests.configurations.target.name"],
+    )
+    assert "name" not in form
+    assert "name" not in form["requests"][0]["configurations"][0]["target"]
+    assert form["requests"][0]["configurations"][0]["target"]["ra"] == 254287000
+
+
+def test_dedupe_collapses_duplicates():
+    batch = [
+        variant("stream a", target_name="AT2025abc"),
+        variant("other", ra=10),
+        variant("stream b", target_name="ZTF25aaaaaaa"),
+    ]
+    result = dedupe(batch, merge_windows=False)
+    assert result.request_groups == [batch[0], batch[1]]
+    assert result.index == [0, 1, 0]
+    assert result.duplicates == 1
+    assert result.merged == 0
+
+
+def test_dedupe_merges_windows():
+    batch = [
+        variant("a", windows=[(0, 2)]),
+        variant("b", windows=[(1, 3), (10, 11)]),
+        variant("c", windows=[(3.5, 4)]),
+    ]
+    result = dedupe(batch, merge_gap=3600)
+    (merged,) = result.request_groups
+    assert result.index == [0, 0, 0]
+    assert result.merged == 1
+    spans = [
+        (w.start.datetime, w.end.datetime)  # type: ignore
+        for w in merged.requests[0].windows
+    ]
+    assert spans == [
+        (START, START + timedelta(hours=4)),
+        (START + timedelta(hours=10), START + timedelta(hours=11)),
+    ]
+    # The input is left untouched
+    assert len(batch[0].requests[0].windows) == 1
+
+
+def test_dedupe_keeps_contained_windows():
+    batch = [variant("a", windows=[(0, 5)]), variant("b", windows=[(1, 2)])]
+    result = dedupe(batch)
+    assert result.request_groups == [batch[0]]
+    assert result.merged == 0
+
+
+def test_fields_are_model_fields():
+    targets = SiderealTarget.model_fields.keys() | NonSiderealTarget.model_fields.keys()
+    assert ANGLE_FIELDS <= targets
+    assert (
+        TIME_FIELDS
+        <= NonSiderealTarget.model_fields.keys() | Window.model_fields.keys()
+    )
+    # Every angle of the target models is rounded
+    angles = {
+        name
+        for model in (SiderealTarget, NonSiderealTarget)
+        for name, field in model.model_fields.items()
+        if "Angle" in str(field.annotation)
+    }
+    assert {"ra", "orbinc"} <= angles <= ANGLE_FIELDS
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from aeonlib.models import Window
+from aeonlib.ocs.coalesce import coalesce
+from aeonlib.ocs.lco.facility import LcoFacility
+from aeonlib.ocs.request_models import RequestGroup
+from aeonlib.ocs.standin import OcsStandIn
+
+from .lco_requests import LCO_REQUESTS
+
+START = datetime(2025, 1, 1)
+
+
+def single(i: int, **update) -> RequestGroup:
+    """A SINGLE request group whose window starts i hours after START."""
+    request_group = LCO_REQUESTS["lco_1m0_scicam_sinistro"].model_copy(deep=True)
+    request_group.name = f"single-{i}"
+    request_group.requests[0].windows = [
+        Window(start=START + timedelta(hours=i), end=START + timedelta(days=10))
+    ]
+    for field, value in update.items():
+        setattr(request_group, field, value)
+    return request_group
+
+
+def test_packs_compatible_requests():
+    batch = [single(i) for i in range(7)]
+    coalesced = coalesce(batch, max_requests=3)
+    assert [len(rg.requests) for rg in coalesced.request_groups] == [3, 3, 1]
+    assert [rg.operator for rg in coalesced.request_groups] == [
+        "MANY",
+        "MANY",
+        "SINGLE",
+    ]
+    assert coalesced.request_groups[0].name == "single-0 +2"
+    assert coalesced.positions[4] == (1, 1)
+    assert coalesced.request_groups[1].requests[1] is batch[4].requests[0]
+    # The input is left untouched
+    assert batch[0].operator == "SINGLE" and len(batch[0].requests) == 1
+
+
+def test_incompatible_groups_are_kept_apart():
+    many = LCO_REQUESTS["lco_2m0_scicam_muscat"].model_copy(update={"operator": "MANY"})
+    batch = [
+        single(0),
+        single(1, ipp_value=1.05),
+        single(2, observation_type="TIME_CRITICAL"),
+        single(3, proposal="OTHER_PROPOSAL"),
+        many,
+        single(5),
+    ]
+    coalesced = coalesce(batch)
+    assert len(coalesced.request_groups) == 5
+    assert coalesced.request_groups[4] is many
+    assert coalesced.positions == [(0, 0), (1, 0), (2, 0), (3, 0), (4, 0), (0, 1)]
+
+
+def test_max_requests_must_be_positive():
+    with pytest.raises(ValueError):
+        coalesce([single(0)], max_requests=0)
+
+
+def test_submission_maps_back():
+    batch = [single(i) for i in range(20)]
+    with OcsStandIn() as ocs, LcoFacility(ocs.settings()) as facility:
+        coalesced = coalesce(batch, max_requests=10)
+        submitted = [
+            facility.submit_request_group(rg) for rg in coalesced.request_groups
+        ]
+        assert ocs.path_counts["POST /requestgroups/"] == 2
+    results = coalesced.split(submitted)
+    for request_group, (submitted_group, request) in zip(batch, results):
+        assert request.windows[0].start == request_group.requests[0].windows[0].start
+    assert results[15][0].id == submitted[1].id
+    with pytest.raises(ValueError):
+        coalesced.split(submitted[:1])
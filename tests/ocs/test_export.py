@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from aeonlib.ocs.export import export_request_groups, write_parquet
+from aeonlib.ocs.lco.facility import LcoFacility
+from aeonlib.ocs.standin import OcsStandIn
+
+from .lco_requests import LCO_REQUESTS
+
+
+@pytest.fixture
+def facility():
+    with OcsStandIn(page_size=2) as ocs:
+        with LcoFacility(ocs.settings()) as facility:
+            for request_group in LCO_REQUESTS.values():
+                facility.submit_request_group(request_group)
+            ocs.set_state(2, "COMPLETED")
+            yield facility
+
+
+def test_export_tables(facility: LcoFacility):
+    tables = export_request_groups(facility, page_size=2)
+    request_groups = tables["request_groups"]
+    assert list(request_groups["id"]) == [3, 2, 1]
+    assert list(request_groups["state"]) == ["PENDING", "COMPLETED", "PENDING"]
+    assert request_groups["created"].dtype == np.dtype("datetime64[us]")
+
+    requests = tables["requests"]
+    assert list(requests["request_group_id"]) == [3, 2, 1]
+    assert list(requests["instrument_type"]) == [
+        "2M0-SCICAM-MUSCAT",
+        "2M0-FLOYDS-SCICAM",
+        "1M0-SCICAM-SINISTRO",
+    ]
+    assert requests["target_ra"].dtype == np.float64
+    assert requests["target_ra"][0] == pytest.approx(254.287)
+    # Durations are not reported by the stand-in
+    assert requests["duration"].mask.all()
+
+    windows = tables["windows"]
+    assert list(windows["request_id"]) == list(requests["id"])
+    assert windows["start"][0] < windows["end"][0]
+
+
+def test_export_filters(facility: LcoFacility):
+    tables = export_request_groups(facility, state="COMPLETED")
+    assert list(tables["request_groups"]["id"]) == [2]
+    assert len(tables["windows"]) == 1
+
+
+def test_export_empty(facility: LcoFacility):
+    tables = export_request_groups(facility, state="CANCELED")
+    assert len(tables["request_groups"]) == 0
+    assert "modified" in tables["requests"].colnames
+
+
+def test_export_arrow(facility: LcoFacility):
+    pa = pytest.importorskip("pyarrow")
+    tables = export_request_groups(facility, format="arrow")
+    request_groups = tables["request_groups"]
+    assert request_groups.schema.field("created").type == pa.timestamp("us", tz="UTC")
+    assert request_groups.column("proposal").to_pylist() == ["TEST_PROPOSAL"] * 3
+    assert tables["requests"].column("duration").null_count == 3
+
+
+def test_write_parquet(facility: LcoFacility, tmp_path):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    paths = write_parquet(facility, tmp_path, row_group_size=2, page_size=1)
+    parquet = pq.ParquetFile(paths["request_groups"])
+    assert parquet.metadata.num_rows == 3
+    assert parquet.metadata.num_row_groups == 2
+    windows = pq.read_table(paths["windows"])
+    assert windows.num_rows == 3
+    assert windows.column("start").to_pylist()[0].replace(tzinfo=None) < datetime.now()
@@ -0,0 +1,140 @@
+import numpy as np
+import pytest
+from astropy.table import MaskedColumn, Table
+
+from aeonlib.ocs.ingest import CatalogIngest, CatalogMapping, read_votable
+
+from .lco_requests import LCO_REQUESTS
+
+MAPPING = CatalogMapping(
+    columns={
+        "name": "ID",
+        "target.name": "ID",
+        "target.ra": "RA",
+        "target.dec": "DEC",
+        "target.proper_motion_ra": "PMRA",
+        "instrument_config.exposure_time": "EXPTIME",
+        "optical_elements.filter": "FILTER",
+    }
+)
+
+
+@pytest.fixture
+def catalog() -> Table:
+    rows = 25
+    return Table(
+        {
+            "ID": [f"star-{i}" for i in range(rows)],
+            "RA": np.linspace(0.0, 359.0, rows),
+            "DEC": np.linspace(-80.0, 80.0, rows),
+            "PMRA": MaskedColumn(
+                np.arange(rows, dtype=float), mask=[i % 2 for i in range(rows)]
+            ),
+            # Row 3 has an exposure time the instrument does not accept
+            "EXPTIME": [-1 if i == 3 else 30 + i for i in range(rows)],
+            "FILTER": ["B" if i % 2 else "V" for i in range(rows)],
+        }
+    )
+
+
+@pytest.fixture
+def ingest() -> CatalogIngest:
+    return CatalogIngest(
+        LCO_REQUESTS["lco_1m0_scicam_sinistro"], MAPPING, chunk_size=10
+    )
+
+
+@pytest.mark.parametrize("format", ["csv", "fits", "votable"])
+def test_ingest(catalog: Table, ingest: CatalogIngest, tmp_path, format: str):
+    path = tmp_path / f"catalog.{'vot' if format == 'votable' else format}"
+    catalog.write(
+        path, format={"votable": "votable", "fits": "fits", "csv": "ascii.csv"}[format]
+    )
+
+    request_groups = list(ingest.read(path))
+    assert ingest.rows_read == 25
+    assert [e.index for e in ingest.errors] == [3]
+    assert len(request_groups) == 24
+
+    first = request_groups[0]
+    configuration = first.requests[0].configurations[0]
+    assert first.name == "star-0"
+    assert configuration.target.name == "star-0"
+    assert configuration.target.ra.degree == pytest.approx(0.0)
+    assert configuration.target.dec.degree == pytest.approx(-80.0)
+    assert configuration.instrument_configs[0].exposure_time == 30
+    assert configuration.instrument_configs[0].optical_elements.filter == "V"
+    # Masked proper motions fall back to the model default
+    assert request_groups[1].requests[0].configurations[0].target.proper_motion_ra == 0
+    assert request_groups[2].requests[0].configurations[0].target.proper_motion_ra == 2
+
+
+def test_missing_required_value_is_an_error(ingest: CatalogIngest, tmp_path):
+    path = tmp_path / "catalog.csv"
+    path.write_text("ID,RA,DEC,PMRA,EXPTIME,FILTER\nstar,,10,0,30,B\n")
+    assert list(ingest.read(path)) == []
+    assert ingest.errors[0].errors[0]["loc"][-1] == "ra"
+
+
+def test_converters(tmp_path):
+    path = tmp_path / "catalog.csv"
+    path.write_text("ID,RA_HOURS,DEC\nstar,12.5,10\n")
+    mapping = CatalogMapping(
+        columns={"target.ra": "RA_HOURS", "target.dec": "DEC"},
+        converters={"target.ra": lambda hours: float(hours) * 15},
+    )
+    ingest = CatalogIngest(LCO_REQUESTS["lco_1m0_scicam_sinistro"], mapping)
+    (request_group,) = ingest.read(path)
+    assert request_group.requests[0].configurations[0].target.ra.degree == 187.5
+
+
+def test_read_votable_in_chunks(catalog: Table, tmp_path):
+    path = tmp_path / "catalog.xml"
+    catalog.write(path, format="votable")
+    chunks = list(read_votable(path, 10))
+    assert [len(c) for c in chunks] == [10, 10, 5]
+    assert chunks[2][4]["ID"] == "star-24"
+    assert chunks[0][1]["PMRA"] is None
+
+
+def test_unknown_format(ingest: CatalogIngest, tmp_path):
+    with pytest.raises(ValueError):
+        list(ingest.read(tmp_path / "catalog.parquet"))
+
+
+def test_conversion_errors_are_recorded_per_row(tmp_path):
+    path = tmp_path / "catalog.csv"
+    path.write_text("ID,RA_HOURS,DEC\na,12.5,10\nb,oops,10\nc,1,10\n")
+    mapping = CatalogMapping(
+        columns={"name": "ID", "target.ra": "RA_HOURS", "target.dec": "DEC"},
+        converters={"target.ra": lambda hours: float(hours) * 15},
+    )
+    ingest = CatalogIngest(
+        LCO_REQUESTS["lco_1m0_scicam_sinistro"], mapping, chunk_size=2
+    )
+    assert [rg.name for rg in ingest.read(path)] == ["a", "c"]
+    (error,) = ingest.errors
+    assert error.index == 1
+    assert error.errors[0]["type"] == "mapping_error"
+    assert "RA_HOURS" in error.errors[0]["msg"]
+
+
+def test_bad_path_is_an_error(tmp_path):
+    path = tmp_path / "catalog.csv"
+    path.write_text("ID,RA\na,10\n")
+    mapping = CatalogMapping(columns={"requests.5.windows.0.start": "RA"})
+    ingest = CatalogIngest(LCO_REQUESTS["lco_1m0_scicam_sinistro"], mapping)
+    assert list(ingest.read(path)) == []
+    assert ingest.errors[0].errors[0]["loc"] == (
+        "requests",
+        "5",
+        "windows",
+        "0",
+        "start",
+    )
+
+
+def test_gzipped_fits(catalog: Table, ingest: CatalogIngest, tmp_path):
+    path = tmp_path / "catalog.fits.gz"
+    catalog.write(path, format="fits")
+    assert len(list(ingest.read(path))) == 24
@@ -0,0 +1,112 @@
+import httpx
+import pytest
+
+from aeonlib.ocs.journal import FAILED, SUBMITTED, SubmissionJournal
+from aeonlib.ocs.lco.facility import LcoFacility
+from aeonlib.ocs.request_models import RequestGroup
+from aeonlib.ocs.standin import OcsStandIn
+from aeonlib.ocs.transport import clients
+
+from .lco_requests import LCO_REQUESTS
+
+
+@pytest.fixture
+def ocs():
+    with OcsStandIn() as ocs:
+        yield ocs
+
+
+@pytest.fixture
+def facility(ocs: OcsStandIn):
+    with LcoFacility(ocs.settings()) as facility:
+        yield facility
+
+
+def batch(count: int, proposal: str = "TEST_PROPOSAL") -> list[RequestGroup]:
+    template = LCO_REQUESTS["lco_1m0_scicam_sinistro"]
+    return [
+        template.model_copy(update={"name": f"rg-{i}", "proposal": proposal})
+        for i in range(count)
+    ]
+
+
+def lose_response(ocs: OcsStandIn, on_post: int):
+    """Mount a transport that creates the nth request group but loses the response,
+    as if the submitter crashed while waiting for it."""
+    posts = 0
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        nonlocal posts
+        response = ocs.handle(request)
+        if request.method == "POST":
+            posts += 1
+            if posts == on_post:
+                raise httpx.ReadTimeout("lost", request=request)
+        return response
+
+    clients.mount(ocs.api_root, httpx.MockTransport(handle))
+
+
+def test_submit_many(ocs: OcsStandIn, facility: LcoFacility):
+    journal = SubmissionJournal(facility=facility)
+    request_groups = batch(3)
+    entries = journal.submit_many(request_groups + request_groups[:1])
+    assert [e.state for e in entries] == [SUBMITTED] * 4
+    assert entries[0].request_group_id == entries[3].request_group_id
+    assert len(ocs.request_groups) == 3
+    assert journal.response(entries[1].hash).name == "rg-1"  # type: ignore
+
+    # Running the batch again sends nothing
+    journal.submit_many(request_groups)
+    assert ocs.path_counts["POST /requestgroups/"] == 3
+
+
+def test_lost_response_is_reconciled(ocs: OcsStandIn):
+    lose_response(ocs, on_post=2)
+    request_groups = batch(4)
+    with LcoFacility(ocs.settings()) as facility:
+        journal = SubmissionJournal(facility=facility)
+        with pytest.raises(httpx.ReadTimeout):
+            journal.submit_many(request_groups)
+    in_doubt = [e for e in journal.entries() if e.in_doubt]
+    assert [e.name for e in in_doubt] == ["rg-1"]
+
+    ocs.install()
+    with LcoFacility(ocs.settings()) as facility:
+        journal.facility = facility
+        entries = journal.submit_many(request_groups)
+    assert [e.state for e in entries] == [SUBMITTED] * 4
+    assert len(ocs.request_groups) == 4
+    assert entries[1].request_group_id == 2
+    assert ocs.path_counts["GET /requestgroups/"] == 1
+
+
+def test_unsent_in_doubt_entry_is_resent(ocs: OcsStandIn, facility: LcoFacility):
+    journal = SubmissionJournal(facility=facility)
+    (hash,) = journal.record(batch(1))
+    # Crashed after recording the send, before the request left
+    journal._update(hash, sent=journal._now())
+    assert journal.reconcile() == 0
+    assert not journal.get(hash).in_doubt  # type: ignore
+    assert journal.submit_many(batch(1))[0].state == SUBMITTED
+    assert len(ocs.request_groups) == 1
+
+
+def test_rejected_request_groups_fail(ocs: OcsStandIn, facility: LcoFacility):
+    journal = SubmissionJournal(facility=facility)
+    (entry,) = journal.submit_many(batch(1, proposal="UNKNOWN"))
+    assert entry.state == FAILED
+    assert "Invalid proposal" in entry.error  # type: ignore
+    journal.submit_many(batch(1, proposal="UNKNOWN"))
+    assert ocs.path_counts["POST /requestgroups/"] == 1
+    journal.submit_many(batch(1, proposal="UNKNOWN"), retry_failed=True)
+    assert ocs.path_counts["POST /requestgroups/"] == 2
+
+
+def test_journal_persists(ocs: OcsStandIn, facility: LcoFacility, tmp_path):
+    path = tmp_path / "journal.sqlite"
+    SubmissionJournal(path, facility).submit_many(batch(2))
+    journal = SubmissionJournal(path, facility)
+    assert [e.state for e in journal.entries()] == [SUBMITTED] * 2
+    journal.submit_many(batch(3))
+    assert len(ocs.request_groups) == 3
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from aeonlib.ocs.lco.facility import LcoFacility
+from aeonlib.ocs.mirror import RequestGroupMirror
+from aeonlib.ocs.request_models import SubmittedRequestGroup
+from aeonlib.ocs.standin import OcsStandIn
+
+from .lco_requests import LCO_REQUESTS
+
+
+class Clock:
+    def __init__(self):
+        self.now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def tick(self) -> None:
+        self.now += timedelta(minutes=1)
+
+
+@pytest.fixture
+def clock() -> Clock:
+    return Clock()
+
+
+@pytest.fixture
+def ocs(clock: Clock):
+    proposals = [
+        {"id": "TEST_PROPOSAL", "active": True, "title": "test"},
+        {"id": "OTHER_PROPOSAL", "active": True, "title": "other"},
+    ]
+    with OcsStandIn(proposals=proposals, clock=clock) as ocs:
+        yield ocs
+
+
+@pytest.fixture
+def facility(ocs: OcsStandIn):
+    with LcoFacility(ocs.settings()) as facility:
+        yield facility
+
+
+def submit(facility: LcoFacility, clock: Clock, count: int, proposal="TEST_PROPOSAL"):
+    request_group = LCO_REQUESTS["lco_1m0_scicam_sinistro"].model_copy(
+        update={"proposal": proposal}
+    )
+    for _ in range(count):
+        facility.submit_request_group(request_group)
+        clock.tick()
+
+
+def test_initial_load(ocs: OcsStandIn, facility: LcoFacility, clock: Clock):
+    submit(facility, clock, 25)
+    mirror = RequestGroupMirror(facility=facility, page_size=10)
+    assert mirror.sync() == 25
+    assert ocs.path_counts["GET /requestgroups/"] == 3
+    assert mirror.counts() == {"PENDING": 25}
+    assert mirror.watermark() == "2025-01-01T00:24:00.000000Z"
+    request_group = mirror.get(25)
+    assert isinstance(request_group, SubmittedRequestGroup)
+    assert request_group.id == 25
+
+
+def test_incremental_sync(ocs: OcsStandIn, facility: LcoFacility, clock: Clock):
+    submit(facility, clock, 10)
+    mirror = RequestGroupMirror(facility=facility)
+    mirror.sync()
+    ocs.set_state(3, "COMPLETED")
+    clock.tick()
+    submit(facility, clock, 2)
+    # The newest request group of the previous sync is fetched again
+    assert mirror.sync() == 4
+    assert mirror.counts() == {"PENDING": 11, "COMPLETED": 1}
+    assert [rg.id for rg in mirror.query(state="COMPLETED")] == [3]
+
+
+def test_sync_with_identical_modification_times(ocs: OcsStandIn, facility: LcoFacility):
+    # The clock never ticks, every request group has the same modified time
+    submit(facility, Clock(), 12)
+    mirror = RequestGroupMirror(facility=facility, page_size=5)
+    assert mirror.sync() == 12
+    assert len(mirror.query()) == 12
+
+
+def test_sync_per_proposal(ocs: OcsStandIn, facility: LcoFacility, clock: Clock):
+    submit(facility, clock, 3)
+    submit(facility, clock, 2, proposal="OTHER_PROPOSAL")
+    mirror = RequestGroupMirror(facility=facility)
+    assert mirror.sync(proposal="OTHER_PROPOSAL") == 2
+    assert mirror.watermark() is None
+    assert mirror.counts(proposal="TEST_PROPOSAL") == {}
+    assert mirror.counts(proposal="OTHER_PROPOSAL") == {"PENDING": 2}
+
+
+def test_query(ocs: OcsStandIn, facility: LcoFacility, clock: Clock, tmp_path):
+    submit(facility, clock, 5)
+    ocs.set_state(1, "CANCELED")
+    mirror = RequestGroupMirror(tmp_path / "mirror.sqlite", facility)
+    mirror.sync()
+    mirror.close()
+
+    # Queries do not need a facility
+    mirror = RequestGroupMirror(tmp_path / "mirror.sqlite")
+    assert [rg["id"] for rg in mirror.query(format="dict")] == [1, 5, 4, 3, 2]
+    recent = mirror.query(
+        state=["PENDING"], created_after=datetime(2025, 1, 1, 0, 3), format="dict"
+    )
+    assert [rg["id"] for rg in recent] == [5, 4]
+    table = mirror.query(proposal="TEST_PROPOSAL", limit=2, format="table")
+    assert list(table["id"]) == [1, 5]
+    assert list(table["state"]) == ["CANCELED", "PENDING"]
+    with pytest.raises(ValueError):
+        mirror.sync()
@@ -0,0 +1,104 @@
+import json
+from datetime import datetime
+from typing import Iterator
+
+import httpx
+import pytest
+
+from aeonlib.conf import Settings
+from aeonlib.models import SiderealTarget
+from aeonlib.ocs.lco.facility import LcoFacility
+from aeonlib.ocs.lco.rapid import HotStandby
+from aeonlib.ocs.transport import clients
+
+from .lco_requests import LCO_REQUESTS
+
+
+def submit_handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path.endswith("/profile/"):
+        return httpx.Response(200, json={"username": "test"})
+    payload = json.loads(request.content)
+    return httpx.Response(
+        201,
+        json={
+            **payload,
+            "id": 1,
+            "state": "PENDING",
+            "submitter": "test",
+            "created": "2025-01-01T00:00:00Z",
+            "modified": "2025-01-01T00:00:00Z",
+        },
+    )
+
+
+API_ROOT = "http://rapid.test/api/"
+
+
+@pytest.fixture
+def handler() -> dict:
+    """The handler of requests to API_ROOT, which tests can replace"""
+    return {"handle": submit_handler}
+
+
+@pytest.fixture
+def standby(handler: dict) -> Iterator[HotStandby]:
+    clients.mount(API_ROOT, httpx.MockTransport(lambda r: handler["handle"](r)))
+    facility = LcoFacility(settings=Settings(lco_token="", lco_api_root=API_ROOT))
+    template = LCO_REQUESTS["lco_1m0_scicam_sinistro"].model_copy(
+        update={"observation_type": "RAPID_RESPONSE"}
+    )
+    yield HotStandby(facility, template)
+    facility.close()
+    clients.unmount(API_ROOT)
+
+
+@pytest.mark.parametrize("change", ["observation_type", "target"])
+def test_template_must_be_icrs_rapid_response(standby: HotStandby, change: str):
+    template = LCO_REQUESTS["lco_1m0_scicam_sinistro"].model_copy(
+        update={"observation_type": "RAPID_RESPONSE"}, deep=True
+    )
+    if change == "target":
+        template.requests[0].configurations[0].target = SiderealTarget(
+            name="fixed", type="HOUR_ANGLE", hour_angle=0, ra=0, dec=0
+        )
+    else:
+        template.observation_type = "NORMAL"
+    with pytest.raises(ValueError, match="HotStandby templates must"):
+        HotStandby(standby.facility, template)
+
+
+def test_build_payload_patches_target_and_window(standby: HotStandby):
+    window = (datetime(2025, 1, 1), datetime(2025, 1, 2))
+    payload = standby.build_payload(10.5, -20.25, name="alert", window=window)
+    target = payload["requests"][0]["configurations"][0]["target"]
+    assert payload["name"] == "alert"
+    assert target["ra"] == 10.5
+    assert target["dec"] == -20.25
+    assert target["name"] == "alert"
+    assert payload["requests"][0]["windows"] == [
+        {"start": "2025-01-01T00:00:00", "end": "2025-01-02T00:00:00"}
+    ]
+    # The template itself is left untouched
+    assert standby.template["name"] == "test"
+
+
+def test_submit_records_trace(standby: HotStandby):
+    with standby:
+        submitted, trace = standby.submit(10.5, -20.25, name="alert")
+    assert submitted.id == 1
+    assert submitted.observation_type == "RAPID_RESPONSE"
+    assert submitted.requests[0].configurations[0].target.ra.degree == 10.5
+    assert trace.network > 0
+    assert trace.total >= trace.network
+    assert standby.last_trace is trace
+
+
+def test_failed_ping(
+    standby: HotStandby, handler: dict, caplog: pytest.LogCaptureFixture
+):
+    handler["handle"] = lambda request: httpx.Response(401)
+    standby.ping()
+    assert "ping failed" in caplog.text
+    with pytest.raises(httpx.HTTPStatusError):
+        standby.start()
+    assert standby._thread is None
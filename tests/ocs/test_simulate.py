@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from aeonlib.models import SiderealTarget, Window
+from aeonlib.ocs.request_models import RequestGroup
+from aeonlib.ocs.simulate import LCO_SITES, Site, estimate_duration, simulate
+
+from .lco_requests import LCO_REQUESTS
+
+START = datetime(2025, 6, 1, 12)
+END = START + timedelta(days=5)
+
+
+def site(weather_loss: float = 0.0) -> Site:
+    lsc = LCO_SITES["lsc"]
+    return Site("lsc", lsc.location, {"1m0": 1}, weather_loss)
+
+
+def request_group(
+    name: str = "test",
+    dec: float = -80,
+    days: float = 1,
+    ipp_value: float = 1.0,
+    telescope_class: str = "1m0",
+) -> RequestGroup:
+    """The 1m0 Sinistro request group (airmass up to 3) with its window starting at
+    START and a target at dec."""
+    request_group = LCO_REQUESTS["lco_1m0_scicam_sinistro"].model_copy(deep=True)
+    request_group.name = name
+    request_group.ipp_value = ipp_value
+    for request in request_group.requests:
+        request.location.telescope_class = telescope_class
+        request.windows = [Window(start=START, end=START + timedelta(days=days))]
+        for configuration in request.configurations:
+            configuration.target = SiderealTarget(
+                name="target", type="ICRS", ra=120, dec=dec
+            )
+    return request_group
+
+
+def hours(count: float):
+    return lambda request: count * 3600
+
+
+def test_estimate_duration():
+    (request,) = LCO_REQUESTS["lco_1m0_scicam_sinistro"].requests
+    # One 10 second exposure
+    assert estimate_duration(request) == 180 + 30 + 10 + 15
+
+
+def test_capacity_is_shared_by_priority():
+    request_groups = [
+        request_group("low", ipp_value=1.0),
+        request_group("high", ipp_value=1.5),
+        request_group("middle", ipp_value=1.2),
+    ]
+    forecast = simulate(
+        request_groups, START, END, [site()], realizations=4, duration=hours(4)
+    )
+    # A winter night in Chile fits two four hour requests
+    assert forecast.completion.tolist() == [0, 1, 1]
+    assert forecast.site_hours() == {"lsc": 8}
+
+
+def test_unobservable_requests():
+    request_groups = [
+        request_group("north", dec=80),
+        request_group("2m0", telescope_class="2m0"),
+    ]
+    forecast = simulate(request_groups, START, END, [site()], realizations=4)
+    assert forecast.completion.tolist() == [0, 0]
+
+
+def test_weather_loss():
+    lost = simulate([request_group(days=4)], START, END, [site(1.0)], realizations=8)
+    assert lost.completion.tolist() == [0]
+
+    forecast = simulate(
+        [request_group(days=4)], START, END, [site(0.5)], realizations=400, seed=1
+    )
+    # Completes unless all four nights are lost
+    assert abs(forecast.completion[0] - (1 - 0.5**4)) < 0.05
+
+
+def test_many_operator_completion():
+    many = request_group()
+    north = request_group(dec=80).requests[0]
+    many.operator = "MANY"
+    many.requests = [many.requests[0], north]
+    forecast = simulate([many], START, END, [site()], realizations=4)
+    assert forecast.request_completion.tolist() == [1, 0]
+    assert forecast.completion.tolist() == [0]
+    assert (forecast.placed[:, 0] == 0).all()
+
+
+def test_network():
+    request_groups = [request_group(str(i), dec=-80 + i / 5, days=3) for i in range(50)]
+    forecast = simulate(request_groups, START, END, realizations=16, seed=2)
+    assert forecast.placed.shape == (16, 50)
+    assert 0 < forecast.expected_completed <= 50
+    # Southern targets are not placed at northern sites
+    placed = np.unique(forecast.placed[forecast.placed >= 0])
+    assert {forecast.sites[i] for i in placed} <= {"coj", "cpt", "lsc"}
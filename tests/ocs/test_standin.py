@@ -0,0 +1,94 @@
+"""
+Runs the LCO and SOAR facilities against the in-process OCS stand-in.
+"""
+
+import httpx
+import pytest
+
+from aeonlib.ocs.lco.facility import LcoFacility
+from aeonlib.ocs.request_models import RequestGroup
+from aeonlib.ocs.soar.facility import SoarFacility
+from aeonlib.ocs.standin import OcsStandIn
+
+from .lco_requests import LCO_REQUESTS
+from .soar_requests import SOAR_REQUESTS
+
+
+@pytest.fixture
+def ocs():
+    with OcsStandIn() as ocs:
+        yield ocs
+
+
+@pytest.mark.parametrize(
+    "request_group", LCO_REQUESTS.values(), ids=LCO_REQUESTS.keys()
+)
+def test_valid_lco_requests(ocs: OcsStandIn, request_group: RequestGroup):
+    valid, errors = LcoFacility(ocs.settings()).validate_request_group(request_group)
+    assert valid, errors
+
+
+def test_submit_soar_request(ocs: OcsStandIn):
+    facility = SoarFacility(ocs.settings())
+    submitted = facility.submit_request_group(SOAR_REQUESTS["soar_triplespec"])
+    assert submitted.id == 1
+    assert submitted.state == "PENDING"
+    assert ocs.request_groups[1]["requests"][0]["state"] == "PENDING"
+
+
+def test_invalid_proposal(ocs: OcsStandIn):
+    request_group = LCO_REQUESTS["lco_1m0_scicam_sinistro"].model_copy(
+        update={"proposal": "NOPE"}
+    )
+    valid, errors = LcoFacility(ocs.settings()).validate_request_group(request_group)
+    assert not valid
+    assert errors == {"proposal": ["Invalid proposal."]}
+
+
+def test_proposals_pagination():
+    proposals = [{"id": f"P{i}", "active": True, "title": f"{i}"} for i in range(5)]
+    with OcsStandIn(proposals=proposals, page_size=2) as ocs:
+        result = LcoFacility(ocs.settings()).proposals(format="dict")
+        assert [p["id"] for p in result] == [f"P{i}" for i in range(5)]
+        assert ocs.path_counts["GET /proposals/"] == 3
+
+
+def test_throttling_is_retried():
+    with OcsStandIn(throttle_every=2) as ocs:
+        facility = LcoFacility(ocs.settings(http_max_retries=1))
+        for _ in range(3):
+            valid, _ = facility.validate_request_group(
+                LCO_REQUESTS["lco_1m0_scicam_sinistro"]
+            )
+            assert valid
+        assert ocs.request_count == 5
+        # Submissions are not retried, as they are not idempotent
+        with pytest.raises(httpx.HTTPStatusError):
+            facility.submit_request_group(LCO_REQUESTS["lco_1m0_scicam_sinistro"])
+        assert not ocs.request_groups
+        assert ocs.request_count == 6
+
+
+def test_injected_errors_are_deterministic():
+    def failures(seed):
+        with OcsStandIn(error_rate=0.5, seed=seed) as ocs:
+            facility = LcoFacility(ocs.settings())
+            return [facility.send("GET", "/profile/").status_code for _ in range(20)]
+
+    assert failures(1) == failures(1)
+    assert 500 in failures(1)
+
+
+def test_request_group_filters(ocs: OcsStandIn):
+    facility = LcoFacility(ocs.settings())
+    for _ in range(3):
+        facility.submit_request_group(LCO_REQUESTS["lco_1m0_scicam_sinistro"])
+    ocs.set_state(2, "COMPLETED")
+    response = facility.get_json("/requestgroups/", params={"state": "PENDING"})
+    assert [rg["id"] for rg in response["results"]] == [3, 1]
+    response = facility.get_json("/requestgroups/", params={"id": "1,2"})
+    assert response["count"] == 2
+    response = facility.send("POST", "/requestgroups/2/cancel/")
+    assert response.json()["state"] == "CANCELED"
+    with pytest.raises(httpx.HTTPStatusError):
+        facility.get_json("/requestgroups/99/")
@@ -0,0 +1,75 @@
+from aeonlib.conf import Settings
+from aeonlib.ocs.lco.facility import LcoFacility
+from aeonlib.ocs.soar.facility import SoarFacility
+from aeonlib.ocs.transport import ClientRegistry, clients
+
+
+def test_lco_and_soar_share_client():
+    settings = Settings(
+        lco_token="shared",
+        lco_api_root="https://ocs.test/api/",
+        soar_api_root="https://ocs.test/api/",
+    )
+    with LcoFacility(settings) as lco, SoarFacility(settings) as soar:
+        assert lco.client is soar.client
+        assert lco.client.headers["Authorization"] == "Token shared"
+
+
+def test_different_tokens_get_different_clients():
+    a = LcoFacility(Settings(lco_token="a", lco_api_root="https://ocs.test/api/"))
+    b = LcoFacility(Settings(lco_token="b", lco_api_root="https://ocs.test/api/"))
+    assert a.client is not b.client
+    a.close()
+    b.close()
+
+
+def test_pool_settings_applied():
+    registry = ClientRegistry()
+    settings = Settings(http_timeout=12.5, http_keepalive_expiry=60)
+    client = registry.acquire("https://ocs.test/api/", "", settings)
+    assert client.timeout.read == 12.5
+    registry.release(client)
+    registry.close()
+    assert client.is_closed
+
+
+def test_close_idle_keeps_clients_in_use():
+    registry = ClientRegistry()
+    in_use = registry.acquire("https://a.test/api/", "", Settings())
+    idle = registry.acquire("https://b.test/api/", "", Settings())
+    registry.release(idle)
+    registry.close_idle()
+    assert idle.is_closed
+    assert not in_use.is_closed
+    # A closed client is replaced on the next acquire
+    assert registry.acquire("https://b.test/api/", "", Settings()) is not idle
+    registry.close()
+
+
+def test_release_unknown_client_is_ignored():
+    facility = LcoFacility(Settings(lco_token="", lco_api_root="https://ocs.test/"))
+    clients.release(object())  # type: ignore
+    # The facility's client is still counted as in use
+    clients.close_idle()
+    assert not facility.client.is_closed
+    facility.close()
+
+
+def test_close_is_idempotent():
+    settings = Settings(lco_token="twice", lco_api_root="https://ocs.test/api/")
+    a, b = LcoFacility(settings), LcoFacility(settings)
+    a.close()
+    a.close()
+    clients.close_idle()
+    assert not b.client.is_closed
+    b.close()
+
+
+def test_pool_settings_are_part_of_the_key():
+    registry = ClientRegistry()
+    client = registry.acquire("https://ocs.test/api/", "", Settings())
+    other = registry.acquire("https://ocs.test/api/", "", Settings(http_timeout=99))
+    assert other is not client
+    assert other.timeout.read == 99
+    assert registry.acquire("https://ocs.test/api/", "", Settings()) is client
+    registry.close()
@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from aeonlib.models import Window
+from aeonlib.ocs.lco.facility import LcoFacility
+from aeonlib.ocs.request_models import SubmittedRequestGroup
+from aeonlib.ocs.standin import OcsStandIn
+from aeonlib.ocs.watcher import RequestGroupWatcher, StateChange
+
+from .lco_requests import LCO_REQUESTS
+
+WINDOW_START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+WINDOW_END = datetime(2025, 1, 31, tzinfo=timezone.utc)
+
+
+class Clock:
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def advance(self, delta: timedelta) -> None:
+        self.now += delta
+
+
+@pytest.fixture
+def clock() -> Clock:
+    return Clock(datetime(2025, 1, 10, tzinfo=timezone.utc))
+
+
+@pytest.fixture
+def ocs(clock: Clock):
+    with OcsStandIn(clock=clock) as ocs:
+        yield ocs
+
+
+@pytest.fixture
+def facility(ocs: OcsStandIn):
+    with LcoFacility(ocs.settings()) as facility:
+        yield facility
+
+
+@pytest.fixture
+def watcher(facility: LcoFacility, clock: Clock) -> RequestGroupWatcher:
+    return RequestGroupWatcher(
+        facility,
+        min_interval=timedelta(seconds=30),
+        max_interval=timedelta(minutes=10),
+        clock=clock,
+    )
+
+
+def submit(facility: LcoFacility, count: int) -> list[SubmittedRequestGroup]:
+    request_group = LCO_REQUESTS["lco_1m0_scicam_sinistro"].model_copy(deep=True)
+    request_group.requests[0].windows = [Window(start=WINDOW_START, end=WINDOW_END)]
+    return [facility.submit_request_group(request_group) for _ in range(count)]
+
+
+def test_polls_in_batches(
+    ocs: OcsStandIn, facility: LcoFacility, watcher: RequestGroupWatcher, clock: Clock
+):
+    for submitted in submit(facility, 250):
+        watcher.watch(submitted)
+    changes: list[StateChange] = []
+    watcher.on_change(changes.append)
+
+    clock.advance(timedelta(seconds=30))
+    assert watcher.poll() == []
+    assert ocs.path_counts["GET /requestgroups/"] == 3
+
+    ocs.set_state(7, "COMPLETED")
+    ocs.set_state(8, "CANCELED")
+    # Idle request groups back off to a one minute interval
+    clock.advance(timedelta(seconds=30))
+    assert watcher.poll() == []
+    clock.advance(timedelta(seconds=30))
+    watcher.poll()
+    assert ocs.path_counts["GET /requestgroups/"] == 6
+    assert [(c.id, c.previous, c.state) for c in changes] == [
+        (7, "PENDING", "COMPLETED"),
+        (8, "PENDING", "CANCELED"),
+    ]
+    assert changes[0].request_group.state == "COMPLETED"
+    # Request groups in terminal states are no longer watched
+    assert len(watcher) == 248
+    assert 7 not in watcher
+
+
+def test_waits_for_window_to_open(
+    facility: LcoFacility, watcher: RequestGroupWatcher, clock: Clock
+):
+    clock.now = datetime(2024, 12, 31, 23, 55, tzinfo=timezone.utc)
+    watcher.watch(submit(facility, 1)[0])
+    assert watcher.next_poll() == WINDOW_START
+    clock.now = datetime(2024, 12, 1, tzinfo=timezone.utc)
+    watcher.watch(submit(facility, 1)[0])
+    assert watcher.next_poll() == clock.now + timedelta(minutes=10)
+
+
+def test_checks_after_window_closes(
+    facility: LcoFacility, watcher: RequestGroupWatcher, clock: Clock
+):
+    clock.now = WINDOW_END - timedelta(minutes=2)
+    watcher.watch(submit(facility, 1)[0])
+    clock.advance(timedelta(seconds=30))
+    watcher.poll()
+    assert watcher.next_poll() == clock.now + timedelta(minutes=1)
+    clock.advance(timedelta(minutes=1))
+    watcher.poll()
+    # Backing off would wait two minutes, past the end of the window
+    assert watcher.next_poll() == WINDOW_END + timedelta(seconds=30)
+
+
+def test_watch_by_id(ocs: OcsStandIn, facility: LcoFacility, clock: Clock):
+    submit(facility, 1)
+    watcher = RequestGroupWatcher(facility, clock=clock)
+    watcher.watch(1)
+    changes = watcher.poll()
+    assert [(c.previous, c.state) for c in changes] == [(None, "PENDING")]
+
+
+def test_async_changes(ocs: OcsStandIn, facility: LcoFacility, clock: Clock):
+    submit(facility, 2)
+    watcher = RequestGroupWatcher(facility, min_interval=timedelta(0), clock=clock)
+    watcher.watch(1)
+    watcher.watch(2)
+    ocs.set_state(1, "COMPLETED")
+    ocs.set_state(2, "WINDOW_EXPIRED")
+
+    async def collect():
+        return [change.state async for change in watcher.changes()]
+
+    assert asyncio.run(collect()) == ["COMPLETED", "WINDOW_EXPIRED"]
+    assert len(watcher) == 0